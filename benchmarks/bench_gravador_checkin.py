@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""Compara check-ins com um commit por leitura e com o gravador em lote (group commit).
+
+Várias threads (simulando leitores na entrada) registram o check-in de todos os
+convidados de um banco temporário:
+  - direto: registrar_checkin_por_id, uma transação por leitura, com o
+    synchronous=NORMAL padrão (sem fsync por commit) e com synchronous=FULL
+    (durável, como o gravador);
+  - em lote: GravadorCheckin, um executemany e um fsync por lote.
+
+Uso:
+    python benchmarks/bench_gravador_checkin.py [quantidade_convidados] [threads]
+"""
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from db import conexao as db_conexao
+from modelos import convidado as modelo_convidado
+from servicos.gravador_checkin import GravadorCheckin
+
+
+def preparar_banco(diretorio, quantidade):
+    db_conexao.fechar_conexoes_pool()
+    db_conexao.DB_PATH = os.path.join(diretorio, f"bench_{quantidade}_{time.time_ns()}.sqlite")
+    db_conexao.inicializar_banco()
+    with db_conexao.obter_conexao() as conexao:
+        evento_id = conexao.execute("INSERT INTO eventos (nome) VALUES ('Benchmark')").lastrowid
+        conexao.executemany(
+            "INSERT INTO convidados (evento_id, nome, token) VALUES (?, ?, ?)",
+            ((evento_id, f"Convidado {i}", f"t{i}") for i in range(quantidade)),
+        )
+        conexao.commit()
+        ids = [row[0] for row in conexao.execute("SELECT id FROM convidados ORDER BY id")]
+    return evento_id, ids
+
+
+def _sincronismo(valor):
+    with db_conexao.obter_conexao() as conexao:
+        conexao.execute(f"PRAGMA synchronous = {valor};")
+
+
+def direto(evento_id, ids, threads, sincronismo="NORMAL"):
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(threads, initializer=_sincronismo, initargs=(sincronismo,)) as pool:
+        status = list(pool.map(lambda cid: modelo_convidado.registrar_checkin_por_id(cid, evento_id)["status"], ids))
+    return time.perf_counter() - inicio, status, None
+
+
+def em_lote(evento_id, ids, threads):
+    inicio = time.perf_counter()
+    with GravadorCheckin() as gravador:
+        with ThreadPoolExecutor(threads) as pool:
+            status = list(pool.map(lambda cid: gravador.registrar(cid, evento_id).result()["status"], ids))
+    return time.perf_counter() - inicio, status, gravador.metricas()
+
+
+if __name__ == "__main__":
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        cenarios = (
+            ("direto, NORMAL", direto),
+            ("direto, FULL (durável)", lambda e, i, t: direto(e, i, t, "FULL")),
+            ("em lote, FULL (durável)", em_lote),
+        )
+        for nome, funcao in cenarios:
+            evento_id, ids = preparar_banco(diretorio, quantidade)
+            duracao, status, metricas = funcao(evento_id, ids, threads)
+            print(f"{nome:28s} {quantidade / duracao:9.0f} check-ins/s "
+                  f"({status.count('ok')} ok, {len(status) - status.count('ok')} outros)")
+            if metricas:
+                print(f"{'':28s} lotes: {metricas['lotes']}, lote médio: {metricas['lote_medio']:.1f}, "
+                      f"maior fila: {metricas['maior_fila']}, flush p50/p99: "
+                      f"{metricas['flush_p50_ms']:.2f}/{metricas['flush_p99_ms']:.2f} ms")
+        db_conexao.fechar_conexoes_pool()
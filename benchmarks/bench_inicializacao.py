@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""Mede a inicialização a frio (processo novo) das operações de listagem e check-in.
+
+Cada operação roda num processo Python novo com `-X importtime`, sobre um
+banco temporário: importa main.py, chama inicializar_banco() e executa a
+operação uma vez. O script reporta o tempo total do processo (mediana), o
+tempo gasto em importações e os módulos mais caros, e falha (código de saída 1)
+se alguma operação passar de ORCAMENTO_MS ou importar um dos MODULOS_PESADOS,
+que só devem ser carregados ao gerar QR Codes e convites.
+
+Uso:
+    python benchmarks/bench_inicializacao.py [repeticoes]
+"""
+import os
+import secrets
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, RAIZ)
+
+# Chave de assinatura só deste teste, herdada pelos processos medidos
+os.environ["CONVITE_CHAVE_TOKENS"] = secrets.token_hex(32)
+
+from db import conexao as db_conexao
+from servicos.verificador_tokens import codificar_token, obter_chave
+
+# Tempo máximo (ms) do processo inteiro, da partida do interpretador ao fim da operação
+ORCAMENTO_MS = {"listar": 100, "checkin": 100}
+MODULOS_PESADOS = ("qrcode", "PIL", "reportlab")
+MAIS_CAROS = 5
+
+# Código executado em cada processo; argv: [caminho do banco, token]
+_PREPARO = "import sys; from db import conexao; conexao.DB_PATH = sys.argv[1]; import main; main.inicializar_banco(); "
+OPERACOES = {
+    "listar": _PREPARO + "main.modelo_evento.listar_eventos(); main.modelo_convidado.paginar_convidados(1)",
+    "checkin": _PREPARO + "from servicos import checkin_service; checkin_service.registrar_checkin(sys.argv[2], 1)",
+}
+
+
+def preparar_banco(caminho, quantidade=1000):
+    db_conexao.DB_PATH = caminho
+    db_conexao.inicializar_banco()
+    with db_conexao.obter_conexao() as conexao:
+        evento_id = conexao.execute("INSERT INTO eventos (nome, data) VALUES ('Inicialização', '2030-01-01')").lastrowid
+        conexao.executemany(
+            "INSERT INTO convidados (evento_id, nome, token) VALUES (?, ?, ?)",
+            ((evento_id, f"Convidado {i}", f"t{i}") for i in range(quantidade)),
+        )
+        conexao.commit()
+    db_conexao.fechar_conexoes_pool()
+    return codificar_token(obter_chave(), evento_id, 1)
+
+
+def interpretar_importtime(saida):
+    """Retorna ({módulo: tempo cumulativo em ms}, tempo total das importações em ms)."""
+    modulos = {}
+    total = 0.0
+    for linha in saida.splitlines():
+        if not linha.startswith("import time:") or "imported package" in linha:
+            continue
+        _, cumulativo, nome = linha[len("import time:"):].split("|")
+        cumulativo = int(cumulativo) / 1000
+        modulos[nome.strip()] = cumulativo
+        if not nome[1:].startswith(" "): # Importação de primeiro nível
+            total += cumulativo
+    return modulos, total
+
+
+def medir(operacao, caminho_banco, token, ambiente):
+    comando = [sys.executable, "-X", "importtime", "-c", OPERACOES[operacao], caminho_banco, token]
+    inicio = time.perf_counter()
+    processo = subprocess.run(comando, cwd=RAIZ, env=ambiente, capture_output=True, text=True)
+    duracao = (time.perf_counter() - inicio) * 1000
+    if processo.returncode != 0:
+        raise RuntimeError(f"{operacao} falhou:\n{processo.stderr[-2000:]}")
+    modulos, total_importacoes = interpretar_importtime(processo.stderr)
+    return duracao, total_importacoes, modulos
+
+
+if __name__ == "__main__":
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    # Com o cache de bytecode (.pyc) habilitado, como numa instalação normal
+    ambiente = dict(os.environ)
+    ambiente.pop("PYTHONDONTWRITEBYTECODE", None)
+
+    falhas = []
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho_banco = os.path.join(diretorio, "inicializacao.sqlite")
+        token = preparar_banco(caminho_banco)
+        for operacao in OPERACOES:
+            medir(operacao, caminho_banco, token, ambiente) # Aquecimento: grava os .pyc
+            medicoes = [medir(operacao, caminho_banco, token, ambiente) for _ in range(repeticoes)]
+            duracao = statistics.median(m[0] for m in medicoes)
+            importacoes = statistics.median(m[1] for m in medicoes)
+            modulos = medicoes[-1][2]
+            orcamento = ORCAMENTO_MS[operacao]
+            print(f"{operacao:8s} processo {duracao:7.1f} ms (orçamento {orcamento} ms)  importações {importacoes:6.1f} ms")
+            caros = sorted(((t, m) for m, t in modulos.items()), reverse=True)
+            for tempo, modulo in caros[:MAIS_CAROS]:
+                print(f"    {tempo:6.1f} ms  {modulo}")
+
+            pesados = sorted(m for m in modulos if m.split(".")[0] in MODULOS_PESADOS)
+            if pesados:
+                falhas.append(f"{operacao}: importou {', '.join(pesados[:MAIS_CAROS])}")
+            if duracao > orcamento:
+                falhas.append(f"{operacao}: {duracao:.1f} ms acima do orçamento de {orcamento} ms")
+
+    for falha in falhas:
+        print(f"FALHA - {falha}")
+    sys.exit(1 if falhas else 0)
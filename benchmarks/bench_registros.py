@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""Compara memória e tempo das listagens com dicts por linha e com registros compactos.
+
+Cenários, num banco temporário:
+  - dict: sqlite3.Row convertido em dict a cada linha (como os modelos faziam);
+  - registro: Convidado/Evento com __slots__, montados pelo row_factory do modelo.
+
+Para eventos, a versão com dict também reformata a data de cada linha na
+leitura, enquanto o registro só formata quando data_formatada é usada.
+
+Uso:
+    python benchmarks/bench_registros.py [quantidade_convidados] [quantidade_eventos]
+"""
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from db import conexao as db_conexao
+from modelos import convidado as modelo_convidado
+from modelos import evento as modelo_evento
+
+SQL_CONVIDADOS = """SELECT c.id, c.nome, c.email, c.telefone, c.status_presenca, e.nome as nome_evento
+                    FROM convidados c
+                    JOIN eventos e ON c.evento_id = e.id
+                    WHERE c.evento_id = ?
+                    ORDER BY c.nome"""
+SQL_EVENTOS = "SELECT id, nome, local, data, horario, descricao FROM eventos ORDER BY data DESC, horario DESC"
+
+
+def preparar_banco(diretorio, convidados, eventos):
+    db_conexao.DB_PATH = os.path.join(diretorio, "bench_registros.sqlite")
+    db_conexao.inicializar_banco()
+    with db_conexao.obter_conexao() as conexao:
+        conexao.executemany(
+            "INSERT INTO eventos (nome, local, data, horario) VALUES (?, ?, ?, ?)",
+            ((f"Evento {i}", "Centro de Convenções", f"2030-{i % 12 + 1:02d}-{i % 28 + 1:02d}", "20:00")
+             for i in range(eventos)),
+        )
+        conexao.executemany(
+            "INSERT INTO convidados (evento_id, nome, email, telefone) VALUES (1, ?, ?, ?)",
+            ((f"Convidado {i}", f"convidado{i}@exemplo.com", "(11) 98765-4321") for i in range(convidados)),
+        )
+        conexao.commit()
+
+
+def convidados_dict():
+    with db_conexao.obter_conexao() as conexao:
+        return [dict(row) for row in conexao.execute(SQL_CONVIDADOS, (1,)).fetchall()]
+
+
+def convidados_registro():
+    return modelo_convidado.listar_convidados_por_evento(1)
+
+
+def eventos_dict():
+    with db_conexao.obter_conexao() as conexao:
+        eventos = [dict(row) for row in conexao.execute(SQL_EVENTOS).fetchall()]
+    for ev in eventos:
+        ev["data"] = datetime.strptime(ev["data"], "%Y-%m-%d").strftime("%d/%m/%Y")
+    return eventos
+
+
+def eventos_registro():
+    return modelo_evento.listar_eventos()
+
+
+def medir(funcao):
+    """Retorna (segundos, bytes retidos pelo resultado, pico de memória)."""
+    gc.collect()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = funcao()
+    duracao = time.perf_counter() - inicio
+    retido, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del resultado
+    return duracao, retido, pico
+
+
+if __name__ == "__main__":
+    quantidade_convidados = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    quantidade_eventos = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        preparar_banco(diretorio, quantidade_convidados, quantidade_eventos)
+        cenarios = (
+            (f"convidados ({quantidade_convidados})", convidados_dict, convidados_registro),
+            (f"eventos ({quantidade_eventos})", eventos_dict, eventos_registro),
+        )
+        for nome, com_dict, com_registro in cenarios:
+            com_dict() # Aquece o cache de páginas do SQLite antes de medir
+            for rotulo, funcao in (("dict", com_dict), ("registro", com_registro)):
+                duracao, retido, pico = medir(funcao)
+                print(f"{nome:20s} {rotulo:9s} {duracao * 1000:8.1f} ms  "
+                      f"retido {retido / 1024 / 1024:7.2f} MiB  pico {pico / 1024 / 1024:7.2f} MiB")
+        db_conexao.fechar_conexoes_pool()
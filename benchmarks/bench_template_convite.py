@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""Compara o custo por convite com e sem o template compilado do evento.
+
+Cada convite é um PDF próprio, como em gerar_convite_pdf, renderizado em
+memória para não medir o disco. Cenários:
+  - sem template: canvas do reportlab por convidado, com o layout do evento
+    reconstruído a cada vez (conversão de data/hora, medição de textos), como
+    era feito antes;
+  - canvas com template: canvas por convidado, com o layout do evento em cache;
+  - template compilado: renderizar_convite_pdf, que grava só o nome e o QR
+    Code sobre a parte fixa compilada uma vez por evento.
+
+Uso:
+    python benchmarks/bench_template_convite.py [quantidade_convites]
+"""
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+from servicos import convite_service
+from servicos import qrcode_service
+
+EVENTO = {
+    "id": 1,
+    "nome": "Conferência Anual de Tecnologia",
+    "local": "Centro de Convenções",
+    "data": "2025-10-20", # Como vem do banco (TEXT), exigindo conversão
+    "horario": "09:00",
+    "descricao": None,
+}
+
+
+def canvas_por_convidado(quantidade, matriz, usar_template):
+    inicio = time.perf_counter()
+    total_bytes = 0
+    for i in range(quantidade):
+        if usar_template:
+            template = convite_service.obter_template_convite(EVENTO)
+        else:
+            template = convite_service.TemplateConvite(EVENTO)
+        buffer = io.BytesIO()
+        c = canvas.Canvas(buffer, pagesize=letter)
+        template.desenhar_fundo(c)
+        template.desenhar_convidado(c, {"nome": f"Convidado {i}"}, matriz_qrcode=matriz)
+        c.save()
+        total_bytes += buffer.tell()
+    return (time.perf_counter() - inicio) / quantidade * 1000, total_bytes / quantidade
+
+
+def template_compilado(quantidade, matriz):
+    inicio = time.perf_counter()
+    total_bytes = 0
+    for i in range(quantidade):
+        total_bytes += len(convite_service.renderizar_convite_pdf(EVENTO, {"nome": f"Convidado {i}"}, matriz_qrcode=matriz))
+    return (time.perf_counter() - inicio) / quantidade * 1000, total_bytes / quantidade
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    # A matriz é a mesma para todos: o objetivo é medir só o desenho da página
+    matriz = qrcode_service.gerar_matriz_qrcode("Evento: Conferência\nConvidado: Fulano\nID Convidado: 1")
+
+    print(f"Convites: {quantidade}")
+    ms_sem, bytes_sem = canvas_por_convidado(quantidade, matriz, usar_template=False)
+    print(f"Sem template:        {ms_sem:.3f} ms/convite, {bytes_sem:.0f} bytes/convite")
+    for nome, (ms, tamanho) in (
+        ("Canvas com template", canvas_por_convidado(quantidade, matriz, usar_template=True)),
+        ("Template compilado", template_compilado(quantidade, matriz)),
+    ):
+        print(f"{nome + ':':<20} {ms:.3f} ms/convite, {tamanho:.0f} bytes/convite, speedup {ms_sem / ms:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
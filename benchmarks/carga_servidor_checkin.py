@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""Teste de carga do servidor de check-in com muitos leitores simultâneos.
+
+Cria um banco temporário com um evento e seus convidados, sobe
+servicos/servidor_checkin.py num processo separado e simula leitores, cada um
+com a própria conexão keep-alive, fazendo check-ins (com token assinado) e,
+a cada CONSULTAS_A_CADA leituras, uma consulta de presença do evento.
+Reporta vazão e latência (p50/p99) por tipo de requisição.
+
+Uso:
+    python benchmarks/carga_servidor_checkin.py [leitores] [requisicoes_por_leitor]
+"""
+import asyncio
+import json
+import os
+import secrets
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, RAIZ)
+
+# Chave de assinatura só deste teste, herdada pelo processo do servidor
+os.environ["CONVITE_CHAVE_TOKENS"] = secrets.token_hex(32)
+
+from db import conexao as db_conexao
+from servicos.verificador_tokens import codificar_token, obter_chave
+
+CONSULTAS_A_CADA = 10
+
+
+def preparar_banco(caminho, quantidade):
+    db_conexao.DB_PATH = caminho
+    db_conexao.inicializar_banco()
+    with db_conexao.obter_conexao() as conexao:
+        evento_id = conexao.execute("INSERT INTO eventos (nome) VALUES ('Carga')").lastrowid
+        conexao.executemany(
+            "INSERT INTO convidados (evento_id, nome, token) VALUES (?, ?, ?)",
+            ((evento_id, f"Convidado {i}", f"t{i}") for i in range(quantidade)),
+        )
+        conexao.commit()
+        ids = [row[0] for row in conexao.execute("SELECT id FROM convidados ORDER BY id")]
+    db_conexao.fechar_conexoes_pool()
+    chave = obter_chave()
+    return evento_id, [codificar_token(chave, evento_id, convidado_id) for convidado_id in ids]
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def aguardar_servidor(porta, limite=20):
+    fim = time.monotonic() + limite
+    while time.monotonic() < fim:
+        try:
+            _, escritor = await asyncio.open_connection("127.0.0.1", porta)
+            escritor.close()
+            return True
+        except OSError:
+            await asyncio.sleep(0.1)
+    return False
+
+
+async def requisicao(leitor, escritor, metodo, caminho, dados=None):
+    corpo = json.dumps(dados).encode() if dados is not None else b""
+    escritor.write(
+        f"{metodo} {caminho} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(corpo)}\r\n\r\n".encode() + corpo
+    )
+    cabecalho = await leitor.readuntil(b"\r\n\r\n")
+    status = int(cabecalho.split(b" ", 2)[1])
+    tamanho = 0
+    for linha in cabecalho.split(b"\r\n"):
+        if linha.lower().startswith(b"content-length:"):
+            tamanho = int(linha.split(b":", 1)[1])
+    return status, json.loads(await leitor.readexactly(tamanho))
+
+
+async def leitor_simulado(porta, evento_id, tokens, latencias, contagem):
+    leitor, escritor = await asyncio.open_connection("127.0.0.1", porta)
+    try:
+        for numero, token in enumerate(tokens, start=1):
+            inicio = time.perf_counter()
+            status, resposta = await requisicao(leitor, escritor, "POST", "/checkin",
+                                                {"conteudo": token, "evento_id": evento_id})
+            latencias["checkin"].append(time.perf_counter() - inicio)
+            chave = resposta.get("status") if status == 200 else f"http_{status}"
+            contagem[chave] = contagem.get(chave, 0) + 1
+            if numero % CONSULTAS_A_CADA == 0:
+                inicio = time.perf_counter()
+                await requisicao(leitor, escritor, "GET", f"/eventos/{evento_id}/presenca")
+                latencias["presenca"].append(time.perf_counter() - inicio)
+    finally:
+        escritor.close()
+
+
+def percentil(valores, fracao):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * fracao))] * 1000 if valores else 0.0
+
+
+async def executar_carga(porta, evento_id, tokens, leitores, por_leitor):
+    latencias = {"checkin": [], "presenca": []}
+    contagem = {}
+    inicio = time.perf_counter()
+    await asyncio.gather(*(
+        leitor_simulado(porta, evento_id, tokens[i * por_leitor:(i + 1) * por_leitor], latencias, contagem)
+        for i in range(leitores)
+    ))
+    duracao = time.perf_counter() - inicio
+
+    leitor, escritor = await asyncio.open_connection("127.0.0.1", porta)
+    _, metricas = await requisicao(leitor, escritor, "GET", "/metricas")
+    _, presenca = await requisicao(leitor, escritor, "GET", f"/eventos/{evento_id}/presenca")
+    escritor.close()
+
+    total = sum(len(valores) for valores in latencias.values())
+    print(f"{leitores} leitores, {total} requisições em {duracao:.2f}s ({total / duracao:.0f} req/s)")
+    for tipo, valores in latencias.items():
+        print(f"  {tipo:9s} n={len(valores):6d}  p50={percentil(valores, 0.50):7.2f} ms  "
+              f"p99={percentil(valores, 0.99):7.2f} ms")
+    print(f"  resultados: {contagem}")
+    print(f"  presença final: {presenca['presente']}/{presenca['total']}")
+    print(f"  gravador: {metricas['lotes']} lotes, lote médio {metricas['lote_medio']:.1f}, "
+          f"flush p50/p99 {metricas['flush_p50_ms']:.2f}/{metricas['flush_p99_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    leitores = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    por_leitor = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho_banco = os.path.join(diretorio, "carga.sqlite")
+        evento_id, tokens = preparar_banco(caminho_banco, leitores * por_leitor)
+        porta = porta_livre()
+        servidor = subprocess.Popen(
+            [sys.executable, os.path.join(RAIZ, "servicos", "servidor_checkin.py"),
+             "--porta", str(porta), "--banco", caminho_banco],
+            stdout=subprocess.DEVNULL,
+        )
+        try:
+            async def principal():
+                if not await aguardar_servidor(porta):
+                    print("O servidor de check-in não respondeu.")
+                    return
+                await executar_carga(porta, evento_id, tokens, leitores, por_leitor)
+            asyncio.run(principal())
+        finally:
+            servidor.terminate()
+            servidor.wait()
@@ -0,0 +1,332 @@
+# -*- coding: utf-8 -*-
+"""Suíte de benchmarks das operações de convidados, QR Codes e convites.
+
+Para cada tamanho (padrão: 1 mil, 100 mil e 1 milhão de convidados) a suíte
+gera um banco sintético, com os convidados distribuídos em eventos de até
+CONVIDADOS_POR_EVENTO, mais um evento pequeno (CONVIDADOS_GERACAO) usado nas
+gerações em lote de QR Codes e convites. Os bancos gerados ficam guardados em
+--dir-bancos e são reaproveitados nas próximas execuções; cada execução mede
+sobre uma cópia, então o banco base não muda.
+
+Mede as operações individuais (criar_convidado, buscar_convidado_por_id,
+atualizar_convidado, gerar_qrcode, gerar_convite_pdf), as listagens e as
+versões em lote (criar_convidados_em_lote, gerar_qrcodes_evento, PDF único e
+pipeline de convites). A saída das próprias funções é descartada durante as
+medições.
+
+Os resultados (mediana, p95, mínimo e vazão por operação) são gravados em
+JSON. Com --comparar, cada operação é comparada com a mesma operação de uma
+execução anterior, e a suíte termina com código 1 se alguma mediana piorou
+mais que --limite (fração: 0.2 = 20%).
+
+Uso:
+    python benchmarks/suite.py [--tamanhos 1000,100000,1000000] [--saida resultados.json]
+                               [--comparar base.json] [--limite 0.2] [--repeticoes 200]
+                               [--dir-bancos DIR]
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import secrets
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# Chave de assinatura só desta suíte (não cria dados/chave_tokens.key)
+os.environ.setdefault("CONVITE_CHAVE_TOKENS", secrets.token_hex(32))
+
+import registro_log
+from db import conexao as db_conexao
+from modelos import convidado as modelo_convidado
+from modelos import evento as modelo_evento
+from servicos import convite_service, pipeline_convites, qrcode_cache, qrcode_service
+
+FORMATO_RESULTADOS = 1
+TAMANHOS_PADRAO = (1000, 100000, 1000000)
+CONVIDADOS_POR_EVENTO = 10000
+CONVIDADOS_GERACAO = 200 # Convidados do evento usado nas gerações em lote
+CONVIDADOS_POR_LOTE = 1000 # Convidados por chamada de criar_convidados_em_lote
+LIMITE_LISTAGEM_COMPLETA = 100000 # listar_todos_convidados só até este tamanho (tudo em memória)
+LIMITE_REGRESSAO = 0.2
+TOLERANCIA_MS = 0.05 # Diferenças menores que isso não contam como regressão (ruído)
+SEMENTE = 12345
+
+
+def _caminho_base(diretorio, tamanho):
+    return os.path.join(diretorio, f"base_{tamanho}.sqlite")
+
+
+def gerar_banco(caminho, tamanho):
+    """Cria o banco sintético com `tamanho` convidados (mais os do evento de geração)."""
+    db_conexao.fechar_conexoes_pool()
+    db_conexao.DB_PATH = caminho
+    db_conexao.inicializar_banco()
+    inicio = time.perf_counter()
+    with db_conexao.obter_conexao() as conexao:
+        eventos = max(1, -(-tamanho // CONVIDADOS_POR_EVENTO))
+        conexao.executemany(
+            "INSERT INTO eventos (nome, local, data, horario) VALUES (?, ?, ?, ?)",
+            ((f"Evento {i}", "Centro de Convenções", f"2030-{i % 12 + 1:02d}-{i % 28 + 1:02d}", "20:00")
+             for i in range(eventos)),
+        )
+        conexao.executemany(
+            "INSERT INTO convidados (evento_id, nome, email, telefone, token) VALUES (?, ?, ?, ?, ?)",
+            ((i // CONVIDADOS_POR_EVENTO + 1, f"Convidado {i}", f"convidado{i}@exemplo.com",
+              "(11) 98765-4321", f"t{i:011d}")
+             for i in range(tamanho)),
+        )
+        evento_geracao = conexao.execute(
+            "INSERT INTO eventos (nome, local, data, horario) VALUES ('Geração', 'Auditório', '2030-06-15', '19:00')"
+        ).lastrowid
+        conexao.executemany(
+            "INSERT INTO convidados (evento_id, nome, email, token) VALUES (?, ?, ?, ?)",
+            ((evento_geracao, f"Convidado Geração {i}", f"geracao{i}@exemplo.com", f"g{i:011d}")
+             for i in range(CONVIDADOS_GERACAO)),
+        )
+        conexao.commit()
+        conexao.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    db_conexao.fechar_conexoes_pool()
+    print(f"Banco sintético de {tamanho} convidados gerado em {time.perf_counter() - inicio:.1f}s.")
+
+
+def preparar_banco(dir_bancos, dir_trabalho, tamanho):
+    """Copia o banco base do tamanho (gerando-o se preciso) para o diretório de trabalho."""
+    base = _caminho_base(dir_bancos, tamanho)
+    if not os.path.exists(base):
+        gerar_banco(base, tamanho)
+    trabalho = os.path.join(dir_trabalho, f"trabalho_{tamanho}.sqlite")
+    for sufixo in ("", "-wal", "-shm"):
+        if os.path.exists(trabalho + sufixo):
+            os.remove(trabalho + sufixo)
+    shutil.copyfile(base, trabalho)
+    db_conexao.fechar_conexoes_pool()
+    db_conexao.DB_PATH = trabalho
+    db_conexao.inicializar_banco()
+    modelo_evento.invalidar_cache_evento()
+    with db_conexao.obter_conexao() as conexao:
+        evento_geracao = conexao.execute("SELECT MAX(id) FROM eventos").fetchone()[0]
+    return evento_geracao
+
+
+def estatisticas(tempos, itens, falhas=0):
+    """Resume os tempos (s) de cada repetição; `itens` é quantos itens cada repetição processa."""
+    ordenados = sorted(tempos)
+    mediana = statistics.median(ordenados)
+    p95 = ordenados[min(len(ordenados) - 1, round(0.95 * (len(ordenados) - 1)))]
+    return {
+        "repeticoes": len(ordenados),
+        "falhas": falhas,
+        "itens": itens,
+        "mediana_ms": mediana * 1000,
+        "p95_ms": p95 * 1000,
+        "min_ms": ordenados[0] * 1000,
+        "media_ms": statistics.fmean(ordenados) * 1000,
+        "itens_por_segundo": itens / mediana if mediana > 0 else 0.0,
+    }
+
+
+def medir(funcao, argumentos, itens=1):
+    """Chama funcao(*args) para cada tupla de `argumentos`, descartando o que ela imprime.
+
+    Chamadas que retornam None, False ou uma registro_log.Falha (os modos como
+    as funções do projeto sinalizam erro) são contadas como falhas.
+    """
+    tempos = []
+    falhas = 0
+    with open(os.devnull, "w") as silencio, contextlib.redirect_stdout(silencio):
+        for args in argumentos:
+            inicio = time.perf_counter()
+            resultado = funcao(*args)
+            tempos.append(time.perf_counter() - inicio)
+            falhas += resultado is None or resultado is False or isinstance(resultado, registro_log.Falha)
+    return estatisticas(tempos, itens, falhas)
+
+
+def _esgotar(iteravel):
+    quantidade = 0
+    for _ in iteravel:
+        quantidade += 1
+    return quantidade
+
+
+def medir_tamanho(tamanho, evento_geracao, repeticoes, aleatorio):
+    """Executa todas as operações no banco atual e retorna {operação: estatísticas}."""
+    resultados = {}
+    eventos = max(1, -(-tamanho // CONVIDADOS_POR_EVENTO))
+    with db_conexao.obter_conexao() as conexao:
+        amostra = [tuple(linha) for linha in conexao.execute(
+            "SELECT id, nome, email, telefone FROM convidados WHERE evento_id != ? ORDER BY random() LIMIT ?",
+            (evento_geracao, repeticoes),
+        )]
+    ids = [linha[0] for linha in amostra]
+    evento = modelo_evento.buscar_evento_por_id(evento_geracao)
+    convidados_geracao = modelo_convidado.listar_convidados_por_evento(evento_geracao)
+    rodada = time.time_ns()
+
+    # --- Operações individuais ---
+    resultados["criar_convidado"] = medir(modelo_convidado.criar_convidado, [
+        (aleatorio.randint(1, eventos), f"Novo {i}", f"novo{rodada}_{i}@exemplo.com", None)
+        for i in range(repeticoes)
+    ])
+    resultados["buscar_convidado_por_id"] = medir(modelo_convidado.buscar_convidado_por_id, [(i,) for i in ids])
+    resultados["atualizar_convidado"] = medir(modelo_convidado.atualizar_convidado, [
+        (convidado_id, f"{nome} Atualizado", email, telefone, "presente")
+        for convidado_id, nome, email, telefone in amostra
+    ])
+
+    geracao = convidados_geracao[:max(1, repeticoes // 4)]
+    conteudos = [(qrcode_service.montar_conteudo_qrcode(evento, c), c) for c in geracao]
+    resultados["gerar_qrcode"] = medir(qrcode_service.gerar_qrcode, [
+        (conteudo, f"bench_qr_{c['id']}", "dados", False) for conteudo, c in conteudos
+    ])
+    matrizes = [(qrcode_service.gerar_matriz_qrcode(conteudo), c) for conteudo, c in conteudos]
+    resultados["gerar_convite_pdf"] = medir(convite_service.gerar_convite_pdf, [
+        (evento, c, None, f"bench_convite_{c['id']}", matriz) for matriz, c in matrizes
+    ])
+
+    # --- Listagens ---
+    poucas = max(3, repeticoes // 40)
+    evento_principal = aleatorio.randint(1, eventos)
+    resultados["listar_eventos"] = medir(modelo_evento.listar_eventos, [()] * poucas)
+    resultados["listar_convidados_por_evento"] = medir(
+        modelo_convidado.listar_convidados_por_evento, [(evento_principal,)] * poucas,
+        itens=min(tamanho, CONVIDADOS_POR_EVENTO))
+    resultados["paginar_convidados"] = medir(
+        modelo_convidado.paginar_convidados, [(aleatorio.randint(1, eventos),) for _ in range(repeticoes)],
+        itens=modelo_convidado.TAMANHO_PAGINA_PADRAO)
+    resultados["buscar_convidados"] = medir(
+        modelo_convidado.buscar_convidados, [(f"convidado {aleatorio.randrange(tamanho)}",) for _ in range(repeticoes)])
+    resultados["iterar_convidados"] = medir(
+        lambda: _esgotar(modelo_convidado.iterar_convidados()), [()], itens=tamanho + CONVIDADOS_GERACAO)
+    if tamanho <= LIMITE_LISTAGEM_COMPLETA:
+        resultados["listar_todos_convidados"] = medir(
+            modelo_convidado.listar_todos_convidados, [()] * 3, itens=tamanho + CONVIDADOS_GERACAO)
+
+    # --- Versões em lote ---
+    resultados["criar_convidados_em_lote"] = medir(modelo_convidado.criar_convidados_em_lote, [
+        (aleatorio.randint(1, eventos), (
+            {"nome": f"Lote {r} {i}", "email": f"lote{rodada}_{r}_{i}@exemplo.com"}
+            for i in range(CONVIDADOS_POR_LOTE)))
+        for r in range(3)
+    ], itens=CONVIDADOS_POR_LOTE)
+    resultados["gerar_qrcodes_evento"] = medir(
+        qrcode_service.gerar_qrcodes_evento, [(evento_geracao, None, qrcode_service.TAMANHO_CHUNK_LOTE, False)],
+        itens=CONVIDADOS_GERACAO)
+    resultados["gerar_convites_evento_pdf_unico"] = medir(
+        convite_service.gerar_convites_evento_pdf_unico, [(evento_geracao,)], itens=CONVIDADOS_GERACAO)
+    resultados["pipeline_convites"] = medir(
+        pipeline_convites.gerar_convites_evento, [(evento_geracao,)], itens=CONVIDADOS_GERACAO)
+    return resultados
+
+
+def comparar(base, atual, limite):
+    """Compara as medianas com as de uma execução anterior; retorna a lista de regressões."""
+    regressoes = []
+    print(f"\n{'Tamanho':>8s} {'Operação':34s} {'Base (ms)':>11s} {'Atual (ms)':>11s} {'Variação':>9s}")
+    for tamanho, operacoes in atual["resultados"].items():
+        anteriores = base.get("resultados", {}).get(tamanho, {})
+        for operacao, medicao in operacoes.items():
+            anterior = anteriores.get(operacao)
+            if not anterior:
+                continue
+            antes, agora = anterior["mediana_ms"], medicao["mediana_ms"]
+            variacao = (agora - antes) / antes if antes > 0 else 0.0
+            regrediu = variacao > limite and agora - antes > TOLERANCIA_MS
+            marca = "  REGRESSÃO" if regrediu else ""
+            print(f"{tamanho:>8s} {operacao:34s} {antes:11.3f} {agora:11.3f} {variacao:+8.1%}{marca}")
+            if regrediu:
+                regressoes.append(f"{operacao} ({tamanho} convidados): {antes:.3f} ms -> {agora:.3f} ms ({variacao:+.1%})")
+    return regressoes
+
+
+def exibir(tamanho, resultados):
+    print(f"\n{tamanho} convidados")
+    print(f"  {'Operação':34s} {'Itens':>6s} {'Mediana (ms)':>13s} {'p95 (ms)':>10s} {'Itens/s':>11s}")
+    for operacao, medicao in resultados.items():
+        falhas = f"  ({medicao['falhas']} falhas)" if medicao["falhas"] else ""
+        print(f"  {operacao:34s} {medicao['itens']:6d} {medicao['mediana_ms']:13.3f} "
+              f"{medicao['p95_ms']:10.3f} {medicao['itens_por_segundo']:11.1f}{falhas}")
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(description="Suíte de benchmarks do sistema de convites.")
+    parser.add_argument("--tamanhos", default=",".join(map(str, TAMANHOS_PADRAO)),
+                        help="Quantidades de convidados dos bancos sintéticos, separadas por vírgula")
+    parser.add_argument("--repeticoes", type=int, default=200, help="Repetições das operações individuais")
+    parser.add_argument("--saida", default="resultados_benchmark.json", help="Arquivo JSON com os resultados")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior usado como base")
+    parser.add_argument("--limite", type=float, default=LIMITE_REGRESSAO,
+                        help="Piora máxima aceita na mediana, como fração (padrão 0.2 = 20%%)")
+    parser.add_argument("--dir-bancos", default=os.path.join(tempfile.gettempdir(), "convites_benchmarks"),
+                        help="Onde guardar (e reaproveitar) os bancos sintéticos")
+    return parser
+
+
+def main(argv=None):
+    args = criar_parser().parse_args(argv)
+    try:
+        tamanhos = [int(t) for t in args.tamanhos.split(",") if t.strip()]
+    except ValueError:
+        print(f"Erro: --tamanhos inválido: {args.tamanhos}")
+        return 2
+    base = None
+    if args.comparar:
+        try:
+            with open(args.comparar, encoding="utf-8") as arquivo:
+                base = json.load(arquivo)
+        except (OSError, ValueError) as e:
+            print(f"Erro ao ler a base de comparação \"{args.comparar}\": {e}")
+            return 2
+
+    os.makedirs(args.dir_bancos, exist_ok=True)
+    # As mensagens dos serviços passam pelo log como em produção, mas são descartadas
+    registro_log.configurar("INFO", saida=open(os.devnull, "w"))
+    atual = {
+        "formato": FORMATO_RESULTADOS,
+        "inicio": datetime.now().isoformat(timespec="seconds"),
+        "ambiente": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "parametros": {"repeticoes": args.repeticoes, "convidados_por_evento": CONVIDADOS_POR_EVENTO,
+                       "convidados_geracao": CONVIDADOS_GERACAO},
+        "resultados": {},
+    }
+    aleatorio = random.Random(SEMENTE)
+    with tempfile.TemporaryDirectory() as dir_trabalho:
+        # Arquivos gerados e cache de QR Codes ficam no diretório temporário
+        qrcode_service.QRCODE_DIR = os.path.join(dir_trabalho, "qrcodes")
+        convite_service.CONVITE_DIR = os.path.join(dir_trabalho, "convites")
+        qrcode_cache.CACHE_DIR = os.path.join(dir_trabalho, "cache_qrcode")
+        for tamanho in tamanhos:
+            evento_geracao = preparar_banco(args.dir_bancos, dir_trabalho, tamanho)
+            resultados = medir_tamanho(tamanho, evento_geracao, args.repeticoes, aleatorio)
+            db_conexao.fechar_conexoes_pool()
+            atual["resultados"][str(tamanho)] = resultados
+            exibir(tamanho, resultados)
+
+    with open(args.saida, "w", encoding="utf-8") as arquivo:
+        json.dump(atual, arquivo, ensure_ascii=False, indent=2)
+    print(f"\nResultados gravados em {args.saida}.")
+
+    if base is None:
+        return 0
+    regressoes = comparar(base, atual, args.limite)
+    for regressao in regressoes:
+        print(f"FALHA - {regressao}")
+    return 1 if regressoes else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
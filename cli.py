@@ -0,0 +1,424 @@
+# -*- coding: utf-8 -*-
+"""Modo de linha de comando (não interativo) do sistema de convites.
+
+Usado por main.py quando recebe argumentos, para rodar em cron, scripts e
+pipelines: nada é perguntado, a tela não é limpa e os dados saem em stdout
+como tabela, JSON ou CSV. Mensagens dos modelos e serviços vão para stderr
+pelo log (registro_log), para não se misturarem com a saída; as operações em
+lote registram só o progresso agregado (taxa, ETA e erros), e os erros de cada
+item saem na própria saída, na coluna "erro".
+
+Exemplos:
+    python main.py eventos criar --nome "Festa" --data 20-12-2030 --horario 20:00
+    python main.py eventos listar --formato json
+    python main.py convidados importar --evento 1 convidados.csv
+    python main.py convidados listar --evento 1 --formato csv > convidados.csv
+    python main.py convites gerar --evento 1 --workers 4
+    python main.py --nivel-log WARNING --arquivo-log convites.log convites gerar --evento 1 --tipo todos
+    python main.py checkin --evento 1 < leituras.txt
+    python main.py jobs enfileirar --evento 1 && python main.py jobs worker --processos 4
+
+Código de saída: 0 em caso de sucesso, 1 se a operação falhar e 2 para
+argumentos inválidos.
+"""
+import argparse
+import contextlib
+import csv
+import io
+import json
+import logging
+import os
+import sys
+from collections import deque
+from datetime import datetime
+
+import registro_log
+from db import conexao as db_conexao
+
+FORMATOS = ("tabela", "json", "csv")
+# Check-ins aguardando a gravação em lote antes de a saída ser escrita (memória constante)
+JANELA_CHECKIN = 1024
+
+logger = logging.getLogger(__name__)
+
+
+# --- Saída ---
+
+def _valor_texto(valor):
+    if valor is None:
+        return ""
+    if hasattr(valor, "isoformat"):
+        return valor.isoformat()
+    return str(valor)
+
+
+def emitir(registros, colunas, formato, saida):
+    """Escreve os registros em saida à medida que são produzidos (sem montar listas).
+
+    Args:
+        registros (iterable): Dicts ou registros do modelo (acesso por chave).
+        colunas (tuple): Trios (chave, título na tabela, largura na tabela).
+        formato (str): 'tabela', 'json' (lista, um objeto por linha) ou 'csv'.
+        saida: Arquivo de texto de destino.
+
+    Returns:
+        int: Quantidade de registros escritos.
+    """
+    chaves = [chave for chave, _, _ in colunas]
+    quantidade = 0
+    if formato == "csv":
+        escritor = csv.writer(saida)
+        escritor.writerow(chaves)
+        for registro in registros:
+            escritor.writerow([_valor_texto(registro.get(chave)) for chave in chaves])
+            quantidade += 1
+    elif formato == "json":
+        saida.write("[")
+        for registro in registros:
+            objeto = {chave: registro.get(chave) for chave in chaves}
+            saida.write(("\n" if quantidade == 0 else ",\n")
+                        + json.dumps(objeto, ensure_ascii=False, default=_valor_texto))
+            quantidade += 1
+        saida.write("\n]\n" if quantidade else "]\n")
+    else:
+        linha = " ".join(f"{{:<{largura}.{largura}}}" for _, _, largura in colunas)
+        saida.write(linha.format(*(titulo for _, titulo, _ in colunas)) + "\n")
+        saida.write("-" * (sum(largura for _, _, largura in colunas) + len(colunas) - 1) + "\n")
+        for registro in registros:
+            saida.write(linha.format(*(_valor_texto(registro.get(chave)) for chave in chaves)) + "\n")
+            quantidade += 1
+    return quantidade
+
+
+def _avisar(mensagem, nivel=logging.INFO):
+    # Pelo log, para não se intercalar em stderr com as mensagens dos serviços
+    logger.log(nivel, mensagem)
+
+
+def _data(texto):
+    """Aceita DD-MM-AAAA (como o menu) ou AAAA-MM-DD."""
+    for formato in ("%d-%m-%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(texto, formato).date()
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"data inválida: {texto} (use DD-MM-AAAA)")
+
+
+def _horario(texto):
+    try:
+        return datetime.strptime(texto, "%H:%M").time()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"horário inválido: {texto} (use HH:MM)")
+
+
+# --- Comandos ---
+
+COLUNAS_EVENTO = (("id", "ID", 6), ("nome", "Nome", 30), ("local", "Local", 20), ("data", "Data", 10),
+                  ("horario", "Hora", 8), ("total_convidados", "Conv.", 6), ("presentes", "Pres.", 6),
+                  ("pendentes", "Pend.", 6), ("ausentes", "Aus.", 6))
+COLUNAS_CONVIDADO = (("id", "ID", 8), ("evento_id", "Evento", 6), ("nome", "Nome", 30), ("email", "E-mail", 30),
+                     ("telefone", "Telefone", 16), ("status_presenca", "Status", 10), ("nome_evento", "Nome Evento", 20))
+COLUNAS_IMPORTACAO = (("linha", "Linha", 8), ("situacao", "Situação", 10), ("nome", "Nome", 30),
+                      ("email", "E-mail", 30), ("motivo", "Motivo", 40))
+COLUNAS_CONVITE = (("convidado_id", "Convidado", 10), ("arquivo", "Arquivo", 60), ("erro", "Erro", 40))
+COLUNAS_CHECKIN = (("leitura", "Leitura", 8), ("status", "Status", 16), ("convidado_id", "Convidado", 10),
+                   ("nome", "Nome", 30), ("checkins", "Leituras", 8))
+
+
+def cmd_eventos_criar(args, saida):
+    from modelos import evento as modelo_evento
+
+    evento_id = modelo_evento.criar_evento(args.nome, args.local, args.data, args.horario, args.descricao)
+    if not evento_id:
+        return 1
+    # Pela listagem, que traz os contadores (zerados) de evento_stats
+    emitir(modelo_evento.listar_eventos(evento_id), COLUNAS_EVENTO, args.formato, saida)
+    return 0
+
+
+def cmd_eventos_listar(args, saida):
+    from modelos import evento as modelo_evento
+
+    emitir(modelo_evento.listar_eventos(), COLUNAS_EVENTO, args.formato, saida)
+    return 0
+
+
+def cmd_convidados_listar(args, saida):
+    from modelos import convidado as modelo_convidado
+
+    # Página a página: a memória não cresce com o número de convidados
+    emitir(modelo_convidado.iterar_convidados(args.evento), COLUNAS_CONVIDADO, args.formato, saida)
+    return 0
+
+
+def cmd_convidados_importar(args, saida):
+    from servicos import importacao_service
+
+    relatorio = importacao_service.importar_convidados_csv(args.arquivo, args.evento)
+    if relatorio is None:
+        return 1
+    linhas = [dict(item, situacao="duplicado", motivo="e-mail duplicado") for item in relatorio["duplicados"]]
+    linhas += [dict(item, situacao="invalido") for item in relatorio["invalidos"]]
+    if args.todas:
+        linhas += [dict(item, situacao="inserido") for item in relatorio["inseridos"]]
+    linhas.sort(key=lambda item: item["linha"])
+    emitir(linhas, COLUNAS_IMPORTACAO, args.formato, saida)
+    _avisar(f"Inseridos: {len(relatorio['inseridos'])}, duplicados: {len(relatorio['duplicados'])}, "
+            f"inválidos: {len(relatorio['invalidos'])}.")
+    return 0
+
+
+def cmd_convites_gerar(args, saida):
+    if args.tipo == "qrcodes":
+        from servicos import qrcode_service
+        resultado = qrcode_service.gerar_qrcodes_evento(args.evento, workers=args.workers)
+        if resultado is None:
+            return 1
+        linhas = [{"convidado_id": cid, "arquivo": caminho, "erro": None}
+                  for cid, caminho in resultado["gerados"].items()]
+        linhas += [{"convidado_id": cid, "arquivo": None, "erro": erro}
+                   for cid, erro in resultado["erros"].items()]
+    elif args.tipo == "pdf-unico":
+        from servicos import convite_service
+        if args.por_folha not in convite_service.LAYOUTS_POR_FOLHA:
+            opcoes = "/".join(str(n) for n in convite_service.LAYOUTS_POR_FOLHA)
+            _avisar(f"Erro: --por-folha deve ser um de {opcoes}.", logging.ERROR)
+            return 2
+        resultado = convite_service.gerar_convites_evento_pdf_unico(args.evento, por_folha=args.por_folha)
+        if resultado is None:
+            return 1
+        linhas = [{"convidado_id": None, "arquivo": resultado["caminho"], "erro": None}]
+        linhas += [{"convidado_id": cid, "arquivo": None, "erro": erro}
+                   for cid, erro in resultado["erros"].items()]
+    elif args.tipo == "todos":
+        from servicos import pipeline_convites
+        resultado = pipeline_convites.gerar_convites_evento(
+            args.evento, workers_qrcode=args.workers, workers_pdf=args.workers)
+        if resultado is None:
+            return 1
+        tabela = io.StringIO()
+        with contextlib.redirect_stdout(tabela):
+            pipeline_convites.exibir_estagios(resultado["estagios"])
+        _avisar(tabela.getvalue().rstrip("\n"))
+        linhas = [{"convidado_id": cid, "arquivo": None, "erro": erro}
+                  for cid, erro in resultado["erros"].items()]
+    else:
+        from servicos import sincronizacao_service
+        resultado = sincronizacao_service.sincronizar_convites(args.evento)
+        if resultado is None:
+            return 1
+        linhas = [{"convidado_id": cid, "arquivo": None, "erro": f"{tipo}: {erro}"}
+                  for (cid, tipo), erro in resultado["erros"].items()]
+    emitir(linhas, COLUNAS_CONVITE, args.formato, saida)
+    return 1 if resultado["erros"] else 0
+
+
+def _ler_leituras(args):
+    if args.conteudos:
+        yield from args.conteudos
+        return
+    for linha in sys.stdin:
+        linha = linha.strip()
+        if linha:
+            yield linha
+
+
+def _resultado_checkin(numero, resultado):
+    convidado = resultado.get("convidado") or {}
+    return {
+        "leitura": numero,
+        "status": resultado["status"],
+        "convidado_id": convidado.get("id"),
+        "nome": convidado.get("nome"),
+        "checkins": resultado.get("checkins"),
+    }
+
+
+def _checkins_em_lote(leituras, evento_id, contagem):
+    """Envia as leituras ao GravadorCheckin e devolve os resultados na ordem de leitura."""
+    from servicos import checkin_service
+    from servicos.gravador_checkin import GravadorCheckin
+
+    pendentes = deque()
+    with GravadorCheckin() as gravador:
+        for numero, conteudo in enumerate(leituras, start=1):
+            pendentes.append((numero, checkin_service.enviar_checkin(conteudo, evento_id, gravador)))
+            while len(pendentes) > JANELA_CHECKIN or (pendentes and pendentes[0][1].done()):
+                numero_pendente, futuro = pendentes.popleft()
+                yield _contar(contagem, _resultado_checkin(numero_pendente, futuro.result()))
+        while pendentes:
+            numero_pendente, futuro = pendentes.popleft()
+            yield _contar(contagem, _resultado_checkin(numero_pendente, futuro.result()))
+
+
+def _contar(contagem, linha):
+    contagem[linha["status"]] = contagem.get(linha["status"], 0) + 1
+    return linha
+
+
+def cmd_checkin(args, saida):
+    contagem = {}
+    emitir(_checkins_em_lote(_ler_leituras(args), args.evento, contagem), COLUNAS_CHECKIN, args.formato, saida)
+    _avisar("Check-ins: " + (", ".join(f"{status}={total}" for status, total in sorted(contagem.items())) or "nenhuma leitura"))
+    return 1 if contagem.get("erro") else 0
+
+
+COLUNAS_PROGRESSO = (("evento_id", "Evento", 6), ("total", "Total", 8), ("pendente", "Pend.", 8),
+                     ("executando", "Exec.", 8), ("concluido", "Concl.", 8), ("falhou", "Falhou", 8),
+                     ("retentativas", "Retent.", 8), ("percentual", "%", 6))
+COLUNAS_JOB = (("id", "ID", 8), ("tipo", "Tipo", 8), ("evento_id", "Evento", 6), ("convidado_id", "Convidado", 10),
+               ("status", "Status", 10), ("tentativas", "Tent.", 5), ("dono", "Worker", 20), ("erro", "Erro", 40))
+
+
+def cmd_jobs_enfileirar(args, saida):
+    from modelos import job as modelo_job
+
+    criados = modelo_job.enfileirar_convites_evento(args.evento)
+    if criados is None:
+        return 1
+    _avisar(f"{criados} job(s) de convite enfileirado(s) para o evento ID {args.evento}.")
+    return cmd_jobs_progresso(args, saida)
+
+
+def cmd_jobs_progresso(args, saida):
+    from modelos import job as modelo_job
+
+    progresso = modelo_job.progresso_jobs(args.evento)
+    if progresso is None:
+        return 1
+    emitir([dict(progresso, evento_id=args.evento)], COLUNAS_PROGRESSO, args.formato, saida)
+    return 0
+
+
+def cmd_jobs_listar(args, saida):
+    from modelos import job as modelo_job
+
+    emitir(modelo_job.listar_jobs(args.evento, args.status, args.limite), COLUNAS_JOB, args.formato, saida)
+    return 0
+
+
+def cmd_jobs_reprocessar(args, saida):
+    from modelos import job as modelo_job
+
+    reenfileirados = modelo_job.reenfileirar_falhos(args.evento)
+    if reenfileirados is None:
+        return 1
+    _avisar(f"{reenfileirados} job(s) com falha voltaram para a fila.")
+    return cmd_jobs_progresso(args, saida)
+
+
+def cmd_jobs_worker(args, saida):
+    from servicos import worker_jobs
+
+    resumo = worker_jobs.executar_workers(args.processos, args.lote or worker_jobs.LOTE_RESERVA,
+                                          args.lease or worker_jobs.LEASE_SEGUNDOS, args.continuo)
+    emitir([resumo], (("concluidos", "Concluídos", 10), ("falhas", "Falhas", 8), ("duracao", "Segundos", 10)),
+           args.formato, saida)
+    return 1 if resumo["falhas"] else 0
+
+
+# --- Argumentos ---
+
+def criar_parser():
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description="Sistema de convites com QR Code (modo não interativo). Sem argumentos, main.py abre o menu.",
+    )
+    parser.add_argument("--banco", help="Arquivo SQLite (padrão: o configurado em db/conexao.py)")
+    parser.add_argument("--nivel-log", choices=registro_log.NIVEIS,
+                        help="Mensagens mostradas em stderr (padrão: CONVITE_LOG_NIVEL ou INFO; "
+                             "DEBUG inclui uma linha por item nas operações em lote)")
+    parser.add_argument("--arquivo-log", help="Grava também as mensagens neste arquivo (padrão: CONVITE_LOG_ARQUIVO)")
+    comum = argparse.ArgumentParser(add_help=False)
+    comum.add_argument("--formato", choices=FORMATOS, default="tabela", help="Formato da saída (padrão: tabela)")
+    grupos = parser.add_subparsers(dest="grupo", metavar="comando", required=True)
+
+    eventos = grupos.add_parser("eventos", help="Criar e listar eventos").add_subparsers(dest="acao", required=True)
+    criar = eventos.add_parser("criar", parents=[comum], help="Cria um evento")
+    criar.add_argument("--nome", required=True)
+    criar.add_argument("--local")
+    criar.add_argument("--data", type=_data, help="DD-MM-AAAA")
+    criar.add_argument("--horario", type=_horario, help="HH:MM")
+    criar.add_argument("--descricao")
+    criar.set_defaults(funcao=cmd_eventos_criar)
+    eventos.add_parser("listar", parents=[comum], help="Lista os eventos").set_defaults(funcao=cmd_eventos_listar)
+
+    convidados = grupos.add_parser("convidados", help="Importar e listar convidados").add_subparsers(dest="acao", required=True)
+    importar = convidados.add_parser("importar", parents=[comum], help="Importa convidados de um CSV (uma transação)")
+    importar.add_argument("--evento", type=int, required=True)
+    importar.add_argument("--todas", action="store_true", help="Lista também as linhas inseridas, não só as recusadas")
+    importar.add_argument("arquivo", help="CSV com as colunas nome, email, telefone, status_presenca")
+    importar.set_defaults(funcao=cmd_convidados_importar)
+    listar = convidados.add_parser("listar", parents=[comum], help="Lista os convidados (todos ou de um evento)")
+    listar.add_argument("--evento", type=int)
+    listar.set_defaults(funcao=cmd_convidados_listar)
+
+    convites = grupos.add_parser("convites", help="Gerar convites").add_subparsers(dest="acao", required=True)
+    gerar = convites.add_parser("gerar", parents=[comum], help="Gera os convites de um evento")
+    gerar.add_argument("--evento", type=int, required=True)
+    gerar.add_argument("--tipo", choices=("individuais", "todos", "qrcodes", "pdf-unico"), default="individuais",
+                       help="individuais: QR Code e PDF por convidado, só os desatualizados (padrão); "
+                            "todos: o PDF de todos os convidados, pelo pipeline em streaming; "
+                            "qrcodes: apenas os PNGs, em paralelo; pdf-unico: um PDF para impressão")
+    gerar.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                       help="Processos para codificar os QR Codes (tipo qrcodes) e por estágio do pipeline (tipo todos)")
+    gerar.add_argument("--por-folha", type=int, default=1, help="Convites por folha (tipo pdf-unico)")
+    gerar.set_defaults(funcao=cmd_convites_gerar)
+
+    checkin = grupos.add_parser("checkin", parents=[comum],
+                                help="Registra check-ins (conteúdos nos argumentos ou um por linha em stdin)")
+    checkin.add_argument("--evento", type=int, required=True)
+    checkin.add_argument("conteudos", nargs="*", metavar="conteudo", help="Conteúdo lido do QR Code")
+    checkin.set_defaults(funcao=cmd_checkin)
+
+    from modelos.job import STATUS_JOB
+    jobs = grupos.add_parser("jobs", help="Fila de geração de convites em segundo plano").add_subparsers(dest="acao", required=True)
+    enfileirar = jobs.add_parser("enfileirar", parents=[comum], help="Enfileira os convites de um evento")
+    enfileirar.add_argument("--evento", type=int, required=True)
+    enfileirar.set_defaults(funcao=cmd_jobs_enfileirar)
+    progresso = jobs.add_parser("progresso", parents=[comum], help="Quantidade de jobs por status")
+    progresso.add_argument("--evento", type=int)
+    progresso.set_defaults(funcao=cmd_jobs_progresso)
+    listar_jobs = jobs.add_parser("listar", parents=[comum], help="Lista os jobs mais recentes")
+    listar_jobs.add_argument("--evento", type=int)
+    listar_jobs.add_argument("--status", choices=STATUS_JOB)
+    listar_jobs.add_argument("--limite", type=int, default=100)
+    listar_jobs.set_defaults(funcao=cmd_jobs_listar)
+    reprocessar = jobs.add_parser("reprocessar", parents=[comum], help="Devolve os jobs com falha à fila")
+    reprocessar.add_argument("--evento", type=int)
+    reprocessar.set_defaults(funcao=cmd_jobs_reprocessar)
+    worker = jobs.add_parser("worker", parents=[comum], help="Processa a fila até esvaziar")
+    worker.add_argument("--processos", type=int, default=1)
+    # Padrões de servicos/worker_jobs.py, importado só ao executar o worker
+    worker.add_argument("--lote", type=int, help="Jobs reservados por vez")
+    worker.add_argument("--lease", type=float, help="Segundos de cada reserva")
+    worker.add_argument("--continuo", action="store_true", help="Não encerra quando a fila esvazia")
+    worker.set_defaults(funcao=cmd_jobs_worker)
+    return parser
+
+
+def executar(argv=None):
+    """Interpreta os argumentos e executa o comando. Retorna o código de saída."""
+    args = criar_parser().parse_args(argv)
+    if args.banco:
+        db_conexao.DB_PATH = os.path.abspath(args.banco)
+    saida = sys.stdout
+    # Mensagens dos modelos e serviços vão para stderr, escritas pela thread do log
+    registro_log.configurar(args.nivel_log, saida=sys.stderr, arquivo=args.arquivo_log)
+    # O que ainda for impresso (ex.: a tabela de estágios do pipeline) também vai para stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        db_conexao.inicializar_banco()
+        try:
+            codigo = args.funcao(args, saida)
+            saida.flush()
+            return codigo
+        except BrokenPipeError:
+            # Saída fechada antes do fim (ex.: | head): descarta o restante em vez
+            # de falhar de novo quando o Python esvaziar o stdout ao sair
+            os.dup2(os.open(os.devnull, os.O_WRONLY), saida.fileno())
+            return 0
+
+
+if __name__ == "__main__":
+    sys.exit(executar())
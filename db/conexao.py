@@ -1,26 +1,68 @@
 # -*- coding: utf-8 -*-
 import sqlite3
 import os
+import sys
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+
+# Permite executar o arquivo diretamente (python db/conexao.py)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from db.migracoes import aplicar_migracoes, VERSAO_ATUAL
+from instrumentacao import instrumentar_modulo
+
+logger = logging.getLogger(__name__)
 
 # Define o nome do arquivo do banco de dados SQLite
 DB_NAME = "convites_db.sqlite"
 DB_PATH = os.path.join("/db", DB_NAME)
 
+# PRAGMAs aplicados uma única vez a cada nova conexão
+PRAGMAS = (
+    ("foreign_keys", "ON"),          # Importante para ON DELETE CASCADE
+    # Leitores não bloqueiam o escritor. O WAL usa memória compartilhada e só
+    # funciona entre processos da mesma máquina: com o banco numa montagem de
+    # rede usada por várias máquinas, defina CONVITE_SQLITE_JOURNAL=DELETE
+    ("journal_mode", os.environ.get("CONVITE_SQLITE_JOURNAL", "WAL")),
+    ("synchronous", "NORMAL"),       # Seguro com WAL e evita um fsync por commit
+    ("busy_timeout", "5000"),        # Espera (ms) pelo lock em vez de falhar de imediato
+    ("mmap_size", str(256 * 1024 * 1024)),
+    ("cache_size", str(-64 * 1024)), # Valor negativo = tamanho em KiB (64 MiB)
+    ("temp_store", "MEMORY"),
+)
+
+# Pool de conexões: uma conexão reutilizável por thread (sqlite3 não permite
+# compartilhar o mesmo objeto de conexão entre threads por padrão)
+_pool_local = threading.local()
+_pool_conexoes = []
+_pool_lock = threading.Lock()
+_pool_geracao = 0 # Incrementada ao fechar o pool, invalidando as conexões das threads
+
+def _configurar_conexao(conexao):
+    """Aplica row_factory e os PRAGMAs de desempenho a uma conexão recém-aberta."""
+    # Para retornar dicionários em vez de tuplas (opcional, mas útil)
+    conexao.row_factory = sqlite3.Row
+    for pragma, valor in PRAGMAS:
+        conexao.execute(f"PRAGMA {pragma} = {valor};")
+
 def criar_conexao():
-    """Cria e retorna uma conexão com o banco de dados SQLite."""
+    """Cria e retorna uma nova conexão (fora do pool) com o banco de dados SQLite."""
     conexao = None
     try:
         # Garante que o diretório de dados exista
         os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-        conexao = sqlite3.connect(DB_PATH)
-        # Para retornar dicionários em vez de tuplas (opcional, mas útil)
-        conexao.row_factory = sqlite3.Row
-        # Habilita chaves estrangeiras (importante para ON DELETE CASCADE)
-        conexao.execute("PRAGMA foreign_keys = ON;")
+        # check_same_thread=False apenas para permitir fechar o pool a partir de
+        # outra thread; cada conexão do pool continua sendo usada por uma só thread
+        conexao = sqlite3.connect(DB_PATH, check_same_thread=False)
+        _configurar_conexao(conexao)
         # print(f"Conexão com o banco de dados SQLite 	\" {DB_PATH}	\" estabelecida.")
         return conexao
     except sqlite3.Error as e:
-        print(f"Erro ao conectar ao SQLite: {e}")
+        logger.error("Erro ao conectar ao SQLite: %s", e)
+        if conexao:
+            conexao.close()
         return None
 
 def fechar_conexao(conexao):
@@ -29,49 +71,91 @@ def fechar_conexao(conexao):
         conexao.close()
         # print("Conexão com o SQLite fechada.")
 
-def inicializar_banco():
-    """Cria as tabelas no banco de dados SQLite se não existirem."""
+def _conexao_da_thread():
+    """Retorna a conexão do pool da thread atual, abrindo-a na primeira chamada."""
+    conexao = getattr(_pool_local, "conexao", None)
+    # Após um fork (ex: ProcessPoolExecutor) a conexão herdada não pode ser reutilizada
+    if (conexao is not None and _pool_local.pid == os.getpid()
+            and _pool_local.geracao == _pool_geracao):
+        return conexao
     conexao = criar_conexao()
+    if conexao:
+        _pool_local.conexao = conexao
+        _pool_local.pid = os.getpid()
+        _pool_local.geracao = _pool_geracao
+        _pool_local.profundidade = 0
+        with _pool_lock:
+            _pool_conexoes.append(conexao)
+    return conexao
+
+@contextmanager
+def obter_conexao():
+    """Fornece a conexão do pool da thread atual como gerenciador de contexto.
+
+    A conexão não é fechada ao sair do bloco; ela volta ao pool para a próxima
+    chamada da mesma thread. Usos aninhados compartilham a mesma conexão, e só
+    o bloco mais externo desfaz uma transação deixada aberta (por exemplo,
+    após uma exceção), mantendo a conexão limpa para o próximo uso.
+
+    Yields:
+        sqlite3.Connection: A conexão da thread, ou None se não for possível conectar.
+    """
+    conexao = _conexao_da_thread()
     if not conexao:
+        yield None
         return
-
-    cursor = conexao.cursor()
+    _pool_local.profundidade += 1
     try:
-        # Criação da tabela Eventos (SQLite syntax)
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS eventos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nome TEXT NOT NULL,
-            local TEXT,
-            data TEXT, -- SQLite não tem tipo DATE nativo, usar TEXT (YYYY-MM-DD)
-            horario TEXT, -- Usar TEXT (HH:MM)
-            descricao TEXT
-        );
-        """)
-        # print("Tabela 	\"eventos	\" verificada/criada.")
-
-        # Criação da tabela Convidados (SQLite syntax)
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS convidados (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            evento_id INTEGER NOT NULL,
-            nome TEXT NOT NULL,
-            email TEXT UNIQUE,
-            telefone TEXT,
-            status_presenca TEXT CHECK(status_presenca IN ('pendente', 'presente', 'ausente')) DEFAULT 'pendente',
-            FOREIGN KEY (evento_id) REFERENCES eventos(id) ON DELETE CASCADE
-        );
-        """)
-        # print("Tabela 	\"convidados	\" verificada/criada.")
-
-        conexao.commit()
-    except sqlite3.Error as e:
-        print(f"Erro ao criar tabelas SQLite: {e}")
-        conexao.rollback()
+        yield conexao
     finally:
-        cursor.close()
+        _pool_local.profundidade -= 1
+        if _pool_local.profundidade == 0 and conexao.in_transaction:
+            conexao.rollback()
+
+def liberar_conexao_da_thread():
+    """Fecha a conexão do pool da thread atual (para threads que vão terminar)."""
+    conexao = getattr(_pool_local, "conexao", None)
+    if conexao is None:
+        return
+    _pool_local.conexao = None
+    with _pool_lock:
+        if conexao in _pool_conexoes:
+            _pool_conexoes.remove(conexao)
+    if _pool_local.pid == os.getpid():
         fechar_conexao(conexao)
 
+def fechar_conexoes_pool():
+    """Fecha todas as conexões abertas pelo pool (chamado automaticamente ao sair)."""
+    global _pool_geracao
+    with _pool_lock:
+        _pool_geracao += 1
+        conexoes = list(_pool_conexoes)
+        _pool_conexoes.clear()
+    for conexao in conexoes:
+        try:
+            conexao.close()
+        except sqlite3.Error:
+            pass
+
+atexit.register(fechar_conexoes_pool)
+
+def inicializar_banco():
+    """Cria/atualiza o schema do banco SQLite aplicando as migrações pendentes.
+
+    Se o schema já estiver na versão atual, nenhum DDL é executado.
+    """
+    with obter_conexao() as conexao:
+        if not conexao:
+            return
+        try:
+            aplicadas = aplicar_migracoes(conexao)
+            if aplicadas:
+                logger.info("Migrações aplicadas: %s (schema na versão %d).", ", ".join(str(v) for v in aplicadas), VERSAO_ATUAL)
+        except sqlite3.Error as e:
+            logger.error("Erro ao aplicar migrações do SQLite: %s", e)
+
+instrumentar_modulo(__name__)
+
 # --- Código de Conexão MySQL (Mantido para referência) ---
 """
 import mysql.connector
@@ -99,6 +183,8 @@ def inicializar_banco_mysql():
 
 # Exemplo de uso (pode ser removido ou comentado depois)
 if __name__ == "__main__":
+    import registro_log
+    registro_log.configurar()
     print("Inicializando o banco de dados SQLite...")
     inicializar_banco()
     print("Verificação/Criação do banco de dados e tabelas SQLite concluída.")
@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+import sqlite3
+
+# Lista ordenada de migrações do schema: (versão, descrição, comandos SQL).
+# Novas alterações de schema devem ser ADICIONADAS ao final com a próxima versão;
+# migrações já publicadas nunca devem ser editadas.
+MIGRACOES = [
+    (1, "Tabelas eventos e convidados", [
+        """
+        CREATE TABLE IF NOT EXISTS eventos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL,
+            local TEXT,
+            data TEXT, -- SQLite não tem tipo DATE nativo, usar TEXT (YYYY-MM-DD)
+            horario TEXT, -- Usar TEXT (HH:MM)
+            descricao TEXT
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS convidados (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            evento_id INTEGER NOT NULL,
+            nome TEXT NOT NULL,
+            email TEXT UNIQUE,
+            telefone TEXT,
+            status_presenca TEXT CHECK(status_presenca IN ('pendente', 'presente', 'ausente')) DEFAULT 'pendente',
+            FOREIGN KEY (evento_id) REFERENCES eventos(id) ON DELETE CASCADE
+        );
+        """,
+    ]),
+    (2, "Índices para listagens por evento, filtros de status e ordenação de eventos", [
+        # listar_convidados_por_evento: WHERE evento_id = ? ORDER BY nome (sem sort temporário)
+        "CREATE INDEX IF NOT EXISTS idx_convidados_evento_nome ON convidados (evento_id, nome);",
+        # Filtros/contagens por status dentro de um evento
+        "CREATE INDEX IF NOT EXISTS idx_convidados_evento_status ON convidados (evento_id, status_presenca);",
+        # Ordenação global por nome (listagem de todos os convidados)
+        "CREATE INDEX IF NOT EXISTS idx_convidados_nome ON convidados (nome);",
+        # listar_eventos: ORDER BY data DESC, horario DESC
+        "CREATE INDEX IF NOT EXISTS idx_eventos_data_horario ON eventos (data DESC, horario DESC);",
+    ]),
+    (3, "Manifesto de artefatos gerados (QR Codes e convites) para regeneração incremental", [
+        # Sem chave estrangeira para convidados: a linha precisa sobreviver à exclusão
+        # do convidado para que o arquivo correspondente possa ser removido depois
+        """
+        CREATE TABLE IF NOT EXISTS artefatos (
+            convidado_id INTEGER NOT NULL,
+            tipo TEXT NOT NULL CHECK(tipo IN ('qrcode', 'convite')),
+            evento_id INTEGER NOT NULL,
+            caminho TEXT NOT NULL,
+            hash_entradas TEXT NOT NULL,
+            gerado_em TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (convidado_id, tipo)
+        ) WITHOUT ROWID;
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_artefatos_evento ON artefatos (evento_id);",
+    ]),
+    (4, "Token de check-in por convidado e contadores de leitura", [
+        "ALTER TABLE convidados ADD COLUMN token TEXT;",
+        "ALTER TABLE convidados ADD COLUMN checkins INTEGER NOT NULL DEFAULT 0;",
+        "ALTER TABLE convidados ADD COLUMN checkin_em TEXT;",
+        # Convidados já cadastrados recebem um token aleatório (novos recebem em Python)
+        "UPDATE convidados SET token = lower(hex(randomblob(9))) WHERE token IS NULL;",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_convidados_token ON convidados (token);",
+    ]),
+    (5, "Revogação de tokens assinados de convidados excluídos", [
+        # Os IDs usam AUTOINCREMENT e nunca são reaproveitados, então revogar pelo
+        # ID do convidado não afeta convidados cadastrados depois
+        """
+        CREATE TABLE IF NOT EXISTS tokens_revogados (
+            convidado_id INTEGER PRIMARY KEY,
+            evento_id INTEGER NOT NULL,
+            revogado_em TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_tokens_revogados_evento ON tokens_revogados (evento_id);",
+        # Também dispara na exclusão em cascata ao excluir o evento
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_convidados_revogar_token
+        AFTER DELETE ON convidados
+        BEGIN
+            INSERT OR REPLACE INTO tokens_revogados (convidado_id, evento_id)
+            VALUES (OLD.id, OLD.evento_id);
+        END;
+        """,
+    ]),
+    (6, "Contadores de presença por evento (evento_stats) mantidos por triggers", [
+        # Sem chave estrangeira: a linha é removida pelo trigger de exclusão do evento,
+        # depois que a exclusão em cascata dos convidados já passou pelos triggers abaixo
+        """
+        CREATE TABLE IF NOT EXISTS evento_stats (
+            evento_id INTEGER PRIMARY KEY,
+            total INTEGER NOT NULL DEFAULT 0,
+            pendente INTEGER NOT NULL DEFAULT 0,
+            presente INTEGER NOT NULL DEFAULT 0,
+            ausente INTEGER NOT NULL DEFAULT 0
+        );
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_eventos_stats_inserir
+        AFTER INSERT ON eventos
+        BEGIN
+            INSERT OR IGNORE INTO evento_stats (evento_id) VALUES (NEW.id);
+        END;
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_eventos_stats_excluir
+        AFTER DELETE ON eventos
+        BEGIN
+            DELETE FROM evento_stats WHERE evento_id = OLD.id;
+        END;
+        """,
+        # "x IS 'valor'" vale sempre 0 ou 1, mesmo com status NULL
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_convidados_stats_inserir
+        AFTER INSERT ON convidados
+        BEGIN
+            INSERT OR IGNORE INTO evento_stats (evento_id) VALUES (NEW.evento_id);
+            UPDATE evento_stats SET
+                total = total + 1,
+                pendente = pendente + (NEW.status_presenca IS 'pendente'),
+                presente = presente + (NEW.status_presenca IS 'presente'),
+                ausente = ausente + (NEW.status_presenca IS 'ausente')
+            WHERE evento_id = NEW.evento_id;
+        END;
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_convidados_stats_excluir
+        AFTER DELETE ON convidados
+        BEGIN
+            UPDATE evento_stats SET
+                total = total - 1,
+                pendente = pendente - (OLD.status_presenca IS 'pendente'),
+                presente = presente - (OLD.status_presenca IS 'presente'),
+                ausente = ausente - (OLD.status_presenca IS 'ausente')
+            WHERE evento_id = OLD.evento_id;
+        END;
+        """,
+        # Só dispara quando o status ou o evento mudam (não a cada leitura repetida)
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_convidados_stats_atualizar
+        AFTER UPDATE OF status_presenca, evento_id ON convidados
+        WHEN OLD.status_presenca IS NOT NEW.status_presenca OR OLD.evento_id != NEW.evento_id
+        BEGIN
+            UPDATE evento_stats SET
+                total = total - 1,
+                pendente = pendente - (OLD.status_presenca IS 'pendente'),
+                presente = presente - (OLD.status_presenca IS 'presente'),
+                ausente = ausente - (OLD.status_presenca IS 'ausente')
+            WHERE evento_id = OLD.evento_id;
+            INSERT OR IGNORE INTO evento_stats (evento_id) VALUES (NEW.evento_id);
+            UPDATE evento_stats SET
+                total = total + 1,
+                pendente = pendente + (NEW.status_presenca IS 'pendente'),
+                presente = presente + (NEW.status_presenca IS 'presente'),
+                ausente = ausente + (NEW.status_presenca IS 'ausente')
+            WHERE evento_id = NEW.evento_id;
+        END;
+        """,
+        # Carga inicial para bancos existentes
+        """
+        INSERT OR REPLACE INTO evento_stats (evento_id, total, pendente, presente, ausente)
+        SELECT e.id,
+               COUNT(c.id),
+               COALESCE(SUM(c.status_presenca IS 'pendente'), 0),
+               COALESCE(SUM(c.status_presenca IS 'presente'), 0),
+               COALESCE(SUM(c.status_presenca IS 'ausente'), 0)
+        FROM eventos e
+        LEFT JOIN convidados c ON c.evento_id = e.id
+        GROUP BY e.id;
+        """,
+    ]),
+    (7, "Busca textual (FTS5) em nome, e-mail e telefone dos convidados", [
+        # Tabela de conteúdo externo: o índice guarda só os termos, o texto continua
+        # em convidados. remove_diacritics 2 faz "joao" encontrar "João"; os índices
+        # de prefixo aceleram buscas enquanto o nome ainda está sendo digitado.
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS convidados_fts USING fts5(
+            nome, email, telefone,
+            content='convidados', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        );
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_convidados_fts_inserir
+        AFTER INSERT ON convidados
+        BEGIN
+            INSERT INTO convidados_fts (rowid, nome, email, telefone)
+            VALUES (NEW.id, NEW.nome, NEW.email, NEW.telefone);
+        END;
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_convidados_fts_excluir
+        AFTER DELETE ON convidados
+        BEGIN
+            INSERT INTO convidados_fts (convidados_fts, rowid, nome, email, telefone)
+            VALUES ('delete', OLD.id, OLD.nome, OLD.email, OLD.telefone);
+        END;
+        """,
+        # Check-ins e mudanças de status não alteram o índice
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_convidados_fts_atualizar
+        AFTER UPDATE OF nome, email, telefone ON convidados
+        BEGIN
+            INSERT INTO convidados_fts (convidados_fts, rowid, nome, email, telefone)
+            VALUES ('delete', OLD.id, OLD.nome, OLD.email, OLD.telefone);
+            INSERT INTO convidados_fts (rowid, nome, email, telefone)
+            VALUES (NEW.id, NEW.nome, NEW.email, NEW.telefone);
+        END;
+        """,
+        # Indexa os convidados já cadastrados
+        "INSERT INTO convidados_fts (convidados_fts) VALUES ('rebuild');",
+    ]),
+    (8, "Fila de jobs (geração de convites em segundo plano) com leases", [
+        # Horários em segundos Unix (REAL), comparados com o relógio de quem reserva;
+        # o lease deve ser bem maior que a diferença de relógio entre as máquinas
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tipo TEXT NOT NULL,
+            evento_id INTEGER NOT NULL,
+            convidado_id INTEGER,
+            status TEXT NOT NULL DEFAULT 'pendente'
+                CHECK(status IN ('pendente', 'executando', 'concluido', 'falhou')),
+            tentativas INTEGER NOT NULL DEFAULT 0,
+            max_tentativas INTEGER NOT NULL DEFAULT 3,
+            disponivel_em REAL NOT NULL DEFAULT 0, -- Não é reservado antes disso (espera entre tentativas)
+            dono TEXT, -- Worker que detém o lease
+            lease_ate REAL,
+            erro TEXT,
+            resultado TEXT,
+            criado_em TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            concluido_em TEXT,
+            FOREIGN KEY (evento_id) REFERENCES eventos(id) ON DELETE CASCADE,
+            FOREIGN KEY (convidado_id) REFERENCES convidados(id) ON DELETE CASCADE
+        );
+        """,
+        # No máximo um job ativo por convidado: reenfileirar um evento não duplica trabalho
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_ativo ON jobs (tipo, convidado_id)
+        WHERE status IN ('pendente', 'executando');
+        """,
+        # Reserva: próximos pendentes na ordem de disponibilidade, sem ordenar a fila toda
+        "CREATE INDEX IF NOT EXISTS idx_jobs_pendentes ON jobs (disponivel_em, id) WHERE status = 'pendente';",
+        # Leases vencidos (worker que parou no meio)
+        "CREATE INDEX IF NOT EXISTS idx_jobs_executando ON jobs (lease_ate) WHERE status = 'executando';",
+        "CREATE INDEX IF NOT EXISTS idx_jobs_evento_status ON jobs (evento_id, status);",
+        # Exclusão em cascata dos convidados
+        "CREATE INDEX IF NOT EXISTS idx_jobs_convidado ON jobs (convidado_id);",
+    ]),
+]
+
+VERSAO_ATUAL = MIGRACOES[-1][0]
+
+def versao_schema(conexao):
+    """Retorna a versão do schema registrada no banco (0 se nunca migrado).
+
+    Lê primeiro o PRAGMA user_version, que fica no cabeçalho do arquivo e não
+    exige consultar o sqlite_master; bancos migrados antes dele usam a tabela
+    schema_version.
+    """
+    versao = conexao.execute("PRAGMA user_version").fetchone()[0]
+    if versao:
+        return versao
+    existe = conexao.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'"
+    ).fetchone()
+    if not existe:
+        return 0
+    versao = conexao.execute("SELECT MAX(versao) FROM schema_version").fetchone()[0]
+    return versao or 0
+
+def _registrar_user_version(conexao):
+    """Grava VERSAO_ATUAL no user_version de bancos migrados antes dele (caminho rápido)."""
+    if conexao.execute("PRAGMA user_version").fetchone()[0] < VERSAO_ATUAL:
+        conexao.execute(f"PRAGMA user_version = {VERSAO_ATUAL}")
+
+def aplicar_migracoes(conexao):
+    """Aplica, em ordem, as migrações ainda não registradas em schema_version.
+
+    Cada migração roda em sua própria transação (BEGIN IMMEDIATE), e a versão é
+    conferida novamente dentro dela, de modo que vários processos iniciando ao
+    mesmo tempo não aplicam a mesma migração duas vezes.
+
+    Args:
+        conexao (sqlite3.Connection): Conexão aberta com o banco.
+
+    Returns:
+        list: As versões aplicadas nesta chamada (vazia se o schema já estava atualizado).
+    """
+    # Caminho rápido: schema já na versão atual, nenhum DDL é executado
+    if versao_schema(conexao) >= VERSAO_ATUAL:
+        _registrar_user_version(conexao)
+        return []
+
+    aplicadas = []
+    for versao, descricao, comandos in MIGRACOES:
+        conexao.execute("BEGIN IMMEDIATE")
+        try:
+            conexao.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                versao INTEGER PRIMARY KEY,
+                descricao TEXT NOT NULL,
+                aplicada_em TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+            );
+            """)
+            if versao_schema(conexao) >= versao:
+                conexao.rollback()
+                continue
+            for comando in comandos:
+                conexao.execute(comando)
+            conexao.execute(
+                "INSERT INTO schema_version (versao, descricao) VALUES (?, ?)",
+                (versao, descricao),
+            )
+            # O PRAGMA é transacional: é gravado junto com a migração
+            conexao.execute(f"PRAGMA user_version = {int(versao)}")
+            conexao.commit()
+            aplicadas.append(versao)
+        except sqlite3.Error:
+            conexao.rollback()
+            raise
+    _registrar_user_version(conexao)
+    if aplicadas:
+        # Atualiza as estatísticas do planejador para os novos índices
+        conexao.execute("PRAGMA optimize;")
+    return aplicadas
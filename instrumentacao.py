@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+"""Instrumentação leve: chamadas, histograma de latência e bytes gravados por operação.
+
+Fica desligada por padrão. Com a variável de ambiente CONVITE_METRICAS=1
+definida antes de o programa iniciar, as funções públicas de db/conexao.py,
+modelos/* e servicos/* passam a ser medidas (cada módulo chama
+instrumentar_modulo no final). Ao sair, as métricas são gravadas em
+CONVITE_METRICAS_ARQUIVO (padrão: metricas.prom). Com extensão .json o
+arquivo é gravado em JSON; com qualquer outra, no formato texto do Prometheus.
+O sinal SIGUSR1 ou uma chamada a exportar() grava o arquivo na hora, sem
+encerrar o processo.
+
+Desligada, instrumentar() devolve a própria função e medir() devolve um
+contexto vazio compartilhado. As funções não ganham custo algum, e os pontos
+medidos manualmente custam só uma chamada. As métricas de processos filhos de
+pools (ProcessPoolExecutor, multiprocessing) não entram nas do processo
+principal.
+
+Uso:
+    CONVITE_METRICAS=1 CONVITE_METRICAS_ARQUIVO=metricas.json python main.py convites gerar --evento 1
+"""
+import atexit
+import bisect
+import contextlib
+import functools
+import os
+import sys
+import threading
+import time
+
+ATIVA = os.environ.get("CONVITE_METRICAS", "").strip().lower() in ("1", "true", "sim")
+ARQUIVO_PADRAO = os.environ.get("CONVITE_METRICAS_ARQUIVO", "metricas.prom")
+# Limites superiores (s) das faixas do histograma de latência
+LIMITES_HISTOGRAMA = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                      0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PREFIXO_PROMETHEUS = "convites_operacao"
+
+# Cada thread acumula as próprias métricas, sem trava no caminho medido; a
+# exportação soma as de todas as threads (inclusive as que já terminaram)
+_lock = threading.Lock()
+_local = threading.local()
+_estados = [] # _EstadoThread de todas as threads que já mediram algo
+_CONTEXTO_VAZIO = contextlib.nullcontext()
+# co_flags de geradores, corrotinas e geradores assíncronos: a chamada só cria o objeto
+_FLAGS_SEM_MEDICAO = 0x20 | 0x80 | 0x100 | 0x200
+_pid = os.getpid()
+_relogio = time.perf_counter
+_faixa = functools.partial(bisect.bisect_left, LIMITES_HISTOGRAMA)
+
+
+class _Operacao:
+    __slots__ = ("chamadas", "erros", "soma", "faixas", "bytes_escritos")
+
+    def __init__(self):
+        self.chamadas = 0
+        self.erros = 0
+        self.soma = 0.0
+        self.faixas = [0] * (len(LIMITES_HISTOGRAMA) + 1) # A última é acima do maior limite
+        self.bytes_escritos = 0
+
+    def registrar(self, duracao, erro):
+        self.chamadas += 1
+        self.erros += erro
+        self.soma += duracao
+        self.faixas[_faixa(duracao)] += 1
+
+
+class _EstadoThread:
+    __slots__ = ("pilha", "operacoes")
+
+    def __init__(self):
+        self.pilha = [] # Operações em andamento (para atribuir os bytes gravados)
+        self.operacoes = {} # nome -> _Operacao
+
+    def operacao(self, nome):
+        operacao = self.operacoes.get(nome)
+        if operacao is None:
+            operacao = self.operacoes[nome] = _Operacao()
+        return operacao
+
+
+def _estado():
+    estado = getattr(_local, "estado", None)
+    if estado is None:
+        estado = _local.estado = _EstadoThread()
+        with _lock:
+            _estados.append(estado)
+    return estado
+
+
+class _Medicao:
+    """Contexto que mede um trecho de código como a operação `nome`."""
+
+    __slots__ = ("nome", "inicio", "estado")
+
+    def __init__(self, nome):
+        self.nome = nome
+
+    def __enter__(self):
+        self.estado = _estado()
+        self.estado.pilha.append(self.nome)
+        self.inicio = _relogio()
+        return self
+
+    def __exit__(self, tipo, valor, rastro):
+        duracao = _relogio() - self.inicio
+        self.estado.pilha.pop()
+        self.estado.operacao(self.nome).registrar(duracao, tipo is not None and issubclass(tipo, Exception))
+        return False
+
+
+def medir(nome):
+    """Contexto que mede o bloco como a operação `nome` (sem custo com a instrumentação desligada)."""
+    if not ATIVA:
+        return _CONTEXTO_VAZIO
+    return _Medicao(nome)
+
+
+def instrumentar(nome=None):
+    """Decorador que mede cada chamada da função (padrão do nome: módulo.função).
+
+    Exceções contam como erro e são propagadas. Funções geradoras e corrotinas
+    ficam sem medição, pois a chamada só cria o objeto; meça o consumo com
+    medir(). Com a instrumentação desligada, devolve a própria função.
+    """
+    def decorar(funcao):
+        if not ATIVA or funcao.__code__.co_flags & _FLAGS_SEM_MEDICAO:
+            return funcao
+        rotulo = nome or f"{funcao.__module__}.{funcao.__qualname__}"
+
+        # Caminho quente: o mesmo registro de _Operacao.registrar, sem as chamadas de método
+        @functools.wraps(funcao)
+        def medida(*args, **kwargs):
+            try:
+                estado = _local.estado
+            except AttributeError:
+                estado = _estado()
+            estado.pilha.append(rotulo)
+            erro = False
+            inicio = _relogio()
+            try:
+                return funcao(*args, **kwargs)
+            except Exception:
+                erro = True
+                raise
+            finally:
+                duracao = _relogio() - inicio
+                estado.pilha.pop()
+                operacao = estado.operacoes.get(rotulo) or estado.operacao(rotulo)
+                operacao.chamadas += 1
+                operacao.erros += erro
+                operacao.soma += duracao
+                operacao.faixas[_faixa(duracao)] += 1
+        return medida
+    return decorar
+
+
+def instrumentar_modulo(nome_modulo):
+    """Aplica instrumentar() às funções públicas definidas no módulo.
+
+    Chame no final do módulo, depois de todas as definições. Funções que só
+    criam geradores ou gerenciadores de contexto (@contextmanager) ficam de fora.
+    """
+    if not ATIVA:
+        return
+    modulo = sys.modules[nome_modulo]
+    for nome, objeto in list(vars(modulo).items()):
+        if nome.startswith("_") or not callable(objeto) or not hasattr(objeto, "__code__"):
+            continue
+        if getattr(objeto, "__module__", None) != nome_modulo or hasattr(objeto, "__wrapped__"):
+            continue
+        setattr(modulo, nome, instrumentar()(objeto))
+
+
+def registrar_bytes(quantidade, nome=None):
+    """Soma bytes gravados à operação `nome` ou, sem nome, à operação medida em andamento na thread."""
+    if not ATIVA:
+        return
+    estado = _estado()
+    if nome is None:
+        nome = estado.pilha[-1] if estado.pilha else "sem_operacao"
+    estado.operacao(nome).bytes_escritos += quantidade
+
+
+def estatisticas():
+    """Retorna a soma das métricas de todas as threads: {operação: {chamadas, erros, ...}}.
+
+    O histograma é cumulativo, como no Prometheus: {limite: chamadas com duração <= limite}.
+    """
+    total = {}
+    with _lock:
+        estados = list(_estados)
+    for estado in estados:
+        for nome, operacao in list(estado.operacoes.items()):
+            soma = total.get(nome)
+            if soma is None:
+                soma = total[nome] = _Operacao()
+            soma.chamadas += operacao.chamadas
+            soma.erros += operacao.erros
+            soma.soma += operacao.soma
+            soma.bytes_escritos += operacao.bytes_escritos
+            soma.faixas = [a + b for a, b in zip(soma.faixas, operacao.faixas)]
+
+    resultado = {}
+    for nome, operacao in sorted(total.items()):
+        histograma = {}
+        acumulado = 0
+        for limite, quantidade in zip(LIMITES_HISTOGRAMA + ("+Inf",), operacao.faixas):
+            acumulado += quantidade
+            histograma[str(limite)] = acumulado
+        resultado[nome] = {
+            "chamadas": operacao.chamadas,
+            "erros": operacao.erros,
+            "soma_segundos": operacao.soma,
+            "media_segundos": operacao.soma / operacao.chamadas if operacao.chamadas else 0.0,
+            "bytes_escritos": operacao.bytes_escritos,
+            "histograma": histograma,
+        }
+    return resultado
+
+
+def zerar():
+    """Descarta todas as métricas acumuladas."""
+    with _lock:
+        for estado in _estados:
+            estado.operacoes.clear()
+
+
+def _rotulo_prometheus(valor):
+    return valor.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def formatar_prometheus(metricas=None):
+    """Métricas no formato texto de exposição do Prometheus."""
+    metricas = estatisticas() if metricas is None else metricas
+    linhas = [
+        f"# HELP {PREFIXO_PROMETHEUS}_segundos Duração das operações instrumentadas.",
+        f"# TYPE {PREFIXO_PROMETHEUS}_segundos histogram",
+    ]
+    for nome, metrica in metricas.items():
+        rotulo = _rotulo_prometheus(nome)
+        for limite, quantidade in metrica["histograma"].items():
+            linhas.append(f'{PREFIXO_PROMETHEUS}_segundos_bucket{{operacao="{rotulo}",le="{limite}"}} {quantidade}')
+        linhas.append(f'{PREFIXO_PROMETHEUS}_segundos_sum{{operacao="{rotulo}"}} {metrica["soma_segundos"]:.9f}')
+        linhas.append(f'{PREFIXO_PROMETHEUS}_segundos_count{{operacao="{rotulo}"}} {metrica["chamadas"]}')
+    for chave, descricao in (("erros", "Chamadas que terminaram com exceção."),
+                             ("bytes_escritos", "Bytes gravados em arquivos.")):
+        linhas.append(f"# HELP {PREFIXO_PROMETHEUS}_{chave}_total {descricao}")
+        linhas.append(f"# TYPE {PREFIXO_PROMETHEUS}_{chave}_total counter")
+        for nome, metrica in metricas.items():
+            linhas.append(f'{PREFIXO_PROMETHEUS}_{chave}_total{{operacao="{_rotulo_prometheus(nome)}"}} {metrica[chave]}')
+    return "\n".join(linhas) + "\n"
+
+
+def exportar(caminho=None):
+    """Grava as métricas em `caminho` (padrão: CONVITE_METRICAS_ARQUIVO), JSON se terminar em .json.
+
+    Returns:
+        str: O caminho gravado, ou None se ocorrer erro.
+    """
+    caminho = caminho or ARQUIVO_PADRAO
+    metricas = estatisticas()
+    try:
+        if caminho.endswith(".json"):
+            import json
+            conteudo = json.dumps({"pid": os.getpid(), "gerado_em": time.time(), "operacoes": metricas},
+                                  ensure_ascii=False, indent=2)
+        else:
+            conteudo = formatar_prometheus(metricas)
+        temporario = f"{caminho}.{os.getpid()}.tmp"
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            arquivo.write(conteudo)
+        os.replace(temporario, caminho)
+        return caminho
+    except OSError as e:
+        print(f"Erro ao gravar as métricas em \"{caminho}\": {e}", file=sys.stderr)
+        return None
+
+
+def _exportar_ao_sair():
+    # Processos filhos criados por fork herdam o atexit, mas não devem sobrescrever o arquivo
+    if os.getpid() == _pid:
+        exportar()
+
+
+def _exportar_por_sinal(numero, quadro):
+    exportar()
+
+
+if ATIVA:
+    atexit.register(_exportar_ao_sair)
+    try:
+        import signal
+        signal.signal(signal.SIGUSR1, _exportar_por_sinal)
+    except (AttributeError, ValueError):
+        pass # Sem SIGUSR1 (Windows) ou importado fora da thread principal
@@ -9,8 +9,11 @@ sys.path.insert(0, project_root)
 from db.conexao import inicializar_banco
 from modelos import evento as modelo_evento
 from modelos import convidado as modelo_convidado
-from servicos import qrcode_service
-from servicos import convite_service
+# Os serviços (qrcode, PIL, reportlab...) são importados dentro das funções que
+# os usam: menus, listagens e check-in abrem sem pagar esse custo de importação
+
+# Quantidade de convidados exibidos por página nas listagens do terminal
+TAMANHO_PAGINA = 20
 
 # --- Funções Auxiliares de Interface ---
 
@@ -91,17 +94,20 @@ def listar_todos_eventos(selecionar=False):
         pausar()
         return None if selecionar else False
 
-    print("{:<5} {:<30} {:<15} {:<10} {:<10}".format("ID", "Nome", "Local", "Data", "Hora"))
-    print("-"*75)
+    print("{:<5} {:<30} {:<15} {:<10} {:<6} {:>7} {:>7} {:>7}".format("ID", "Nome", "Local", "Data", "Hora", "Conv.", "Pres.", "Pend."))
+    print("-"*96)
     for ev in eventos:
-        print("{:<5} {:<30} {:<15} {:<10} {:<10}".format(
+        print("{:<5} {:<30} {:<15} {:<10} {:<6} {:>7} {:>7} {:>7}".format(
             ev["id"],
             ev["nome"][:28] + ".." if len(ev["nome"]) > 30 else ev["nome"],
             (ev["local"] or "N/D")[:13] + ".." if ev["local"] and len(ev["local"]) > 15 else (ev["local"] or "N/D"),
-            ev["data"] or "N/D",
-            ev["horario"] or "N/D"
+            ev.data_formatada,
+            ev.horario_formatado,
+            ev["total_convidados"],
+            ev["presentes"],
+            ev["pendentes"]
         ))
-    print("-"*75)
+    print("-"*96)
 
     if selecionar:
         while True:
@@ -205,8 +211,14 @@ def criar_novo_convidado():
         print(f"\nConvidado '{nome}' (ID: {convidado_id}) criado com sucesso.")
 
         # Gerar QR Code e Convite PDF
-        gerar_convite = input("Deseja gerar o convite em PDF com QR Code agora? (s/N): ").lower()
-        if gerar_convite == "s":
+        gerar_convite = input("Gerar o convite em PDF com QR Code agora (s), enfileirar para o worker (f) ou não (N)? ").lower()
+        if gerar_convite == "f":
+            from modelos import job as modelo_job
+            job_id = modelo_job.enfileirar_convite(convidado_id)
+            if job_id:
+                print(f"\nConvite enfileirado (job ID: {job_id}). Será gerado por servicos/worker_jobs.py.")
+        elif gerar_convite == "s":
+            from servicos import qrcode_service, convite_service
             convidado = modelo_convidado.buscar_convidado_por_id(convidado_id)
             if not convidado:
                 print("Erro ao buscar dados do convidado recém-criado.")
@@ -219,26 +231,27 @@ def criar_novo_convidado():
                 conteudo_qr = obter_input("Digite a URL para o QR Code: ")
             else:
                 # Dados padrão para o QR Code
-                conteudo_qr = f"Evento: {evento['nome']}\nConvidado: {convidado['nome']}\nID Convidado: {convidado_id}"
+                conteudo_qr = qrcode_service.montar_conteudo_qrcode(evento, convidado)
                 conteudo_qr_formatado = conteudo_qr.replace('\n', ' | ')
                 print(f"Usando dados padrão para o QR Code: {conteudo_qr_formatado}")
 
-            nome_arquivo_base = f"evento_{evento_id}_convidado_{convidado_id}_{nome.replace(' ', '_').lower()}"
+            nome_arquivo_base = qrcode_service.nome_arquivo_convidado(evento_id, convidado)
+
+            salvar_png = input("Salvar também a imagem PNG do QR Code em dados/qrcodes? (s/N): ").lower() == "s"
 
             print("\nGerando QR Code...")
-            caminho_qrcode = qrcode_service.gerar_qrcode(conteudo_qr, nome_arquivo_base, tipo=tipo_qr)
+            caminho_qrcode = None
+            matriz_qrcode = None
+            if salvar_png:
+                caminho_qrcode = qrcode_service.gerar_qrcode(conteudo_qr, nome_arquivo_base, tipo=tipo_qr)
+            else:
+                # Sem PNG intermediário: a matriz é desenhada como vetores no PDF
+                matriz_qrcode = qrcode_service.gerar_matriz_qrcode(conteudo_qr)
 
-            if caminho_qrcode:
+            if caminho_qrcode or matriz_qrcode:
                 print("Gerando Convite PDF...")
-                # Passar o dicionário completo do evento e convidado
-                # Precisamos buscar o evento novamente para garantir que temos data/hora como objetos
-                evento_para_pdf = modelo_evento.buscar_evento_por_id(evento_id)
-                if not evento_para_pdf:
-                     print("Erro crítico: Não foi possível re-buscar dados do evento para o PDF.")
-                     pausar()
-                     return
-
-                caminho_pdf = convite_service.gerar_convite_pdf(evento_para_pdf, convidado, caminho_qrcode, nome_arquivo_base)
+                # O evento buscado acima já traz data/hora como objetos date/time
+                caminho_pdf = convite_service.gerar_convite_pdf(evento, convidado, caminho_qrcode, nome_arquivo_base, matriz_qrcode=matriz_qrcode)
                 if caminho_pdf:
                     print(f"\nConvite gerado com sucesso: {caminho_pdf}")
                 else:
@@ -264,12 +277,11 @@ def listar_convidados_de_evento():
         pausar()
         return
 
-    exibir_cabecalho(f"Convidados do Evento: {evento['nome']}")
-    convidados = modelo_convidado.listar_convidados_por_evento(evento_id)
+    navegar_convidados_paginado(f"Convidados do Evento: {evento['nome']}", evento_id=evento_id)
 
-    if not convidados:
-        print("Nenhum convidado cadastrado para este evento.")
-    else:
+def exibir_pagina_convidados(convidados, com_evento):
+    """Imprime uma página de convidados em formato de tabela."""
+    if not com_evento:
         print("{:<5} {:<30} {:<30} {:<15} {:<10}".format("ID", "Nome", "E-mail", "Telefone", "Status"))
         print("-"*95)
         for conv in convidados:
@@ -281,16 +293,7 @@ def listar_convidados_de_evento():
                 conv["status_presenca"]
             ))
         print("-"*95)
-    pausar()
-
-def listar_todos_os_convidados(selecionar=False):
-    """Lista todos os convidados de todos os eventos."""
-    exibir_cabecalho("Listar Todos os Convidados")
-    convidados = modelo_convidado.listar_todos_convidados()
-    if not convidados:
-        print("Nenhum convidado cadastrado no sistema.")
-        pausar()
-        return None if selecionar else False
+        return
 
     print("{:<5} {:<25} {:<25} {:<15} {:<10} {:<20}".format("ID", "Nome", "E-mail", "Telefone", "Status", "Evento"))
     print("-"*110)
@@ -306,23 +309,83 @@ def listar_todos_os_convidados(selecionar=False):
         ))
     print("-"*110)
 
-    if selecionar:
-        while True:
+def navegar_convidados_paginado(titulo, evento_id=None, selecionar=False):
+    """Exibe convidados página a página (cursor keyset), buscando uma página por vez.
+
+    Returns:
+        int | None | bool: Com selecionar=True, o ID escolhido ou None se cancelado;
+                           caso contrário, True se havia convidados e False se não.
+    """
+    # Pilha com o cursor inicial de cada página visitada, para permitir voltar
+    cursores = [None]
+    while True:
+        exibir_cabecalho(titulo)
+        convidados, proximo = modelo_convidado.paginar_convidados(evento_id, cursores[-1], TAMANHO_PAGINA)
+        if not convidados and len(cursores) == 1:
+            print("Nenhum convidado cadastrado para este evento." if evento_id else "Nenhum convidado cadastrado no sistema.")
+            pausar()
+            return None if selecionar else False
+
+        exibir_pagina_convidados(convidados, com_evento=evento_id is None)
+        print(f"Página {len(cursores)}" + ("" if proximo else " (última)"))
+
+        opcoes = []
+        if proximo:
+            opcoes.append("Enter = próxima página")
+        elif not selecionar:
+            opcoes.append("Enter = voltar")
+        if len(cursores) > 1:
+            opcoes.append("v = página anterior")
+        if selecionar:
+            opcoes.append("ID do convidado para selecionar")
+        opcoes.append("0 = cancelar" if selecionar else "0 = voltar")
+        resposta = input(f"\n[{' | '.join(opcoes)}]: ").strip().lower()
+
+        if resposta == "0" or (not resposta and not proximo and not selecionar):
+            return None if selecionar else True
+        if resposta == "v":
+            if len(cursores) > 1:
+                cursores.pop()
+            continue
+        if not resposta:
+            if proximo:
+                cursores.append(proximo)
+            continue
+        if selecionar:
             try:
-                convidado_id_str = obter_input("\nDigite o ID do convidado desejado (ou 0 para cancelar): ", tipo=str)
-                if convidado_id_str == '0':
-                    return None # Cancelado pelo usuário
-                convidado_id = int(convidado_id_str)
-                # Verifica se o ID existe na lista buscada
-                if any(c["id"] == convidado_id for c in convidados):
-                    return convidado_id
-                else:
-                    print("Erro: ID do convidado inválido.")
+                convidado_id = int(resposta)
             except ValueError:
                 print("Erro: ID deve ser um número.")
-    else:
-        pausar()
-        return True
+                pausar()
+                continue
+            # Validação pela chave primária, sem depender da página exibida
+            if modelo_convidado.convidado_existe(convidado_id):
+                return convidado_id
+            print("Erro: ID do convidado inválido.")
+            pausar()
+        else:
+            print("Opção inválida.")
+            pausar()
+
+def listar_todos_os_convidados(selecionar=False):
+    """Lista todos os convidados de todos os eventos, uma página por vez."""
+    return navegar_convidados_paginado("Listar Todos os Convidados", selecionar=selecionar)
+
+def buscar_convidados_por_texto():
+    exibir_cabecalho("Buscar Convidados")
+    evento_id = obter_input("ID do evento (deixe em branco para buscar em todos): ", tipo=int, obrigatorio=False)
+    print("\nDigite parte do nome, e-mail ou telefone (acentos e maiúsculas são ignorados). Linha vazia encerra.")
+    while True:
+        texto = input("\nBuscar: ").strip()
+        if not texto:
+            break
+        resultados = modelo_convidado.buscar_convidados(texto, evento_id)
+        if not resultados:
+            print("Nenhum convidado encontrado.")
+            continue
+        exibir_pagina_convidados(resultados, com_evento=evento_id is None)
+        if len(resultados) == modelo_convidado.LIMITE_BUSCA_PADRAO:
+            print(f"Exibindo os {len(resultados)} resultados mais relevantes; refine a busca para ver outros.")
 
 def editar_convidado_existente():
     exibir_cabecalho("Editar Convidado")
@@ -377,6 +440,187 @@ def excluir_convidado_existente():
         print("\nExclusão cancelada.")
     pausar()
 
+def importar_convidados_de_csv():
+    exibir_cabecalho("Importar Convidados de CSV")
+    print("Selecione o evento que receberá os convidados:")
+    evento_id = listar_todos_eventos(selecionar=True)
+    if not evento_id:
+        print("\nOperação cancelada ou nenhum evento selecionado.")
+        pausar()
+        return
+
+    print("\nO arquivo deve ter cabeçalho com as colunas: nome, email, telefone, status_presenca")
+    caminho_csv = obter_input("Caminho do arquivo CSV: ")
+    from servicos import importacao_service
+    relatorio = importacao_service.importar_convidados_csv(caminho_csv, evento_id)
+    if relatorio is None:
+        print("\nFalha ao importar os convidados. Nenhum convidado foi gravado.")
+        pausar()
+        return
+
+    print(f"\nInseridos: {len(relatorio['inseridos'])}")
+    print(f"Duplicados: {len(relatorio['duplicados'])}")
+    print(f"Inválidos: {len(relatorio['invalidos'])}")
+    limite_exibicao = 20
+    for item in relatorio["duplicados"][:limite_exibicao]:
+        print(f" - Linha {item['linha']}: e-mail duplicado ({item['email']})")
+    for item in relatorio["invalidos"][:limite_exibicao]:
+        print(f" - Linha {item['linha']}: {item['motivo']}")
+    if len(relatorio["duplicados"]) > limite_exibicao or len(relatorio["invalidos"]) > limite_exibicao:
+        print(f"(Exibindo no máximo {limite_exibicao} ocorrências de cada tipo.)")
+    pausar()
+
+def gerar_qrcodes_de_evento():
+    exibir_cabecalho("Gerar QR Codes de um Evento")
+    print("Selecione o evento:")
+    evento_id = listar_todos_eventos(selecionar=True)
+    if not evento_id:
+        print("\nOperação cancelada ou nenhum evento selecionado.")
+        pausar()
+        return
+
+    workers = obter_input(f"Número de processos [{os.cpu_count() or 1}]: ", tipo=int, obrigatorio=False, padrao=os.cpu_count() or 1)
+    from servicos import qrcode_service
+    resultado = qrcode_service.gerar_qrcodes_evento(evento_id, workers=max(1, workers))
+    if resultado is None:
+        print("\nFalha ao gerar os QR Codes do evento.")
+    else:
+        for convidado_id, erro in list(resultado["erros"].items())[:20]:
+            print(f" - Convidado ID {convidado_id}: {erro}")
+    pausar()
+
+def gerar_pdf_unico_de_evento():
+    exibir_cabecalho("PDF Único de Convites para Impressão")
+    print("Selecione o evento:")
+    evento_id = listar_todos_eventos(selecionar=True)
+    if not evento_id:
+        print("\nOperação cancelada ou nenhum evento selecionado.")
+        pausar()
+        return
+
+    from servicos import convite_service
+    opcoes = "/".join(str(n) for n in convite_service.LAYOUTS_POR_FOLHA)
+    while True:
+        por_folha = obter_input(f"Convites por folha ({opcoes}) [1]: ", tipo=int, obrigatorio=False, padrao=1)
+        if por_folha in convite_service.LAYOUTS_POR_FOLHA:
+            break
+        print(f"Erro: Escolha uma das opções {opcoes}.")
+
+    resultado = convite_service.gerar_convites_evento_pdf_unico(evento_id, por_folha=por_folha)
+    if resultado is None:
+        print("\nFalha ao gerar o PDF único do evento.")
+    elif resultado["erros"]:
+        print(f"\n{len(resultado['erros'])} convite(s) ficaram sem QR Code.")
+    pausar()
+
+def sincronizar_convites_alterados():
+    exibir_cabecalho("Sincronizar Convites")
+    print("Regenera apenas os QR Codes e convites cujos dados mudaram e remove")
+    print("os arquivos de convidados excluídos.\n")
+    evento_id = obter_input("ID do evento (Enter para todos os eventos): ", tipo=int, obrigatorio=False)
+    from servicos import sincronizacao_service
+    resultado = sincronizacao_service.sincronizar_convites(evento_id)
+    if resultado is None:
+        print("\nFalha ao sincronizar os convites.")
+    pausar()
+
+def enfileirar_convites_de_evento():
+    exibir_cabecalho("Enfileirar Convites de um Evento")
+    print("Selecione o evento:")
+    evento_id = listar_todos_eventos(selecionar=True)
+    if not evento_id:
+        print("\nOperação cancelada ou nenhum evento selecionado.")
+        pausar()
+        return
+
+    from modelos import job as modelo_job
+    criados = modelo_job.enfileirar_convites_evento(evento_id)
+    if criados is None:
+        print("\nFalha ao enfileirar os convites.")
+    else:
+        print(f"\n{criados} convite(s) enfileirado(s). Para gerá-los em segundo plano, execute:")
+        print("  python servicos/worker_jobs.py --processos N")
+    pausar()
+
+def exibir_progresso_fila():
+    exibir_cabecalho("Progresso da Fila de Convites")
+    from modelos import job as modelo_job
+    evento_id = obter_input("ID do evento (Enter para todos os eventos): ", tipo=int, obrigatorio=False)
+    progresso = modelo_job.progresso_jobs(evento_id)
+    if progresso is None:
+        pausar()
+        return
+    print(f"\nTotal: {progresso['total']} ({progresso['percentual']}% finalizado)")
+    print(f"Pendentes: {progresso['pendente']}  Em execução: {progresso['executando']}  "
+          f"Concluídos: {progresso['concluido']}  Falhas: {progresso['falhou']}  "
+          f"Retentativas: {progresso['retentativas']}")
+    for job in modelo_job.listar_jobs(evento_id, status="falhou", limite=20):
+        print(f" - Convidado ID {job.convidado_id}: {job.erro} ({job.tentativas} tentativas)")
+    if progresso["falhou"]:
+        if input("\nDevolver os jobs com falha para a fila? (s/N): ").lower() == "s":
+            print(f"{modelo_job.reenfileirar_falhos(evento_id)} job(s) reenfileirado(s).")
+    pausar()
+
+def realizar_checkin():
+    exibir_cabecalho("Check-in por QR Code")
+    from servicos import checkin_service
+    modo_offline = input("Portão sem conexão com o banco (modo offline)? (s/N): ").strip().lower() == "s"
+    verificador = None
+    if modo_offline:
+        try:
+            evento_id = int(input("ID do evento: "))
+        except ValueError:
+            print("ID inválido.")
+            pausar()
+            return
+        caminho_revogacoes = os.path.join(checkin_service.REVOGACOES_DIR, f"revogados_evento_{evento_id}.json")
+        verificador = checkin_service.criar_verificador_offline(evento_id, caminho_revogacoes)
+        if verificador is None:
+            pausar()
+            return
+        print(f"Modo offline: {len(verificador.revogados)} convidado(s) revogado(s) carregado(s).")
+    else:
+        print("Selecione o evento em que o check-in será realizado:")
+        evento_id = listar_todos_eventos(selecionar=True)
+        if not evento_id:
+            print("\nOperação cancelada ou nenhum evento selecionado.")
+            pausar()
+            return
+        # Mantém atualizada a lista usada caso o portão passe para o modo offline
+        checkin_service.exportar_revogacoes(evento_id)
+
+    mensagens = {
+        "ok": "CHECK-IN OK",
+        "duplicado": "JÁ REGISTRADO ANTERIORMENTE",
+        "nao_encontrado": "QR Code não encontrado",
+        "evento_incorreto": "QR Code de outro evento",
+        "expirado": "QR Code expirado",
+        "revogado": "Convite cancelado",
+        "invalido": "QR Code inválido",
+        "erro": "Erro ao registrar o check-in",
+    }
+    print("\nLeia os QR Codes (o leitor digita o conteúdo e Enter). Linha vazia encerra.")
+    while True:
+        conteudo = input("> ").strip()
+        if not conteudo:
+            break
+        if verificador:
+            # Sem banco: só tokens assinados podem ser validados; reentrada é detectada localmente
+            resultado = verificador.verificar(conteudo, registrar_leitura=True)
+            detalhe = f" - Convidado ID: {resultado['convidado_id']}" if resultado["convidado_id"] else ""
+        else:
+            resultado = checkin_service.registrar_checkin(conteudo, evento_id)
+            convidado = resultado["convidado"]
+            detalhe = f" - {convidado['nome']} (ID: {convidado['id']}, leituras: {resultado['checkins']})" if convidado else ""
+        print(f"{mensagens[resultado['status']]}{detalhe}")
+
+def reconstruir_estatisticas():
+    exibir_cabecalho("Recalcular Contadores de Presença")
+    eventos = modelo_evento.reconstruir_estatisticas_eventos()
+    if eventos is not None:
+        print(f"Contadores recalculados para {eventos} evento(s).")
+    pausar()
+
 # --- Menus da Interface ---
 
 def menu_eventos():
@@ -386,6 +630,7 @@ def menu_eventos():
         print("2. Listar Todos os Eventos")
         print("3. Editar Evento Existente")
         print("4. Excluir Evento Existente")
+        print("5. Recalcular Contadores de Presença")
         print("0. Voltar ao Menu Principal")
         print()
         opcao = input("Escolha uma opção: ")
@@ -398,6 +643,8 @@ def menu_eventos():
             editar_evento_existente()
         elif opcao == "4":
             excluir_evento_existente()
+        elif opcao == "5":
+            reconstruir_estatisticas()
         elif opcao == "0":
             break
         else:
@@ -412,6 +659,14 @@ def menu_convidados():
         print("3. Listar Todos os Convidados")
         print("4. Editar Convidado Existente")
         print("5. Excluir Convidado Existente")
+        print("6. Importar Convidados de CSV")
+        print("7. Gerar QR Codes de Todos os Convidados de um Evento")
+        print("8. Gerar PDF Único com os Convites de um Evento (impressão)")
+        print("9. Sincronizar Convites (regenerar apenas os alterados)")
+        print("10. Check-in (leitura de QR Code)")
+        print("11. Buscar Convidados (nome, e-mail ou telefone)")
+        print("12. Enfileirar Convites de um Evento (geração em segundo plano)")
+        print("13. Progresso da Fila de Convites")
         print("0. Voltar ao Menu Principal")
         print()
         opcao = input("Escolha uma opção: ")
@@ -426,6 +681,22 @@ def menu_convidados():
             editar_convidado_existente()
         elif opcao == "5":
             excluir_convidado_existente()
+        elif opcao == "6":
+            importar_convidados_de_csv()
+        elif opcao == "7":
+            gerar_qrcodes_de_evento()
+        elif opcao == "8":
+            gerar_pdf_unico_de_evento()
+        elif opcao == "9":
+            sincronizar_convites_alterados()
+        elif opcao == "10":
+            realizar_checkin()
+        elif opcao == "11":
+            buscar_convidados_por_texto()
+        elif opcao == "12":
+            enfileirar_convites_de_evento()
+        elif opcao == "13":
+            exibir_progresso_fila()
         elif opcao == "0":
             break
         else:
@@ -455,6 +726,15 @@ def menu_principal():
 # --- Ponto de Entrada Principal ---
 
 if __name__ == "__main__":
+    # Com argumentos, roda o comando sem menu (ex.: python main.py eventos listar --formato json)
+    if len(sys.argv) > 1:
+        from cli import executar
+        sys.exit(executar(sys.argv[1:]))
+
+    # Mensagens dos modelos e serviços aparecem no terminal, na ordem dos prompts do menu
+    import registro_log
+    registro_log.configurar(assincrono=False)
+
     print("Inicializando o sistema...")
     # Garante que o banco e as tabelas existam antes de iniciar
     # É necessário configurar as credenciais do MySQL via variáveis de ambiente
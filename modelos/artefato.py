@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+from db.conexao import obter_conexao
+from instrumentacao import instrumentar_modulo
+import logging
+import sqlite3 # Importar sqlite3 para tratar erros específicos
+
+logger = logging.getLogger(__name__)
+
+# Limite de parâmetros por consulta "IN (...)"
+_MAX_PARAMETROS_IN = 500
+
+def buscar_artefatos_de_convidados(convidado_ids):
+    """Busca no manifesto os artefatos já gerados para os convidados informados.
+
+    Returns:
+        dict: {(convidado_id, tipo): {'caminho': ..., 'hash_entradas': ...}}
+    """
+    artefatos = {}
+    convidado_ids = list(convidado_ids)
+    with obter_conexao() as conexao:
+        if not conexao:
+            return artefatos
+        cursor = conexao.cursor()
+        try:
+            for inicio in range(0, len(convidado_ids), _MAX_PARAMETROS_IN):
+                parte = convidado_ids[inicio:inicio + _MAX_PARAMETROS_IN]
+                marcadores = ", ".join("?" * len(parte))
+                cursor.execute(f"""SELECT convidado_id, tipo, caminho, hash_entradas
+                                   FROM artefatos WHERE convidado_id IN ({marcadores})""", parte)
+                for row in cursor.fetchall():
+                    artefatos[(row["convidado_id"], row["tipo"])] = {
+                        "caminho": row["caminho"],
+                        "hash_entradas": row["hash_entradas"],
+                    }
+        except sqlite3.Error as e:
+            logger.error("Erro ao buscar artefatos no SQLite: %s", e)
+        finally:
+            cursor.close()
+    return artefatos
+
+def registrar_artefatos(registros):
+    """Grava (ou atualiza) vários artefatos no manifesto em uma única transação.
+
+    Args:
+        registros (list): Tuplas (convidado_id, tipo, evento_id, caminho, hash_entradas).
+
+    Returns:
+        bool: True se gravou com sucesso.
+    """
+    if not registros:
+        return True
+    with obter_conexao() as conexao:
+        if not conexao:
+            return False
+        cursor = conexao.cursor()
+        try:
+            sql = """INSERT INTO artefatos (convidado_id, tipo, evento_id, caminho, hash_entradas)
+                     VALUES (?, ?, ?, ?, ?)
+                     ON CONFLICT (convidado_id, tipo) DO UPDATE SET
+                        evento_id = excluded.evento_id,
+                        caminho = excluded.caminho,
+                        hash_entradas = excluded.hash_entradas,
+                        gerado_em = CURRENT_TIMESTAMP"""
+            cursor.executemany(sql, registros)
+            conexao.commit()
+            return True
+        except sqlite3.Error as e:
+            logger.error("Erro ao registrar artefatos no SQLite: %s", e)
+            conexao.rollback()
+            return False
+        finally:
+            cursor.close()
+
+def listar_artefatos_orfaos():
+    """Lista os artefatos cujo convidado não existe mais (excluído diretamente ou junto com o evento)."""
+    with obter_conexao() as conexao:
+        if not conexao:
+            return []
+        cursor = conexao.cursor()
+        artefatos = []
+        try:
+            cursor.execute("""SELECT a.convidado_id, a.tipo, a.evento_id, a.caminho
+                              FROM artefatos a
+                              LEFT JOIN convidados c ON c.id = a.convidado_id
+                              WHERE c.id IS NULL""")
+            artefatos = [dict(row) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            logger.error("Erro ao listar artefatos órfãos no SQLite: %s", e)
+        finally:
+            cursor.close()
+    return artefatos
+
+def remover_artefatos(chaves):
+    """Remove entradas do manifesto.
+
+    Args:
+        chaves (list): Tuplas (convidado_id, tipo).
+
+    Returns:
+        bool: True se removeu com sucesso.
+    """
+    if not chaves:
+        return True
+    with obter_conexao() as conexao:
+        if not conexao:
+            return False
+        cursor = conexao.cursor()
+        try:
+            cursor.executemany("DELETE FROM artefatos WHERE convidado_id = ? AND tipo = ?", chaves)
+            conexao.commit()
+            return True
+        except sqlite3.Error as e:
+            logger.error("Erro ao remover artefatos no SQLite: %s", e)
+            conexao.rollback()
+            return False
+        finally:
+            cursor.close()
+
+
+instrumentar_modulo(__name__)
@@ -1,179 +1,610 @@
 # -*- coding: utf-8 -*-
-from db.conexao import criar_conexao, fechar_conexao
+from db.conexao import obter_conexao
 import sqlite3 # Importar sqlite3 para tratar erros específicos
+import logging
+import secrets
+import re
+from modelos.registros import Convidado
+from instrumentacao import instrumentar_modulo
+from registro_log import falha, registrar_item
 
-def criar_convidado(evento_id, nome, email, telefone, status_presenca="pendente"):
-    """Cria um novo convidado associado a um evento no SQLite."""
-    conexao = criar_conexao()
-    if not conexao:
+logger = logging.getLogger(__name__)
+
+STATUS_PRESENCA_VALIDOS = ("pendente", "presente", "ausente")
+# Quantidade de linhas acumuladas antes de cada executemany na importação em lote
+TAMANHO_LOTE_IMPORTACAO = 5000
+# Tamanho padrão de página nas listagens paginadas por cursor (keyset)
+TAMANHO_PAGINA_PADRAO = 500
+# Limite de parâmetros por consulta "IN (...)" ao verificar e-mails existentes
+_MAX_PARAMETROS_IN = 500
+
+# Quantidade padrão de resultados da busca textual
+LIMITE_BUSCA_PADRAO = 20
+# Termos da busca textual: sequências de letras/dígitos (o restante vira separador,
+# como no tokenizador unicode61 do índice FTS5)
+_TERMO_BUSCA = re.compile(r"\w+")
+
+# row_factory das consultas de convidados: registros compactos em vez de dicts
+_fabrica_convidado = Convidado.fabrica()
+
+# Prefixo (com versão) do token de check-in gravado no QR Code: "CV1.<evento_id>.<token>"
+PREFIXO_TOKEN_CHECKIN = "CV1"
+
+def gerar_token():
+    """Gera um token aleatório e opaco (12 caracteres URL-safe) para o convidado."""
+    return secrets.token_urlsafe(9)
+
+def montar_token_checkin(evento_id, token):
+    """Monta o conteúdo compacto do QR Code usado no check-in."""
+    return f"{PREFIXO_TOKEN_CHECKIN}.{evento_id}.{token}"
+
+def interpretar_token_checkin(conteudo):
+    """Interpreta o conteúdo lido do QR Code.
+
+    Returns:
+        tuple: (evento_id, token), ou None se o conteúdo não estiver no formato esperado.
+    """
+    partes = conteudo.strip().split(".")
+    if len(partes) != 3 or partes[0] != PREFIXO_TOKEN_CHECKIN or not partes[1].isdigit() or not partes[2]:
         return None
-    cursor = conexao.cursor()
-    try:
-        # Verificar se o evento_id existe
-        cursor.execute("SELECT id FROM eventos WHERE id = ?", (evento_id,))
-        if cursor.fetchone() is None:
-            print(f"Erro: Evento com ID {evento_id} não encontrado.")
+    return int(partes[1]), partes[2]
+
+def email_valido(email):
+    """Validação simples de formato de e-mail (mesma regra usada na interface)."""
+    return "@" in email and "." in email.split("@")[-1]
+
+def criar_convidado(evento_id, nome, email, telefone, status_presenca="pendente"):
+    """Cria um novo convidado associado a um evento no SQLite. Retorna o ID, ou uma Falha (registro_log) se der erro."""
+    with obter_conexao() as conexao:
+        if not conexao:
+            return falha(logger, "criar_convidado", "Erro: sem conexão com o banco de dados para criar o convidado.")
+        cursor = conexao.cursor()
+        try:
+            # Verificar se o evento_id existe
+            cursor.execute("SELECT id FROM eventos WHERE id = ?", (evento_id,))
+            if cursor.fetchone() is None:
+                return falha(logger, "criar_convidado", f"Erro: Evento com ID {evento_id} não encontrado.")
+
+            # Validar status_presenca antes de inserir
+            if status_presenca not in STATUS_PRESENCA_VALIDOS:
+                return falha(logger, "criar_convidado", f"Erro: Status de presença \"{status_presenca}\" inválido ao criar convidado.")
+
+            sql = "INSERT INTO convidados (evento_id, nome, email, telefone, status_presenca, token) VALUES (?, ?, ?, ?, ?, ?)"
+            valores = (evento_id, nome, email, telefone, status_presenca, gerar_token())
+            cursor.execute(sql, valores)
+            conexao.commit()
+            convidado_id = cursor.lastrowid
+            registrar_item(logger, "Convidado \"%s\" (ID: %d) criado para o evento ID %s.", nome, convidado_id, evento_id)
+            return convidado_id
+        except sqlite3.IntegrityError as e:
+            # Trata erro de chave única (email) ou chave estrangeira
+            conexao.rollback()
+            if "UNIQUE constraint failed: convidados.email" in str(e):
+                return falha(logger, "criar_convidado", f"Erro: O email \"{email}\" já está cadastrado.", e)
+            return falha(logger, "criar_convidado", f"Erro de integridade ao criar convidado no SQLite: {e}", e)
+        except sqlite3.Error as e:
+            conexao.rollback()
+            return falha(logger, "criar_convidado", f"Erro ao criar convidado no SQLite: {e}", e)
+        finally:
+            cursor.close()
+
+def _inserir_lote_convidados(cursor, evento_id, lote, relatorio):
+    """Insere um lote já validado, descartando e-mails que já existem no banco."""
+    emails = [valores[1] for _, valores in lote if valores[1]]
+    existentes = set()
+    for inicio in range(0, len(emails), _MAX_PARAMETROS_IN):
+        parte = emails[inicio:inicio + _MAX_PARAMETROS_IN]
+        marcadores = ", ".join("?" * len(parte))
+        cursor.execute(f"SELECT email FROM convidados WHERE email IN ({marcadores})", parte)
+        existentes.update(row[0] for row in cursor.fetchall())
+
+    linhas_inserir = []
+    for numero, (nome, email, telefone, status) in lote:
+        if email and email in existentes:
+            relatorio["duplicados"].append({"linha": numero, "nome": nome, "email": email})
+            continue
+        linhas_inserir.append((evento_id, nome, email, telefone, status, gerar_token()))
+        relatorio["inseridos"].append({"linha": numero, "nome": nome, "email": email})
+
+    sql = "INSERT INTO convidados (evento_id, nome, email, telefone, status_presenca, token) VALUES (?, ?, ?, ?, ?, ?)"
+    cursor.executemany(sql, linhas_inserir)
+
+def criar_convidados_em_lote(evento_id, convidados):
+    """Cria vários convidados de um evento em uma única transação.
+
+    As linhas são consumidas de forma incremental (pode ser um gerador, como o
+    leitor de CSV) e gravadas com executemany a cada TAMANHO_LOTE_IMPORTACAO
+    linhas válidas. E-mails repetidos no próprio arquivo ou já cadastrados são
+    reportados como duplicados; nome ausente, e-mail mal formatado ou status
+    inválido são reportados como inválidos. Nenhuma linha é gravada se ocorrer
+    um erro de banco durante a importação.
+
+    Args:
+        evento_id (int): ID do evento ao qual os convidados pertencem.
+        convidados (iterable): Dicionários com as chaves nome, email, telefone
+                               e status_presenca (opcional, padrão 'pendente').
+
+    Returns:
+        dict: Relatório com as listas 'inseridos', 'duplicados' e 'invalidos',
+              cada item indicando a 'linha' (posição 1-based na entrada), ou
+              None se o evento não existir ou a transação falhar.
+    """
+    relatorio = {"inseridos": [], "duplicados": [], "invalidos": []}
+    with obter_conexao() as conexao:
+        if not conexao:
             return None
+        cursor = conexao.cursor()
+        try:
+            cursor.execute("SELECT id FROM eventos WHERE id = ?", (evento_id,))
+            if cursor.fetchone() is None:
+                logger.error("Erro: Evento com ID %s não encontrado.", evento_id)
+                return None
 
-        # Validar status_presenca antes de inserir
-        if status_presenca not in ["pendente", "presente", "ausente"]:
-             print(f"Erro: Status de presença 	\" {status_presenca}	\" inválido ao criar convidado.")
-             return None
-
-        sql = "INSERT INTO convidados (evento_id, nome, email, telefone, status_presenca) VALUES (?, ?, ?, ?, ?)"
-        valores = (evento_id, nome, email, telefone, status_presenca)
-        cursor.execute(sql, valores)
-        conexao.commit()
-        convidado_id = cursor.lastrowid
-        print(f"Convidado 	\" {nome}	\" (ID: {convidado_id}) criado para o evento ID {evento_id}.")
-        return convidado_id
-    except sqlite3.IntegrityError as e:
-        # Trata erro de chave única (email) ou chave estrangeira
-        print(f"Erro de integridade ao criar convidado no SQLite: {e}")
-        if "UNIQUE constraint failed: convidados.email" in str(e):
-             print(f"Erro: O email 	\" {email}	\" já está cadastrado.")
-        conexao.rollback()
-        return None
-    except sqlite3.Error as e:
-        print(f"Erro ao criar convidado no SQLite: {e}")
-        conexao.rollback()
-        return None
-    finally:
-        cursor.close()
-        fechar_conexao(conexao)
+            cursor.execute("BEGIN IMMEDIATE")
+            emails_vistos = set()
+            lote = []
+            for numero, convidado in enumerate(convidados, start=1):
+                nome = (convidado.get("nome") or "").strip()
+                email = (convidado.get("email") or "").strip() or None
+                telefone = (convidado.get("telefone") or "").strip() or None
+                status = (convidado.get("status_presenca") or "").strip().lower() or "pendente"
+
+                if not nome:
+                    motivo = "Nome obrigatório ausente."
+                elif email and not email_valido(email):
+                    motivo = f"Formato de e-mail inválido: {email}"
+                elif status not in STATUS_PRESENCA_VALIDOS:
+                    motivo = f"Status de presença inválido: {status}"
+                else:
+                    motivo = None
+                if motivo:
+                    relatorio["invalidos"].append({"linha": numero, "nome": nome, "motivo": motivo})
+                    continue
+
+                if email:
+                    if email in emails_vistos:
+                        relatorio["duplicados"].append({"linha": numero, "nome": nome, "email": email})
+                        continue
+                    emails_vistos.add(email)
+
+                lote.append((numero, (nome, email, telefone, status)))
+                if len(lote) >= TAMANHO_LOTE_IMPORTACAO:
+                    _inserir_lote_convidados(cursor, evento_id, lote, relatorio)
+                    lote = []
+            if lote:
+                _inserir_lote_convidados(cursor, evento_id, lote, relatorio)
+
+            conexao.commit()
+            logger.info("Importação para o evento ID %s: %d inseridos, %d duplicados, %d inválidos.", evento_id,
+                        len(relatorio["inseridos"]), len(relatorio["duplicados"]), len(relatorio["invalidos"]))
+            return relatorio
+        except sqlite3.Error as e:
+            logger.error("Erro ao importar convidados em lote no SQLite: %s", e)
+            conexao.rollback()
+            return None
+        finally:
+            cursor.close()
 
 def listar_convidados_por_evento(evento_id):
     """Lista todos os convidados de um evento específico no SQLite."""
-    conexao = criar_conexao()
-    if not conexao:
-        return []
-    cursor = conexao.cursor()
-    convidados = []
-    try:
-        sql = """SELECT c.id, c.nome, c.email, c.telefone, c.status_presenca, e.nome as nome_evento
-                 FROM convidados c
-                 JOIN eventos e ON c.evento_id = e.id
-                 WHERE c.evento_id = ?
-                 ORDER BY c.nome"""
-        cursor.execute(sql, (evento_id,))
-        convidados_raw = cursor.fetchall()
-        convidados = [dict(row) for row in convidados_raw] # Converte para dict
-    except sqlite3.Error as e:
-        print(f"Erro ao listar convidados do evento ID {evento_id} no SQLite: {e}")
-    finally:
-        cursor.close()
-        fechar_conexao(conexao)
+    with obter_conexao() as conexao:
+        if not conexao:
+            return []
+        cursor = conexao.cursor()
+        convidados = []
+        try:
+            sql = """SELECT c.id, c.nome, c.email, c.telefone, c.status_presenca, e.nome as nome_evento
+                     FROM convidados c
+                     JOIN eventos e ON c.evento_id = e.id
+                     WHERE c.evento_id = ?
+                     ORDER BY c.nome"""
+            cursor.row_factory = _fabrica_convidado
+            cursor.execute(sql, (evento_id,))
+            convidados = cursor.fetchall()
+        except sqlite3.Error as e:
+            logger.error("Erro ao listar convidados do evento ID %s no SQLite: %s", evento_id, e)
+        finally:
+            cursor.close()
     return convidados
 
 def listar_todos_convidados():
     """Lista todos os convidados de todos os eventos no SQLite."""
-    conexao = criar_conexao()
-    if not conexao:
-        return []
-    cursor = conexao.cursor()
-    convidados = []
-    try:
-        sql = """SELECT c.id, c.nome, c.email, c.telefone, c.status_presenca, e.nome as nome_evento, e.id as evento_id
-                 FROM convidados c
-                 JOIN eventos e ON c.evento_id = e.id
-                 ORDER BY e.nome, c.nome"""
-        cursor.execute(sql)
-        convidados_raw = cursor.fetchall()
-        convidados = [dict(row) for row in convidados_raw] # Converte para dict
-    except sqlite3.Error as e:
-        print(f"Erro ao listar todos os convidados no SQLite: {e}")
-    finally:
-        cursor.close()
-        fechar_conexao(conexao)
+    with obter_conexao() as conexao:
+        if not conexao:
+            return []
+        cursor = conexao.cursor()
+        convidados = []
+        try:
+            sql = """SELECT c.id, c.nome, c.email, c.telefone, c.status_presenca, e.nome as nome_evento, e.id as evento_id
+                     FROM convidados c
+                     JOIN eventos e ON c.evento_id = e.id
+                     ORDER BY e.nome, c.nome"""
+            cursor.row_factory = _fabrica_convidado
+            cursor.execute(sql)
+            convidados = cursor.fetchall()
+        except sqlite3.Error as e:
+            logger.error("Erro ao listar todos os convidados no SQLite: %s", e)
+        finally:
+            cursor.close()
     return convidados
 
+def paginar_convidados(evento_id=None, apos=None, limite=TAMANHO_PAGINA_PADRAO):
+    """Busca uma página de convidados ordenada por (nome, id) usando cursor keyset.
+
+    Em vez de OFFSET, a página seguinte começa logo após o último (nome, id) da
+    página anterior, o que percorre o índice sem reler as linhas já exibidas.
+
+    Args:
+        evento_id (int, optional): Restringe aos convidados do evento. None lista todos.
+        apos (tuple, optional): Cursor (nome, id) retornado pela página anterior.
+        limite (int): Quantidade máxima de convidados na página.
+
+    Returns:
+        tuple: (lista de registros Convidado da página, cursor da próxima página ou None se esta
+               for a última).
+    """
+    with obter_conexao() as conexao:
+        if not conexao:
+            return [], None
+        cursor = conexao.cursor()
+        convidados = []
+        try:
+            condicoes = []
+            parametros = []
+            if evento_id is not None:
+                condicoes.append("c.evento_id = ?")
+                parametros.append(evento_id)
+            if apos is not None:
+                condicoes.append("(c.nome, c.id) > (?, ?)")
+                parametros.extend(apos)
+            where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+            sql = f"""SELECT c.id, c.nome, c.email, c.telefone, c.status_presenca, c.token, e.nome as nome_evento, e.id as evento_id
+                      FROM convidados c
+                      JOIN eventos e ON c.evento_id = e.id
+                      {where}
+                      ORDER BY c.nome, c.id
+                      LIMIT ?"""
+            # Busca um registro a mais apenas para saber se existe próxima página
+            cursor.row_factory = _fabrica_convidado
+            cursor.execute(sql, (*parametros, limite + 1))
+            convidados = cursor.fetchall()
+        except sqlite3.Error as e:
+            logger.error("Erro ao paginar convidados no SQLite: %s", e)
+        finally:
+            cursor.close()
+    if len(convidados) > limite:
+        convidados = convidados[:limite]
+        ultimo = convidados[-1]
+        return convidados, (ultimo["nome"], ultimo["id"])
+    return convidados, None
+
+def iterar_convidados(evento_id=None, tamanho_pagina=TAMANHO_PAGINA_PADRAO):
+    """Gera os convidados (todos ou de um evento) página a página, ordenados por nome.
+
+    Apenas uma página fica em memória por vez, e a conexão não fica presa entre
+    as páginas, permitindo usar outras funções do modelo durante a iteração.
+
+    Yields:
+        Convidado: Um convidado por vez.
+    """
+    apos = None
+    while True:
+        pagina, apos = paginar_convidados(evento_id, apos, tamanho_pagina)
+        yield from pagina
+        if apos is None:
+            break
+
+def _expressao_busca(texto):
+    """Converte o texto digitado numa consulta FTS5: todos os termos, cada um como prefixo.
+
+    Cada termo vai entre aspas, então operadores e aspas digitados pelo usuário
+    não quebram a sintaxe do MATCH.
+    """
+    termos = _TERMO_BUSCA.findall(texto or "")
+    return " ".join(f'"{termo}"*' for termo in termos)
+
+def buscar_convidados(texto, evento_id=None, limite=LIMITE_BUSCA_PADRAO):
+    """Busca convidados por nome, e-mail ou telefone usando o índice FTS5.
+
+    A busca ignora maiúsculas e acentos e aceita termos incompletos
+    ("jo sil" encontra "João da Silva"); todos os termos precisam aparecer.
+    Os resultados vêm ordenados por relevância (bm25).
+
+    Args:
+        texto (str): Texto digitado.
+        evento_id (int, optional): Restringe aos convidados do evento.
+        limite (int): Quantidade máxima de resultados.
+
+    Returns:
+        list: Convidados encontrados (registros no formato de paginar_convidados);
+              lista vazia se nada for encontrado ou em caso de erro.
+    """
+    expressao = _expressao_busca(texto)
+    if not expressao:
+        return []
+    with obter_conexao() as conexao:
+        if not conexao:
+            return []
+        try:
+            condicao_evento = "AND c.evento_id = ?" if evento_id is not None else ""
+            parametros = (expressao, evento_id, limite) if evento_id is not None else (expressao, limite)
+            cursor = conexao.cursor()
+            cursor.row_factory = _fabrica_convidado
+            return cursor.execute(
+                f"""SELECT c.id, c.nome, c.email, c.telefone, c.status_presenca, c.token,
+                           e.nome as nome_evento, e.id as evento_id
+                    FROM convidados_fts f
+                    JOIN convidados c ON c.id = f.rowid
+                    JOIN eventos e ON c.evento_id = e.id
+                    WHERE convidados_fts MATCH ? {condicao_evento}
+                    ORDER BY f.rank
+                    LIMIT ?""",
+                parametros,
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.error("Erro ao buscar convidados no SQLite: %s", e)
+            return []
+
+def convidado_existe(convidado_id):
+    """Verifica pela chave primária se um convidado existe."""
+    with obter_conexao() as conexao:
+        if not conexao:
+            return False
+        try:
+            return conexao.execute("SELECT 1 FROM convidados WHERE id = ?", (convidado_id,)).fetchone() is not None
+        except sqlite3.Error as e:
+            logger.error("Erro ao verificar convidado ID %s no SQLite: %s", convidado_id, e)
+            return False
+
 def buscar_convidado_por_id(convidado_id):
     """Busca um convidado específico pelo seu ID no SQLite."""
-    conexao = criar_conexao()
-    if not conexao:
-        return None
-    cursor = conexao.cursor()
-    convidado = None
-    try:
-        sql = """SELECT c.id, c.evento_id, c.nome, c.email, c.telefone, c.status_presenca, e.nome as nome_evento
-                 FROM convidados c
-                 JOIN eventos e ON c.evento_id = e.id
-                 WHERE c.id = ?"""
-        cursor.execute(sql, (convidado_id,))
-        convidado_raw = cursor.fetchone()
-        if convidado_raw:
-            convidado = dict(convidado_raw) # Converte para dict
-    except sqlite3.Error as e:
-        print(f"Erro ao buscar convidado ID {convidado_id} no SQLite: {e}")
-    finally:
-        cursor.close()
-        fechar_conexao(conexao)
+    with obter_conexao() as conexao:
+        if not conexao:
+            return None
+        cursor = conexao.cursor()
+        convidado = None
+        try:
+            sql = """SELECT c.id, c.evento_id, c.nome, c.email, c.telefone, c.status_presenca, c.token, e.nome as nome_evento
+                     FROM convidados c
+                     JOIN eventos e ON c.evento_id = e.id
+                     WHERE c.id = ?"""
+            cursor.row_factory = _fabrica_convidado
+            cursor.execute(sql, (convidado_id,))
+            convidado = cursor.fetchone()
+        except sqlite3.Error as e:
+            logger.error("Erro ao buscar convidado ID %s no SQLite: %s", convidado_id, e)
+        finally:
+            cursor.close()
     return convidado
 
+def registrar_checkin(conteudo_qr, evento_id=None):
+    """Registra o check-in a partir do conteúdo lido do QR Code.
+
+    O token é resolvido pelo índice único da coluna token, e um único UPDATE
+    ... RETURNING marca o convidado como 'presente' e incrementa o contador de
+    leituras: assim o check-in é atômico e a leitura repetida é detectada na
+    mesma ida ao banco (checkins > 1).
+
+    Args:
+        conteudo_qr (str): Conteúdo lido do QR Code ("CV1.<evento_id>.<token>").
+        evento_id (int, optional): Evento em que a leitura acontece; QR Codes de
+                                   outro evento são recusados sem consultar o banco.
+
+    Returns:
+        dict: {'status': 'ok' | 'duplicado' | 'nao_encontrado' | 'evento_incorreto'
+               | 'invalido' | 'erro', 'convidado': {id, nome, evento_id} ou None,
+               'checkins': total de leituras do convidado}.
+    """
+    resultado = {"status": "invalido", "convidado": None, "checkins": 0}
+    token_lido = interpretar_token_checkin(conteudo_qr)
+    if token_lido is None:
+        return resultado
+    evento_token, token = token_lido
+    if evento_id is not None and evento_token != evento_id:
+        resultado["status"] = "evento_incorreto"
+        return resultado
+
+    return _executar_checkin("token = ? AND evento_id = ?", (token, evento_token))
+
+def registrar_checkin_por_id(convidado_id, evento_id):
+    """Registra o check-in de um convidado já identificado (ex.: token assinado "CV2:").
+
+    Mesmo UPDATE ... RETURNING atômico de registrar_checkin, pela chave primária.
+
+    Returns:
+        dict: Mesmo formato de registrar_checkin.
+    """
+    return _executar_checkin("id = ? AND evento_id = ?", (convidado_id, evento_id))
+
+def registrar_checkins_em_lote(itens):
+    """Registra vários check-ins numa única transação (group commit).
+
+    Um executemany aplica todas as atualizações e uma consulta por bloco de IDs
+    lê os contadores finais, tudo sob o mesmo BEGIN IMMEDIATE: um lock de escrita
+    e um commit para o lote inteiro. Leituras repetidas do mesmo convidado dentro
+    do lote são resolvidas na ordem de chegada (a primeira pode ser 'ok', as
+    seguintes são 'duplicado').
+
+    Args:
+        itens (list): Pares (convidado_id, evento_id), na ordem das leituras.
+
+    Returns:
+        list: Um dict por item, no formato de registrar_checkin e na mesma ordem,
+              ou None se a transação falhar (nada é gravado).
+    """
+    if not itens:
+        return []
+    with obter_conexao() as conexao:
+        if not conexao:
+            return None
+        try:
+            conexao.execute("BEGIN IMMEDIATE")
+            conexao.executemany(
+                """UPDATE convidados SET
+                       status_presenca = 'presente',
+                       checkins = checkins + 1,
+                       checkin_em = COALESCE(checkin_em, strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime'))
+                   WHERE id = ? AND evento_id = ?""",
+                itens,
+            )
+            ids = sorted({convidado_id for convidado_id, _ in itens})
+            linhas = {}
+            for i in range(0, len(ids), _MAX_PARAMETROS_IN):
+                bloco = ids[i:i + _MAX_PARAMETROS_IN]
+                marcadores = ",".join("?" * len(bloco))
+                for row in conexao.execute(
+                    f"SELECT id, nome, evento_id, checkins FROM convidados WHERE id IN ({marcadores})",
+                    bloco,
+                ):
+                    linhas[row["id"]] = row
+            conexao.commit()
+        except sqlite3.Error as e:
+            logger.error("Erro ao registrar lote de check-ins no SQLite: %s", e)
+            conexao.rollback()
+            return None
+
+    # Quantas leituras válidas de cada convidado o lote contém, para reconstruir o
+    # contador visto por cada uma delas a partir do valor final
+    restantes = {}
+    for convidado_id, evento_id in itens:
+        row = linhas.get(convidado_id)
+        if row is not None and row["evento_id"] == evento_id:
+            restantes[convidado_id] = restantes.get(convidado_id, 0) + 1
+
+    resultados = []
+    for convidado_id, evento_id in itens:
+        row = linhas.get(convidado_id)
+        if row is None or row["evento_id"] != evento_id:
+            resultados.append({"status": "nao_encontrado", "convidado": None, "checkins": 0})
+            continue
+        restantes[convidado_id] -= 1
+        checkins = row["checkins"] - restantes[convidado_id]
+        resultados.append({
+            "status": "ok" if checkins == 1 else "duplicado",
+            "convidado": {"id": row["id"], "nome": row["nome"], "evento_id": row["evento_id"]},
+            "checkins": checkins,
+        })
+    return resultados
+
+def _executar_checkin(condicao, parametros):
+    """Marca como 'presente' o convidado que atende à condição e conta a leitura."""
+    resultado = {"status": "invalido", "convidado": None, "checkins": 0}
+    with obter_conexao() as conexao:
+        if not conexao:
+            resultado["status"] = "erro"
+            return resultado
+        try:
+            row = conexao.execute(
+                f"""UPDATE convidados SET
+                       status_presenca = 'presente',
+                       checkins = checkins + 1,
+                       checkin_em = COALESCE(checkin_em, strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime'))
+                   WHERE {condicao}
+                   RETURNING id, nome, evento_id, checkins""",
+                parametros,
+            ).fetchone()
+            conexao.commit()
+        except sqlite3.Error as e:
+            logger.error("Erro ao registrar check-in no SQLite: %s", e)
+            conexao.rollback()
+            resultado["status"] = "erro"
+            return resultado
+
+    if row is None:
+        resultado["status"] = "nao_encontrado"
+        return resultado
+    resultado["convidado"] = {"id": row["id"], "nome": row["nome"], "evento_id": row["evento_id"]}
+    resultado["checkins"] = row["checkins"]
+    resultado["status"] = "ok" if row["checkins"] == 1 else "duplicado"
+    return resultado
+
+def listar_tokens_revogados(evento_id=None):
+    """Lista os IDs de convidados excluídos cujos tokens assinados devem ser recusados.
+
+    Args:
+        evento_id (int, optional): Restringe a um evento.
+
+    Returns:
+        list: IDs dos convidados revogados (lista vazia em caso de erro).
+    """
+    with obter_conexao() as conexao:
+        if not conexao:
+            return []
+        try:
+            if evento_id is None:
+                rows = conexao.execute("SELECT convidado_id FROM tokens_revogados ORDER BY convidado_id")
+            else:
+                rows = conexao.execute(
+                    "SELECT convidado_id FROM tokens_revogados WHERE evento_id = ? ORDER BY convidado_id",
+                    (evento_id,),
+                )
+            return [row[0] for row in rows]
+        except sqlite3.Error as e:
+            logger.error("Erro ao listar tokens revogados no SQLite: %s", e)
+            return []
+
 def atualizar_convidado(convidado_id, nome, email, telefone, status_presenca):
-    """Atualiza os dados de um convidado existente no SQLite."""
-    conexao = criar_conexao()
-    if not conexao:
-        return False
-    cursor = conexao.cursor()
-    try:
-        # Validar status_presenca
-        if status_presenca not in ["pendente", "presente", "ausente"]:
-            print(f"Erro: Status de presença 	\" {status_presenca}	\" inválido.")
-            return False
+    """Atualiza os dados de um convidado existente no SQLite. Retorna True, ou uma Falha se der erro."""
+    with obter_conexao() as conexao:
+        if not conexao:
+            return falha(logger, "atualizar_convidado", f"Erro: sem conexão com o banco de dados para atualizar o convidado ID {convidado_id}.")
+        cursor = conexao.cursor()
+        try:
+            # Validar status_presenca
+            if status_presenca not in STATUS_PRESENCA_VALIDOS:
+                return falha(logger, "atualizar_convidado", f"Erro: Status de presença \"{status_presenca}\" inválido.")
 
-        sql = """UPDATE convidados SET
-                    nome = ?,
-                    email = ?,
-                    telefone = ?,
-                    status_presenca = ?
-                 WHERE id = ?"""
-        valores = (nome, email, telefone, status_presenca, convidado_id)
-        cursor.execute(sql, valores)
-        conexao.commit()
-        if cursor.rowcount == 0:
-            print(f"Nenhum convidado encontrado com ID {convidado_id} para atualizar.")
-            return False
-        print(f"Convidado ID {convidado_id} atualizado com sucesso.")
-        return True
-    except sqlite3.IntegrityError as e:
-        print(f"Erro de integridade ao atualizar convidado ID {convidado_id} no SQLite: {e}")
-        if "UNIQUE constraint failed: convidados.email" in str(e):
-             print(f"Erro: O email 	\" {email}	\" já está cadastrado para outro convidado.")
-        conexao.rollback()
-        return False
-    except sqlite3.Error as e:
-        print(f"Erro ao atualizar convidado ID {convidado_id} no SQLite: {e}")
-        conexao.rollback()
-        return False
-    finally:
-        cursor.close()
-        fechar_conexao(conexao)
+            sql = """UPDATE convidados SET
+                        nome = ?,
+                        email = ?,
+                        telefone = ?,
+                        status_presenca = ?
+                     WHERE id = ?"""
+            valores = (nome, email, telefone, status_presenca, convidado_id)
+            cursor.execute(sql, valores)
+            conexao.commit()
+            if cursor.rowcount == 0:
+                return falha(logger, "atualizar_convidado", f"Nenhum convidado encontrado com ID {convidado_id} para atualizar.",
+                             nivel=logging.WARNING)
+            registrar_item(logger, "Convidado ID %s atualizado com sucesso.", convidado_id)
+            return True
+        except sqlite3.IntegrityError as e:
+            conexao.rollback()
+            if "UNIQUE constraint failed: convidados.email" in str(e):
+                return falha(logger, "atualizar_convidado", f"Erro: O email \"{email}\" já está cadastrado para outro convidado.", e)
+            return falha(logger, "atualizar_convidado",
+                         f"Erro de integridade ao atualizar convidado ID {convidado_id} no SQLite: {e}", e)
+        except sqlite3.Error as e:
+            conexao.rollback()
+            return falha(logger, "atualizar_convidado", f"Erro ao atualizar convidado ID {convidado_id} no SQLite: {e}", e)
+        finally:
+            cursor.close()
 
 def deletar_convidado(convidado_id):
-    """Deleta um convidado do banco de dados SQLite."""
-    conexao = criar_conexao()
-    if not conexao:
-        return False
-    cursor = conexao.cursor()
-    try:
-        # Verificar se o convidado existe
-        cursor.execute("SELECT id FROM convidados WHERE id = ?", (convidado_id,))
-        if cursor.fetchone() is None:
-            print(f"Nenhum convidado encontrado com ID {convidado_id} para deletar.")
-            return False
+    """Deleta um convidado do banco de dados SQLite. Retorna True, ou uma Falha se der erro."""
+    with obter_conexao() as conexao:
+        if not conexao:
+            return falha(logger, "deletar_convidado", f"Erro: sem conexão com o banco de dados para deletar o convidado ID {convidado_id}.")
+        cursor = conexao.cursor()
+        try:
+            # Verificar se o convidado existe
+            cursor.execute("SELECT id FROM convidados WHERE id = ?", (convidado_id,))
+            if cursor.fetchone() is None:
+                return falha(logger, "deletar_convidado", f"Nenhum convidado encontrado com ID {convidado_id} para deletar.",
+                             nivel=logging.WARNING)
+
+            cursor.execute("DELETE FROM convidados WHERE id = ?", (convidado_id,))
+            conexao.commit()
+            registrar_item(logger, "Convidado ID %s deletado com sucesso.", convidado_id)
+            return True
+        except sqlite3.Error as e:
+            conexao.rollback()
+            return falha(logger, "deletar_convidado", f"Erro ao deletar convidado ID {convidado_id} no SQLite: {e}", e)
+        finally:
+            cursor.close()
+
 
-        cursor.execute("DELETE FROM convidados WHERE id = ?", (convidado_id,))
-        conexao.commit()
-        print(f"Convidado ID {convidado_id} deletado com sucesso.")
-        return True
-    except sqlite3.Error as e:
-        print(f"Erro ao deletar convidado ID {convidado_id} no SQLite: {e}")
-        conexao.rollback()
-        return False
-    finally:
-        cursor.close()
-        fechar_conexao(conexao)
+instrumentar_modulo(__name__)
 
 # Exemplo de uso adaptado para SQLite
 if __name__ == "__main__":
@@ -188,6 +619,8 @@ if __name__ == "__main__":
         sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
         from modelos.evento import criar_evento as criar_evento_teste, listar_eventos as listar_eventos_teste, deletar_evento as deletar_evento_teste
     from datetime import date, time
+    import registro_log
+    registro_log.configurar()
 
     print("Inicializando banco SQLite para testes do modelo Convidado...")
     inicializar_banco()
@@ -1,165 +1,305 @@
 # -*- coding: utf-8 -*-
-from db.conexao import criar_conexao, fechar_conexao
+from db.conexao import obter_conexao
 import sqlite3 # Importar sqlite3 para tratar erros específicos
-from datetime import date, time, datetime # Para formatação
+from datetime import date, time # Para formatação
+from collections import OrderedDict
+from modelos.registros import Evento
+from instrumentacao import instrumentar_modulo
+from registro_log import falha, registrar_item
+import logging
+import threading
+import time as relogio
+
+logger = logging.getLogger(__name__)
+
+# Cache em memória de buscar_evento_por_id (eventos já convertidos para date/time).
+# A validade (TTL) limita por quanto tempo uma alteração feita por outro processo
+# pode passar despercebida; alterações feitas por este processo invalidam na hora.
+TTL_CACHE_EVENTOS = 60 # segundos
+MAX_CACHE_EVENTOS = 256
+_cache_eventos = OrderedDict() # evento_id -> (expira_em, evento)
+_cache_lock = threading.Lock()
+# Incrementada a cada invalidação: uma leitura do banco que começou antes dela
+# pode ter visto a linha antiga e não deve ir para o cache
+_geracao_cache = 0
+_fabrica_evento = Evento.fabrica()
+
+_cache_estatisticas = {"acertos": 0, "falhas": 0, "expirados": 0, "descartes": 0, "invalidacoes": 0}
 
 def criar_evento(nome, local, data, horario, descricao):
-    """Cria um novo evento no banco de dados SQLite."""
-    conexao = criar_conexao()
-    if not conexao:
-        return None
-    cursor = conexao.cursor()
-    try:
-        # Formatar data e hora para TEXT (ISO format)
-        data_str = data.isoformat() if isinstance(data, date) else data
-        horario_str = horario.strftime("%H:%M") if isinstance(horario, time) else horario
-
-        sql = "INSERT INTO eventos (nome, local, data, horario, descricao) VALUES (?, ?, ?, ?, ?)"
-        valores = (nome, local, data_str, horario_str, descricao)
-        cursor.execute(sql, valores)
-        conexao.commit()
-        evento_id = cursor.lastrowid
-        print(f"Evento 	'{nome}' criado com sucesso. ID: {evento_id}")
-        return evento_id
-    except sqlite3.Error as e:
-        print(f"Erro ao criar evento no SQLite: {e}")
-        conexao.rollback()
-        return None
-    finally:
-        cursor.close()
-        fechar_conexao(conexao)
-
-def listar_eventos():
-    """Lista todos os eventos do banco de dados SQLite."""
-    conexao = criar_conexao()
-    if not conexao:
-        return []
-    # row_factory já está configurado em criar_conexao para retornar dict-like rows
-    cursor = conexao.cursor()
-    eventos = []
-    try:
-        # Ajuste na formatação de data/hora se necessário ao ler, mas SQLite guarda como TEXT
-        cursor.execute("SELECT id, nome, local, data, horario, descricao FROM eventos ORDER BY data DESC, horario DESC")
-        # Converter para dicionários explicitamente se row_factory não funcionar como esperado
-        # ou processar os dados aqui
-        eventos_raw = cursor.fetchall()
-        eventos = [dict(row) for row in eventos_raw] # Converte sqlite3.Row para dict
-
-        # Tentar formatar data/hora na leitura para exibição consistente
-        for ev in eventos:
-            try:
-                if ev["data"]:
-                    ev["data"] = datetime.strptime(ev["data"], "%Y-%m-%d").strftime("%d/%m/%Y")
-            except (ValueError, TypeError):
-                ev["data"] = ev["data"] or "N/D" # Mantém como está se falhar
-            try:
-                if ev["horario"]:
-                     # Não precisa converter para strftime aqui, já é HH:MM
-                     pass # Mantém HH:MM
-            except (ValueError, TypeError):
-                 ev["horario"] = ev["horario"] or "N/D"
-
-    except sqlite3.Error as e:
-        print(f"Erro ao listar eventos no SQLite: {e}")
-    finally:
-        cursor.close()
-        fechar_conexao(conexao)
+    """Cria um novo evento no banco de dados SQLite. Retorna o ID, ou uma Falha (registro_log) se der erro."""
+    with obter_conexao() as conexao:
+        if not conexao:
+            return falha(logger, "criar_evento", "Erro: sem conexão com o banco de dados para criar o evento.")
+        cursor = conexao.cursor()
+        try:
+            # Formatar data e hora para TEXT (ISO format)
+            data_str = data.isoformat() if isinstance(data, date) else data
+            horario_str = horario.strftime("%H:%M") if isinstance(horario, time) else horario
+
+            sql = "INSERT INTO eventos (nome, local, data, horario, descricao) VALUES (?, ?, ?, ?, ?)"
+            valores = (nome, local, data_str, horario_str, descricao)
+            cursor.execute(sql, valores)
+            conexao.commit()
+            evento_id = cursor.lastrowid
+            registrar_item(logger, "Evento '%s' criado com sucesso. ID: %d", nome, evento_id)
+            return evento_id
+        except sqlite3.Error as e:
+            conexao.rollback()
+            return falha(logger, "criar_evento", f"Erro ao criar evento no SQLite: {e}", e)
+        finally:
+            cursor.close()
+
+def listar_eventos(evento_id=None):
+    """Lista todos os eventos do banco de dados SQLite.
+
+    Args:
+        evento_id (int, optional): Lista só este evento (ex.: para exibir um
+                                   evento recém-criado com os contadores).
+
+    Returns:
+        list: Registros Evento com os contadores de presença (total_convidados,
+              presentes, pendentes, ausentes); data_formatada/horario_formatado
+              trazem o texto de exibição.
+    """
+    with obter_conexao() as conexao:
+        if not conexao:
+            return []
+        # row_factory já está configurado no pool de conexões para retornar dict-like rows
+        cursor = conexao.cursor()
+        eventos = []
+        # Sem OR com o parâmetro nulo: com e.id = ? a consulta é uma busca pela chave primária
+        where, parametros = ("WHERE e.id = ?", (evento_id,)) if evento_id is not None else ("", ())
+        try:
+            # Cada linha vira um Evento compacto; data/horario são convertidos só quando
+            # usados (ev.data_formatada para exibição)
+            cursor.row_factory = _fabrica_evento
+            # Os contadores vêm de evento_stats (uma linha por evento, pela chave primária)
+            cursor.execute(f"""SELECT e.id, e.nome, e.local, e.data, e.horario, e.descricao,
+                                     COALESCE(s.total, 0) AS total_convidados,
+                                     COALESCE(s.presente, 0) AS presentes,
+                                     COALESCE(s.pendente, 0) AS pendentes,
+                                     COALESCE(s.ausente, 0) AS ausentes
+                              FROM eventos e
+                              LEFT JOIN evento_stats s ON s.evento_id = e.id
+                              {where}
+                              ORDER BY e.data DESC, e.horario DESC""", parametros)
+            eventos = cursor.fetchall()
+
+        except sqlite3.Error as e:
+            logger.error("Erro ao listar eventos no SQLite: %s", e)
+        finally:
+            cursor.close()
     return eventos
 
-def buscar_evento_por_id(evento_id):
-    """Busca um evento específico pelo seu ID no SQLite."""
-    conexao = criar_conexao()
-    if not conexao:
-        return None
-    cursor = conexao.cursor()
-    evento = None
-    try:
-        cursor.execute("SELECT id, nome, local, data, horario, descricao FROM eventos WHERE id = ?", (evento_id,))
-        evento_raw = cursor.fetchone()
-        if evento_raw:
-            evento = dict(evento_raw) # Converte para dict
-            # Tentar converter data/hora para objetos datetime na busca
-            try:
-                if evento["data"]:
-                    evento["data"] = datetime.strptime(evento["data"], "%Y-%m-%d").date()
-            except (ValueError, TypeError):
-                pass # Deixa como string se falhar
-            try:
-                if evento["horario"]:
-                    evento["horario"] = datetime.strptime(evento["horario"], "%H:%M").time()
-            except (ValueError, TypeError):
-                pass # Deixa como string se falhar
-
-    except sqlite3.Error as e:
-        print(f"Erro ao buscar evento ID {evento_id} no SQLite: {e}")
-    finally:
-        cursor.close()
-        fechar_conexao(conexao)
+def _ler_cache_evento(evento_id):
+    """Retorna (evento ou None, geração do cache no momento da consulta)."""
+    agora = relogio.monotonic()
+    with _cache_lock:
+        item = _cache_eventos.get(evento_id)
+        if item is not None:
+            expira_em, evento = item
+            if expira_em > agora:
+                _cache_eventos.move_to_end(evento_id)
+                _cache_estatisticas["acertos"] += 1
+                return evento, _geracao_cache
+            del _cache_eventos[evento_id]
+            _cache_estatisticas["expirados"] += 1
+        _cache_estatisticas["falhas"] += 1
+        return None, _geracao_cache
+
+def _guardar_cache_evento(evento_id, evento, geracao):
+    """Guarda o evento lido do banco, a menos que uma invalidação tenha ocorrido desde `geracao`."""
+    if TTL_CACHE_EVENTOS <= 0 or MAX_CACHE_EVENTOS <= 0:
+        return
+    with _cache_lock:
+        if geracao != _geracao_cache:
+            return
+        _cache_eventos[evento_id] = (relogio.monotonic() + TTL_CACHE_EVENTOS, evento)
+        _cache_eventos.move_to_end(evento_id)
+        while len(_cache_eventos) > MAX_CACHE_EVENTOS:
+            _cache_eventos.popitem(last=False)
+            _cache_estatisticas["descartes"] += 1
+
+def invalidar_cache_evento(evento_id=None):
+    """Remove um evento do cache (ou todos, se evento_id for None)."""
+    global _geracao_cache
+    with _cache_lock:
+        _geracao_cache += 1
+        if evento_id is None:
+            _cache_eventos.clear()
+        else:
+            _cache_eventos.pop(evento_id, None)
+        _cache_estatisticas["invalidacoes"] += 1
+
+def estatisticas_cache_eventos():
+    """Acertos, falhas, expirados, descartes (LRU) e invalidações do cache de eventos."""
+    with _cache_lock:
+        dados = dict(_cache_estatisticas)
+        dados["entradas"] = len(_cache_eventos)
+    consultas = dados["acertos"] + dados["falhas"]
+    dados["taxa_acerto"] = dados["acertos"] / consultas if consultas else 0.0
+    return dados
+
+def buscar_evento_por_id(evento_id, usar_cache=True):
+    """Busca um evento específico pelo seu ID no SQLite.
+
+    Retorna um Evento (modelos.registros), com data/horario como date/time. O
+    registro fica num cache em memória com validade TTL_CACHE_EVENTOS e descarte
+    LRU; atualizar_evento e deletar_evento o invalidam. Como os registros são
+    somente leitura, o mesmo objeto é devolvido a cada acerto, sem cópia.
+
+    Args:
+        evento_id (int): ID do evento.
+        usar_cache (bool): False força a leitura do banco (e atualiza o cache).
+    """
+    if usar_cache:
+        evento, geracao = _ler_cache_evento(evento_id)
+        if evento is not None:
+            return evento
+    else:
+        with _cache_lock:
+            geracao = _geracao_cache
+    with obter_conexao() as conexao:
+        if not conexao:
+            return None
+        cursor = conexao.cursor()
+        cursor.row_factory = _fabrica_evento
+        evento = None
+        try:
+            cursor.execute("SELECT id, nome, local, data, horario, descricao FROM eventos WHERE id = ?", (evento_id,))
+            evento = cursor.fetchone()
+        except sqlite3.Error as e:
+            logger.error("Erro ao buscar evento ID %s no SQLite: %s", evento_id, e)
+        finally:
+            cursor.close()
+    if evento is not None:
+        # Converte data/horario antes de guardar, para os acertos do cache não repetirem a conversão
+        evento.converter_campos()
+        _guardar_cache_evento(evento_id, evento, geracao)
     return evento
 
 def atualizar_evento(evento_id, nome, local, data, horario, descricao):
-    """Atualiza os dados de um evento existente no SQLite."""
-    conexao = criar_conexao()
-    if not conexao:
-        return False
-    cursor = conexao.cursor()
-    try:
-        # Formatar data e hora para TEXT (ISO format)
-        data_str = data.isoformat() if isinstance(data, date) else data
-        horario_str = horario.strftime("%H:%M") if isinstance(horario, time) else horario
-
-        sql = """UPDATE eventos SET
-                    nome = ?,
-                    local = ?,
-                    data = ?,
-                    horario = ?,
-                    descricao = ?
-                 WHERE id = ?"""
-        valores = (nome, local, data_str, horario_str, descricao, evento_id)
-        cursor.execute(sql, valores)
-        conexao.commit()
-        if cursor.rowcount == 0:
-            print(f"Nenhum evento encontrado com ID {evento_id} para atualizar.")
-            return False
-        print(f"Evento ID {evento_id} atualizado com sucesso.")
-        return True
-    except sqlite3.Error as e:
-        print(f"Erro ao atualizar evento ID {evento_id} no SQLite: {e}")
-        conexao.rollback()
-        return False
-    finally:
-        cursor.close()
-        fechar_conexao(conexao)
+    """Atualiza os dados de um evento existente no SQLite. Retorna True, ou uma Falha se der erro."""
+    with obter_conexao() as conexao:
+        if not conexao:
+            return falha(logger, "atualizar_evento", f"Erro: sem conexão com o banco de dados para atualizar o evento ID {evento_id}.")
+        cursor = conexao.cursor()
+        try:
+            # Formatar data e hora para TEXT (ISO format)
+            data_str = data.isoformat() if isinstance(data, date) else data
+            horario_str = horario.strftime("%H:%M") if isinstance(horario, time) else horario
+
+            sql = """UPDATE eventos SET
+                        nome = ?,
+                        local = ?,
+                        data = ?,
+                        horario = ?,
+                        descricao = ?
+                     WHERE id = ?"""
+            valores = (nome, local, data_str, horario_str, descricao, evento_id)
+            cursor.execute(sql, valores)
+            conexao.commit()
+            invalidar_cache_evento(evento_id)
+            if cursor.rowcount == 0:
+                return falha(logger, "atualizar_evento", f"Nenhum evento encontrado com ID {evento_id} para atualizar.",
+                             nivel=logging.WARNING)
+            registrar_item(logger, "Evento ID %s atualizado com sucesso.", evento_id)
+            return True
+        except sqlite3.Error as e:
+            conexao.rollback()
+            return falha(logger, "atualizar_evento", f"Erro ao atualizar evento ID {evento_id} no SQLite: {e}", e)
+        finally:
+            cursor.close()
 
 def deletar_evento(evento_id):
-    """Deleta um evento do banco de dados SQLite."""
-    conexao = criar_conexao()
-    if not conexao:
-        return False
-    cursor = conexao.cursor()
-    try:
-        # Verificar se o evento existe
-        cursor.execute("SELECT id FROM eventos WHERE id = ?", (evento_id,))
-        if cursor.fetchone() is None:
-            print(f"Nenhum evento encontrado com ID {evento_id} para deletar.")
-            return False
-
-        # Deletar o evento (PRAGMA foreign_keys = ON cuidará dos convidados)
-        cursor.execute("DELETE FROM eventos WHERE id = ?", (evento_id,))
-        conexao.commit()
-        print(f"Evento ID {evento_id} e seus convidados associados foram deletados com sucesso.")
-        return True
-    except sqlite3.Error as e:
-        print(f"Erro ao deletar evento ID {evento_id} no SQLite: {e}")
-        conexao.rollback()
-        return False
-    finally:
-        cursor.close()
-        fechar_conexao(conexao)
+    """Deleta um evento do banco de dados SQLite. Retorna True, ou uma Falha se der erro."""
+    with obter_conexao() as conexao:
+        if not conexao:
+            return falha(logger, "deletar_evento", f"Erro: sem conexão com o banco de dados para deletar o evento ID {evento_id}.")
+        cursor = conexao.cursor()
+        try:
+            # Verificar se o evento existe
+            cursor.execute("SELECT id FROM eventos WHERE id = ?", (evento_id,))
+            if cursor.fetchone() is None:
+                return falha(logger, "deletar_evento", f"Nenhum evento encontrado com ID {evento_id} para deletar.",
+                             nivel=logging.WARNING)
+
+            # Deletar o evento (PRAGMA foreign_keys = ON cuidará dos convidados)
+            cursor.execute("DELETE FROM eventos WHERE id = ?", (evento_id,))
+            conexao.commit()
+            invalidar_cache_evento(evento_id)
+            registrar_item(logger, "Evento ID %s e seus convidados associados foram deletados com sucesso.", evento_id)
+            return True
+        except sqlite3.Error as e:
+            conexao.rollback()
+            return falha(logger, "deletar_evento", f"Erro ao deletar evento ID {evento_id} no SQLite: {e}", e)
+        finally:
+            cursor.close()
+
+def estatisticas_evento(evento_id):
+    """Retorna os contadores de presença de um evento em O(1).
+
+    Os valores vêm da tabela evento_stats, mantida por triggers a cada inclusão,
+    alteração de status ou exclusão de convidado.
+
+    Returns:
+        dict: {'total', 'pendente', 'presente', 'ausente'}, ou None se o evento
+              não existir ou ocorrer um erro.
+    """
+    with obter_conexao() as conexao:
+        if not conexao:
+            return None
+        try:
+            row = conexao.execute(
+                "SELECT total, pendente, presente, ausente FROM evento_stats WHERE evento_id = ?",
+                (evento_id,),
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.error("Erro ao buscar estatísticas do evento ID %s no SQLite: %s", evento_id, e)
+            return None
+    return dict(row) if row else None
+
+def reconstruir_estatisticas_eventos():
+    """Recalcula evento_stats a partir da tabela convidados.
+
+    Útil para bancos alterados fora da aplicação (ex.: com os triggers
+    desativados) ou para conferir os contadores.
+
+    Returns:
+        int: Quantidade de eventos recalculados, ou None em caso de erro.
+    """
+    with obter_conexao() as conexao:
+        if not conexao:
+            return None
+        try:
+            conexao.execute("BEGIN IMMEDIATE")
+            conexao.execute("DELETE FROM evento_stats")
+            cursor = conexao.execute("""
+                INSERT INTO evento_stats (evento_id, total, pendente, presente, ausente)
+                SELECT e.id,
+                       COUNT(c.id),
+                       COALESCE(SUM(c.status_presenca IS 'pendente'), 0),
+                       COALESCE(SUM(c.status_presenca IS 'presente'), 0),
+                       COALESCE(SUM(c.status_presenca IS 'ausente'), 0)
+                FROM eventos e
+                LEFT JOIN convidados c ON c.evento_id = e.id
+                GROUP BY e.id""")
+            conexao.commit()
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            logger.error("Erro ao reconstruir estatísticas dos eventos no SQLite: %s", e)
+            conexao.rollback()
+            return None
+
+
+instrumentar_modulo(__name__)
 
 # Exemplo de uso adaptado para SQLite (pode ser removido ou comentado depois)
 if __name__ == "__main__":
     from db.conexao import inicializar_banco
+    import registro_log
+    registro_log.configurar()
     print("Inicializando banco SQLite para testes do modelo Evento...")
     inicializar_banco()
 
@@ -177,7 +317,7 @@ if __name__ == "__main__":
     if eventos:
         for ev in eventos:
             # A formatação de data/hora agora é feita dentro de listar_eventos
-            print(f" - ID: {ev['id']}, Nome: {ev['nome']}, Data: {ev['data']}, Hora: {ev['horario']}")
+            print(f" - ID: {ev['id']}, Nome: {ev['nome']}, Data: {ev.data_formatada}, Hora: {ev.horario_formatado}, Convidados: {ev['total_convidados']}")
     else:
         print("Nenhum evento encontrado.")
 
@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+"""Fila de jobs persistida no SQLite (tabela jobs).
+
+Cada job é reservado por um worker com um lease (prazo): enquanto o lease
+vale, nenhum outro worker o pega; se o worker morrer, o lease vence e o job
+volta a ser reservado por outro. Falhas voltam para a fila com espera
+crescente até max_tentativas, e então ficam como 'falhou'.
+"""
+import logging
+import sqlite3
+import time
+
+from db.conexao import obter_conexao
+from modelos.registros import Job
+from instrumentacao import instrumentar_modulo
+
+logger = logging.getLogger(__name__)
+
+TIPO_CONVITE = "convite"
+STATUS_JOB = ("pendente", "executando", "concluido", "falhou")
+MAX_TENTATIVAS = 3
+ESPERA_RETENTATIVA = 5.0 # Segundos antes da 2ª tentativa; dobra a cada nova falha
+
+_fabrica_job = Job.fabrica()
+
+
+def enfileirar_convites_evento(evento_id, max_tentativas=MAX_TENTATIVAS):
+    """Enfileira a geração do convite de cada convidado do evento.
+
+    Um único INSERT ... SELECT; convidados que já têm um job ativo (pendente ou
+    executando) são ignorados, então reenfileirar o mesmo evento é seguro.
+
+    Returns:
+        int: Quantidade de jobs criados, ou None se o evento não existir ou houver erro.
+    """
+    with obter_conexao() as conexao:
+        if not conexao:
+            return None
+        try:
+            if conexao.execute("SELECT 1 FROM eventos WHERE id = ?", (evento_id,)).fetchone() is None:
+                logger.error("Erro: Evento com ID %s não encontrado.", evento_id)
+                return None
+            cursor = conexao.execute(
+                """INSERT OR IGNORE INTO jobs (tipo, evento_id, convidado_id, max_tentativas, disponivel_em)
+                   SELECT ?, evento_id, id, ?, ? FROM convidados WHERE evento_id = ? ORDER BY id""",
+                (TIPO_CONVITE, max_tentativas, time.time(), evento_id),
+            )
+            conexao.commit()
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            logger.error("Erro ao enfileirar convites do evento ID %s no SQLite: %s", evento_id, e)
+            conexao.rollback()
+            return None
+
+
+def enfileirar_convite(convidado_id, max_tentativas=MAX_TENTATIVAS):
+    """Enfileira a geração do convite de um convidado.
+
+    Returns:
+        int: ID do job (o já ativo, se houver), ou None se o convidado não existir ou houver erro.
+    """
+    with obter_conexao() as conexao:
+        if not conexao:
+            return None
+        try:
+            conexao.execute(
+                """INSERT OR IGNORE INTO jobs (tipo, evento_id, convidado_id, max_tentativas, disponivel_em)
+                   SELECT ?, evento_id, id, ?, ? FROM convidados WHERE id = ?""",
+                (TIPO_CONVITE, max_tentativas, time.time(), convidado_id),
+            )
+            conexao.commit()
+            row = conexao.execute(
+                """SELECT id FROM jobs WHERE tipo = ? AND convidado_id = ?
+                   AND status IN ('pendente', 'executando')""",
+                (TIPO_CONVITE, convidado_id),
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.error("Erro ao enfileirar o convite do convidado ID %s no SQLite: %s", convidado_id, e)
+            conexao.rollback()
+            return None
+    if row is None:
+        logger.error("Erro: Convidado com ID %s não encontrado.", convidado_id)
+        return None
+    return row["id"]
+
+
+def reservar_jobs(dono, quantidade, lease_segundos, agora=None):
+    """Reserva até `quantidade` jobs para o worker `dono` por `lease_segundos`.
+
+    Pega primeiro os jobs com lease vencido (de workers que pararam) e depois
+    os pendentes já disponíveis, na ordem de disponibilidade. Tudo numa
+    transação BEGIN IMMEDIATE: dois workers nunca reservam o mesmo job. Jobs
+    com lease vencido que já esgotaram as tentativas passam a 'falhou'.
+
+    Returns:
+        list: Registros Job reservados (tentativas já incrementada), ou [] se a fila
+              estiver vazia ou houver erro.
+    """
+    agora = time.time() if agora is None else agora
+    with obter_conexao() as conexao:
+        if not conexao:
+            return []
+        cursor = conexao.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute(
+                """UPDATE jobs SET status = 'falhou', dono = NULL, lease_ate = NULL,
+                       erro = COALESCE(erro, 'Lease vencido: o worker parou antes de concluir.')
+                   WHERE status = 'executando' AND lease_ate < ? AND tentativas >= max_tentativas""",
+                (agora,),
+            )
+            ids = [row[0] for row in cursor.execute(
+                "SELECT id FROM jobs WHERE status = 'executando' AND lease_ate < ? LIMIT ?",
+                (agora, quantidade),
+            )]
+            if len(ids) < quantidade:
+                ids += [row[0] for row in cursor.execute(
+                    """SELECT id FROM jobs WHERE status = 'pendente' AND disponivel_em <= ?
+                       ORDER BY disponivel_em, id LIMIT ?""",
+                    (agora, quantidade - len(ids)),
+                )]
+            jobs = []
+            if ids:
+                marcadores = ", ".join("?" * len(ids))
+                cursor.row_factory = _fabrica_job
+                cursor.execute(
+                    f"""UPDATE jobs SET status = 'executando', dono = ?, lease_ate = ?,
+                           tentativas = tentativas + 1
+                       WHERE id IN ({marcadores})
+                       RETURNING id, tipo, evento_id, convidado_id, status, tentativas, max_tentativas""",
+                    (dono, agora + lease_segundos, *ids),
+                )
+                jobs = sorted(cursor.fetchall(), key=lambda job: ids.index(job.id))
+            conexao.commit()
+            return jobs
+        except sqlite3.Error as e:
+            logger.error("Erro ao reservar jobs no SQLite: %s", e)
+            conexao.rollback()
+            return []
+        finally:
+            cursor.close()
+
+
+def renovar_lease(ids, dono, lease_segundos, agora=None):
+    """Estende o lease dos jobs ainda reservados por `dono`.
+
+    Returns:
+        int: Quantidade de jobs renovados (os que outro worker já retomou ficam de fora).
+    """
+    if not ids:
+        return 0
+    agora = time.time() if agora is None else agora
+    marcadores = ", ".join("?" * len(ids))
+    with obter_conexao() as conexao:
+        if not conexao:
+            return 0
+        try:
+            cursor = conexao.execute(
+                f"""UPDATE jobs SET lease_ate = ?
+                    WHERE id IN ({marcadores}) AND dono = ? AND status = 'executando'""",
+                (agora + lease_segundos, *ids, dono),
+            )
+            conexao.commit()
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            logger.error("Erro ao renovar lease de jobs no SQLite: %s", e)
+            conexao.rollback()
+            return 0
+
+
+def finalizar_jobs(dono, concluidos=(), falhas=(), agora=None, espera_base=ESPERA_RETENTATIVA):
+    """Registra o resultado de um lote de jobs numa única transação.
+
+    Só altera jobs ainda reservados por `dono`: se o lease venceu e outro
+    worker retomou o job, o resultado deste é descartado.
+
+    Args:
+        dono (str): Worker que reservou os jobs.
+        concluidos (iterable): Pares (job_id, resultado em texto ou None).
+        falhas (iterable): Pares (job_id, mensagem de erro). O job volta para a fila
+                           após espera_base * 2^(tentativas-1) segundos, ou fica
+                           como 'falhou' se esgotou as tentativas.
+
+    Returns:
+        bool: True se gravou, False em caso de erro.
+    """
+    agora = time.time() if agora is None else agora
+    with obter_conexao() as conexao:
+        if not conexao:
+            return False
+        try:
+            conexao.execute("BEGIN IMMEDIATE")
+            conexao.executemany(
+                """UPDATE jobs SET status = 'concluido', resultado = ?, erro = NULL, dono = NULL,
+                       lease_ate = NULL, concluido_em = CURRENT_TIMESTAMP
+                   WHERE id = ? AND dono = ? AND status = 'executando'""",
+                ((resultado, job_id, dono) for job_id, resultado in concluidos),
+            )
+            conexao.executemany(
+                """UPDATE jobs SET
+                       status = CASE WHEN tentativas >= max_tentativas THEN 'falhou' ELSE 'pendente' END,
+                       disponivel_em = ? + ? * (1 << (tentativas - 1)),
+                       erro = ?, dono = NULL, lease_ate = NULL
+                   WHERE id = ? AND dono = ? AND status = 'executando'""",
+                ((agora, espera_base, erro, job_id, dono) for job_id, erro in falhas),
+            )
+            conexao.commit()
+            return True
+        except sqlite3.Error as e:
+            logger.error("Erro ao finalizar jobs no SQLite: %s", e)
+            conexao.rollback()
+            return False
+
+
+def liberar_jobs(ids, dono):
+    """Devolve à fila jobs reservados que não foram executados (ex.: worker interrompido).
+
+    A tentativa não é contada.
+
+    Returns:
+        int: Quantidade de jobs devolvidos.
+    """
+    if not ids:
+        return 0
+    marcadores = ", ".join("?" * len(ids))
+    with obter_conexao() as conexao:
+        if not conexao:
+            return 0
+        try:
+            cursor = conexao.execute(
+                f"""UPDATE jobs SET status = 'pendente', tentativas = tentativas - 1,
+                        dono = NULL, lease_ate = NULL
+                    WHERE id IN ({marcadores}) AND dono = ? AND status = 'executando'""",
+                (*ids, dono),
+            )
+            conexao.commit()
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            logger.error("Erro ao liberar jobs no SQLite: %s", e)
+            conexao.rollback()
+            return 0
+
+
+def progresso_jobs(evento_id=None):
+    """Resumo da fila (todos os eventos ou um).
+
+    Returns:
+        dict: Quantidade por status ('pendente', 'executando', 'concluido', 'falhou'),
+              'total', 'retentativas' (tentativas além da primeira) e 'percentual'
+              concluído (concluídos e falhos sobre o total), ou None em caso de erro.
+    """
+    filtro = "WHERE evento_id = ?" if evento_id is not None else ""
+    parametros = (evento_id,) if evento_id is not None else ()
+    with obter_conexao() as conexao:
+        if not conexao:
+            return None
+        try:
+            linhas = conexao.execute(
+                f"""SELECT status, COUNT(*) AS quantidade,
+                           COALESCE(SUM(MAX(tentativas - 1, 0)), 0) AS retentativas
+                    FROM jobs {filtro} GROUP BY status""",
+                parametros,
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.error("Erro ao consultar o progresso dos jobs no SQLite: %s", e)
+            return None
+    progresso = dict.fromkeys(STATUS_JOB, 0)
+    progresso["retentativas"] = 0
+    for row in linhas:
+        progresso[row["status"]] = row["quantidade"]
+        progresso["retentativas"] += row["retentativas"]
+    progresso["total"] = sum(progresso[status] for status in STATUS_JOB)
+    finalizados = progresso["concluido"] + progresso["falhou"]
+    progresso["percentual"] = round(100.0 * finalizados / progresso["total"], 1) if progresso["total"] else 100.0
+    return progresso
+
+
+def listar_jobs(evento_id=None, status=None, limite=100):
+    """Lista jobs (mais recentes primeiro), com filtro opcional por evento e status.
+
+    Returns:
+        list: Registros Job.
+    """
+    condicoes = []
+    parametros = []
+    if evento_id is not None:
+        condicoes.append("evento_id = ?")
+        parametros.append(evento_id)
+    if status is not None:
+        condicoes.append("status = ?")
+        parametros.append(status)
+    where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+    with obter_conexao() as conexao:
+        if not conexao:
+            return []
+        cursor = conexao.cursor()
+        try:
+            cursor.row_factory = _fabrica_job
+            cursor.execute(
+                f"""SELECT id, tipo, evento_id, convidado_id, status, tentativas, max_tentativas,
+                           dono, lease_ate, erro, resultado, criado_em, concluido_em
+                    FROM jobs {where} ORDER BY id DESC LIMIT ?""",
+                (*parametros, limite),
+            )
+            return cursor.fetchall()
+        except sqlite3.Error as e:
+            logger.error("Erro ao listar jobs no SQLite: %s", e)
+            return []
+        finally:
+            cursor.close()
+
+
+def reenfileirar_falhos(evento_id=None):
+    """Devolve os jobs 'falhou' à fila com as tentativas zeradas.
+
+    Returns:
+        int: Quantidade de jobs reenfileirados, ou None em caso de erro.
+    """
+    filtro = "AND evento_id = ?" if evento_id is not None else ""
+    parametros = (evento_id,) if evento_id is not None else ()
+    with obter_conexao() as conexao:
+        if not conexao:
+            return None
+        try:
+            # Um convidado pode ter ganhado outro job ativo depois da falha: esse não volta
+            cursor = conexao.execute(
+                f"""UPDATE OR IGNORE jobs SET status = 'pendente', tentativas = 0, disponivel_em = ?
+                    WHERE status = 'falhou' {filtro}""",
+                (time.time(), *parametros),
+            )
+            conexao.commit()
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            logger.error("Erro ao reenfileirar jobs no SQLite: %s", e)
+            conexao.rollback()
+            return None
+
+
+instrumentar_modulo(__name__)
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""Registros compactos (com __slots__) devolvidos pelos modelos.
+
+Substituem os dicts criados a cada linha: cada registro guarda só os valores
+das colunas consultadas, sem o dicionário por instância. O acesso por chave
+continua funcionando (ev["nome"], conv.get("token"), dict(conv)), junto com o
+acesso por atributo (ev.nome). Os registros não são alterados depois de lidos,
+por isso podem ser compartilhados (ex.: cache de eventos) sem cópias.
+"""
+from datetime import date, time
+
+
+class Registro:
+    """Base dos registros montados pelo row_factory de cada modelo.
+
+    Subclasses definem __slots__ e, em _COLUNAS, o slot de cada coluna do banco
+    (quando o nome difere, como em colunas com conversão preguiçosa).
+    """
+    __slots__ = ()
+    _COLUNAS = {}
+    # Propriedades calculadas também acessíveis por chave (ex.: ev["data_formatada"])
+    _CHAVES_EXTRAS = ()
+
+    @classmethod
+    def fabrica(cls):
+        """Retorna o row_factory (para cursor.row_factory) que monta registros desta classe."""
+        colunas = cls._COLUNAS
+        novo = object.__new__
+        # (descrição do cursor, setters dos slots na ordem das colunas), trocados
+        # juntos numa única atribuição para que threads usando a mesma fábrica
+        # não se misturem
+        ultima = [(None, ())]
+
+        def row_factory(cursor, linha):
+            descricao = cursor.description
+            descricao_anterior, setters = ultima[0]
+            # Os setters são resolvidos uma vez por consulta, não por linha; o
+            # __set__ do descritor de cada slot grava direto, sem passar pelo
+            # __setattr__ (que bloqueia alterações)
+            if descricao is not descricao_anterior:
+                setters = tuple(getattr(cls, colunas.get(d[0], d[0])).__set__ for d in descricao)
+                ultima[0] = (descricao, setters)
+            registro = novo(cls)
+            for setter, valor in zip(setters, linha):
+                setter(registro, valor)
+            return registro
+        return row_factory
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        coluna_do_slot = {slot: coluna for coluna, slot in cls._COLUNAS.items()}
+        # (nome da coluna, slot) na ordem dos __slots__; slots "_" internos ficam de fora
+        cls._CAMPOS = tuple(
+            (coluna_do_slot.get(slot, slot), slot)
+            for slot in cls.__slots__
+            if not slot.startswith("_") or slot in coluna_do_slot
+        )
+        cls._CHAVES = frozenset(coluna for coluna, _ in cls._CAMPOS) | frozenset(cls._CHAVES_EXTRAS)
+
+    def keys(self):
+        """Colunas lidas do banco (como as chaves do dict usado antes)."""
+        return [coluna for coluna, slot in self._CAMPOS if _tem_slot(self, slot)]
+
+    def __getitem__(self, chave):
+        if chave in self._CHAVES:
+            try:
+                return getattr(self, chave)
+            except AttributeError:
+                pass # Coluna não incluída na consulta que montou o registro
+        raise KeyError(chave)
+
+    def get(self, chave, padrao=None):
+        try:
+            return self[chave]
+        except KeyError:
+            return padrao
+
+    def __contains__(self, chave):
+        return chave in self.keys()
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def items(self):
+        return [(chave, self[chave]) for chave in self.keys()]
+
+    def values(self):
+        return [self[chave] for chave in self.keys()]
+
+    def para_dict(self):
+        """Cópia em dict (ex.: para serializar em JSON)."""
+        return {chave: self[chave] for chave in self.keys()}
+
+    def __setattr__(self, nome, valor):
+        raise AttributeError(f"{type(self).__name__} é somente leitura")
+
+    def __eq__(self, outro):
+        if isinstance(outro, Registro):
+            return type(self) is type(outro) and self.para_dict() == outro.para_dict()
+        if isinstance(outro, dict):
+            return self.para_dict() == outro
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        campos = ", ".join(f"{chave}={self[chave]!r}" for chave in self.keys())
+        return f"{type(self).__name__}({campos})"
+
+    def __getstate__(self):
+        return {slot: object.__getattribute__(self, slot)
+                for slot in self.__slots__ if _tem_slot(self, slot)}
+
+    def __setstate__(self, estado):
+        for slot, valor in estado.items():
+            object.__setattr__(self, slot, valor)
+
+
+def _tem_slot(registro, slot):
+    try:
+        object.__getattribute__(registro, slot)
+        return True
+    except AttributeError:
+        return False
+
+
+class Evento(Registro):
+    """Evento lido do banco.
+
+    data e horario ficam como texto (como estão no SQLite) e só são convertidos
+    para date/time no primeiro acesso; data_formatada e horario_formatado dão o
+    texto de exibição (dd/mm/aaaa e HH:MM, ou "N/D").
+    """
+    __slots__ = ("id", "nome", "local", "_data_texto", "_horario_texto", "descricao",
+                 "total_convidados", "presentes", "pendentes", "ausentes",
+                 "_data", "_horario")
+    _COLUNAS = {"data": "_data_texto", "horario": "_horario_texto"}
+    _CHAVES_EXTRAS = ("data_formatada", "horario_formatado")
+
+    @property
+    def data(self):
+        try:
+            return self._data
+        except AttributeError: # Primeiro acesso: converte e guarda
+            valor = _converter(self._data_texto, date)
+            object.__setattr__(self, "_data", valor)
+            return valor
+
+    @property
+    def horario(self):
+        try:
+            return self._horario
+        except AttributeError:
+            valor = _converter(self._horario_texto, time)
+            object.__setattr__(self, "_horario", valor)
+            return valor
+
+    def converter_campos(self):
+        """Converte data e horario agora, em vez de no primeiro acesso, e os retorna.
+
+        Usado antes de compartilhar o registro (cache de eventos), para que os
+        acessos seguintes não repitam a conversão.
+        """
+        return self.data, self.horario
+
+    @property
+    def data_formatada(self):
+        data = self.data
+        if isinstance(data, date):
+            return data.strftime("%d/%m/%Y")
+        return data or "N/D"
+
+    @property
+    def horario_formatado(self):
+        horario = self.horario
+        if isinstance(horario, time):
+            return horario.strftime("%H:%M")
+        return horario or "N/D"
+
+
+class Convidado(Registro):
+    """Convidado lido do banco (as colunas presentes dependem da consulta)."""
+    __slots__ = ("id", "evento_id", "nome", "email", "telefone", "status_presenca",
+                 "token", "nome_evento", "checkins", "checkin_em")
+
+
+class Job(Registro):
+    """Item da fila de jobs (tabela jobs)."""
+    __slots__ = ("id", "tipo", "evento_id", "convidado_id", "status", "tentativas", "max_tentativas",
+                 "disponivel_em", "dono", "lease_ate", "erro", "resultado", "criado_em", "concluido_em")
+
+
+def _converter(texto, tipo):
+    """Converte texto ISO em date/time; mantém o texto original se não for possível."""
+    if not texto or not isinstance(texto, str):
+        return texto
+    try:
+        return tipo.fromisoformat(texto)
+    except ValueError:
+        return texto
@@ -0,0 +1,334 @@
+# -*- coding: utf-8 -*-
+"""Mensagens do sistema via logging: fila não bloqueante, níveis e progresso de lotes.
+
+Modelos e serviços registram as mensagens com logging.getLogger(__name__) em
+vez de print. configurar() (chamado pelo menu, pela linha de comando e pelos
+scripts) liga o logger raiz a um QueueHandler: quem registra só coloca a
+mensagem numa fila, e uma thread (QueueListener) a escreve no terminal, sem
+que a geração dos convites espere pela escrita. Sem configurar(), vale o
+padrão do Python: só avisos e erros, em stderr.
+
+O nível vem do argumento ou de CONVITE_LOG_NIVEL (padrão: INFO). Com
+CONVITE_LOG_ARQUIVO, as mensagens também são gravadas nesse arquivo, com data,
+nível e módulo.
+
+Modo lote: enquanto um ProgressoLote está aberto, as linhas de sucesso de cada
+item (registrar_item) e os erros de cada item (falha) da mesma thread descem
+para DEBUG; as demais threads do processo não são afetadas. O lote
+registra a cada INTERVALO_PROGRESSO segundos uma linha com o total processado,
+a taxa, a estimativa de término e a contagem de erros, e um resumo no final.
+
+Uso:
+    CONVITE_LOG_NIVEL=DEBUG CONVITE_LOG_ARQUIVO=convites.log python main.py convites gerar --evento 1
+"""
+import atexit
+import logging
+import os
+import sys
+import threading
+import time
+
+NIVEL_PADRAO = os.environ.get("CONVITE_LOG_NIVEL", "INFO")
+ARQUIVO_PADRAO = os.environ.get("CONVITE_LOG_ARQUIVO") or None
+NIVEIS = ("DEBUG", "INFO", "WARNING", "ERROR")
+FORMATO_TERMINAL = "%(message)s"
+FORMATO_DETALHADO = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+INTERVALO_PROGRESSO = 5.0 # Segundos entre as linhas de progresso de um lote
+MAX_ERROS_RESUMO = 5 # Erros de itens repetidos no resumo do lote (os demais só são contados)
+
+logger = logging.getLogger(__name__)
+_lock = threading.Lock()
+_fila_handler = None # QueueHandler ligado ao logger raiz
+_ouvinte = None # QueueListener que escreve as mensagens da fila
+_handlers = [] # Handlers de saída (terminal e arquivo) instalados por configurar()
+# ProgressoLote abertos: por thread (decide o nível das mensagens de item) e no
+# processo todo (herdado pelos filhos de fork, que são workers dos lotes)
+_lotes_thread = threading.local()
+_lotes_processo = 0
+_relogio = time.perf_counter
+
+
+def nivel_numerico(nivel):
+    """Converte 'DEBUG', 'info', 20... no número do nível. Levanta ValueError se for inválido."""
+    if isinstance(nivel, int):
+        return nivel
+    numero = logging.getLevelName(str(nivel).strip().upper())
+    if not isinstance(numero, int):
+        raise ValueError(f"Nível de log inválido: {nivel} (use {', '.join(NIVEIS)}).")
+    return numero
+
+
+def _remover_configuracao():
+    """Desliga o QueueHandler e os handlers de configurar(), esvaziando a fila antes."""
+    global _fila_handler, _ouvinte
+    raiz = logging.getLogger()
+    if _ouvinte is not None:
+        _ouvinte.stop() # Escreve o que ainda estiver na fila
+        _ouvinte = None
+    if _fila_handler is not None:
+        raiz.removeHandler(_fila_handler)
+        _fila_handler = None
+    for handler in _handlers:
+        raiz.removeHandler(handler)
+        handler.close() # Não fecha sys.stdout/sys.stderr, só arquivos
+    _handlers.clear()
+
+
+def configurar(nivel=None, saida=None, arquivo=None, formato=FORMATO_TERMINAL, assincrono=True):
+    """Configura o logger raiz do processo. Pode ser chamada de novo para trocar a configuração.
+
+    Args:
+        nivel (str|int, optional): Nível mínimo. Padrão: CONVITE_LOG_NIVEL ou INFO.
+        saida (optional): Stream do terminal. Padrão: sys.stdout.
+        arquivo (str, optional): Grava também neste arquivo. Padrão: CONVITE_LOG_ARQUIVO.
+        formato (str): Formato das linhas no terminal (o arquivo usa FORMATO_DETALHADO).
+        assincrono (bool): Escreve pela fila numa thread própria. Com False, cada
+                           mensagem é escrita na hora (o menu interativo usa assim,
+                           para as mensagens não saírem depois dos prompts).
+
+    Returns:
+        int: O nível efetivo.
+    """
+    global _fila_handler, _ouvinte
+    if nivel is None:
+        try:
+            nivel = nivel_numerico(NIVEL_PADRAO)
+        except ValueError as e:
+            nivel = logging.INFO
+            print(f"Aviso: {e} Usando INFO.", file=sys.stderr)
+    else:
+        nivel = nivel_numerico(nivel)
+    arquivo = arquivo or ARQUIVO_PADRAO
+
+    with _lock:
+        _remover_configuracao()
+        terminal = logging.StreamHandler(saida or sys.stdout)
+        terminal.setFormatter(logging.Formatter(formato))
+        _handlers.append(terminal)
+        if arquivo:
+            try:
+                gravador = logging.FileHandler(arquivo, encoding="utf-8")
+                gravador.setFormatter(logging.Formatter(FORMATO_DETALHADO))
+                _handlers.append(gravador)
+            except OSError as e:
+                print(f"Erro ao abrir o arquivo de log \"{arquivo}\": {e}", file=sys.stderr)
+
+        raiz = logging.getLogger()
+        raiz.setLevel(nivel)
+        if assincrono:
+            import queue
+            from logging.handlers import QueueHandler, QueueListener
+            fila = queue.SimpleQueue()
+            _fila_handler = QueueHandler(fila)
+            _ouvinte = QueueListener(fila, *_handlers)
+            _ouvinte.start()
+            raiz.addHandler(_fila_handler)
+        else:
+            for handler in _handlers:
+                raiz.addHandler(handler)
+    return nivel
+
+
+def encerrar():
+    """Escreve as mensagens pendentes na fila e desfaz a configuração (chamada ao sair)."""
+    with _lock:
+        _remover_configuracao()
+
+
+def _apos_fork():
+    # O processo filho (pools com fork) herda o QueueHandler, mas não a thread
+    # que esvazia a fila: passa a escrever diretamente nos mesmos destinos
+    global _fila_handler, _ouvinte, _lock
+    _lock = threading.Lock()
+    if _fila_handler is not None:
+        raiz = logging.getLogger()
+        raiz.removeHandler(_fila_handler)
+        for handler in _handlers:
+            raiz.addHandler(handler)
+    _fila_handler = None
+    _ouvinte = None
+    # O fork pode partir de uma thread auxiliar do lote (estágios do pipeline):
+    # o filho trabalha para os lotes abertos no pai, qualquer que seja a thread
+    _lotes_thread.quantidade = _lotes_processo
+
+
+atexit.register(encerrar)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_apos_fork)
+
+
+# --- Itens e falhas ---
+
+def em_lote():
+    """True enquanto a thread atual tem um ProgressoLote aberto.
+
+    Outras threads (servidor de check-in, menu) não são afetadas. Num processo
+    filho de pool criado por fork durante um lote, vale True.
+    """
+    return getattr(_lotes_thread, "quantidade", 0) > 0
+
+
+def registrar_item(log, mensagem, *args):
+    """Registra o sucesso de uma operação unitária: INFO fora de lotes, DEBUG dentro deles."""
+    log.log(logging.DEBUG if em_lote() else logging.INFO, mensagem, *args)
+
+
+class Falha:
+    """Resultado de uma operação que falhou, devolvido no lugar de None ou False.
+
+    É avaliada como falsa, então os testes `if not resultado` continuam valendo,
+    e guarda a operação, a mensagem e o tipo da exceção, para os relatórios de
+    erros dos lotes e a saída da linha de comando.
+    """
+
+    __slots__ = ("operacao", "mensagem", "tipo")
+
+    def __init__(self, operacao, mensagem, tipo=None):
+        self.operacao = operacao
+        self.mensagem = mensagem
+        self.tipo = tipo
+
+    def __bool__(self):
+        return False
+
+    def __str__(self):
+        return self.mensagem
+
+    def __repr__(self):
+        return f"Falha({self.operacao!r}, {self.mensagem!r})"
+
+    def como_dict(self):
+        return {"operacao": self.operacao, "mensagem": self.mensagem, "tipo": self.tipo}
+
+
+def falha(log, operacao, mensagem, excecao=None, nivel=logging.ERROR):
+    """Registra o erro de uma operação unitária e devolve a Falha correspondente.
+
+    Dentro de um lote o registro desce para DEBUG: o lote conta o erro e o
+    relatório dele traz a mensagem.
+
+    Args:
+        log (logging.Logger): Logger do módulo que falhou.
+        operacao (str): Nome da operação (ex.: 'gerar_qrcode').
+        mensagem (str): Mensagem completa, já formatada.
+        excecao (Exception, optional): Exceção que causou o erro.
+        nivel (int): Nível fora de lotes (ex.: logging.WARNING para 'não encontrado').
+    """
+    log.log(logging.DEBUG if em_lote() else nivel, "%s", mensagem)
+    return Falha(operacao, mensagem, type(excecao).__name__ if excecao is not None else None)
+
+
+# --- Progresso de lotes ---
+
+def _duracao(segundos):
+    segundos = int(segundos)
+    if segundos >= 3600:
+        return f"{segundos // 3600}h{segundos % 3600 // 60:02d}min"
+    if segundos >= 60:
+        return f"{segundos // 60}min{segundos % 60:02d}s"
+    return f"{segundos}s"
+
+
+class ProgressoLote:
+    """Progresso agregado de uma operação em lote, no lugar de uma linha por item.
+
+    Use como contexto, numa única thread: sucesso() e erro() contam os itens, e
+    a cada `intervalo` segundos sai uma linha com total, taxa, ETA (quando o
+    total é conhecido), erros e, se informado, o texto devolvido por
+    `detalhe()`. Ao sair do contexto, registra o resumo com os primeiros
+    MAX_ERROS_RESUMO erros. O relatório completo de erros continua sendo o da
+    função que executa o lote.
+
+    Exemplo:
+        with ProgressoLote("QR Codes do evento ID 1", total=1000, log=logger) as progresso:
+            for convidado in convidados:
+                progresso.sucesso() # ou progresso.erro(convidado["id"], mensagem)
+    """
+
+    def __init__(self, descricao, total=None, log=None, intervalo=None, unidade="itens", detalhe=None):
+        self.descricao = descricao
+        self.total = total
+        self.log = log or logger
+        self.intervalo = INTERVALO_PROGRESSO if intervalo is None else intervalo
+        self.unidade = unidade
+        self.detalhe = detalhe
+        self.sucessos = 0
+        self.erros = 0
+        self.primeiros_erros = [] # (chave, mensagem)
+        self.inicio = None
+        self.duracao = 0.0
+        self._proximo = 0.0
+
+    def __enter__(self):
+        global _lotes_processo
+        _lotes_thread.quantidade = getattr(_lotes_thread, "quantidade", 0) + 1
+        with _lock:
+            _lotes_processo += 1
+        self.inicio = _relogio()
+        self._proximo = self.inicio + self.intervalo
+        return self
+
+    def __exit__(self, tipo, valor, rastro):
+        global _lotes_processo
+        _lotes_thread.quantidade -= 1
+        with _lock:
+            _lotes_processo -= 1
+        self.finalizar(interrompido=tipo is not None)
+        return False
+
+    @property
+    def processados(self):
+        return self.sucessos + self.erros
+
+    def sucesso(self, quantidade=1):
+        self.sucessos += quantidade
+        if _relogio() >= self._proximo:
+            self.registrar()
+
+    def erro(self, chave, mensagem):
+        self.erros += 1
+        if len(self.primeiros_erros) < MAX_ERROS_RESUMO:
+            self.primeiros_erros.append((chave, str(mensagem)))
+        if _relogio() >= self._proximo:
+            self.registrar()
+
+    def resumo(self):
+        """{'processados', 'sucessos', 'erros', 'duracao', 'itens_por_segundo', 'eta'} (eta em segundos ou None)."""
+        decorrido = (_relogio() - self.inicio) if self.inicio is not None else 0.0
+        taxa = self.processados / decorrido if decorrido > 0 else 0.0
+        eta = None
+        if self.total is not None and taxa > 0:
+            eta = max(self.total - self.processados, 0) / taxa
+        return {
+            "processados": self.processados,
+            "sucessos": self.sucessos,
+            "erros": self.erros,
+            "duracao": decorrido,
+            "itens_por_segundo": taxa,
+            "eta": eta,
+        }
+
+    def registrar(self):
+        """Registra a linha de progresso agora (INFO)."""
+        self._proximo = _relogio() + self.intervalo
+        resumo = self.resumo()
+        if self.total:
+            feitos = f"{resumo['processados']}/{self.total} ({100.0 * resumo['processados'] / self.total:.1f}%)"
+        else:
+            feitos = str(resumo["processados"])
+        eta = f", ETA {_duracao(resumo['eta'])}" if resumo["eta"] is not None else ""
+        detalhe = f"; {self.detalhe()}" if self.detalhe else ""
+        self.log.info("%s: %s %s, %.1f %s/s%s, %d erro(s)%s.", self.descricao, feitos, self.unidade,
+                      resumo["itens_por_segundo"], self.unidade, eta, resumo["erros"], detalhe)
+
+    def finalizar(self, interrompido=False):
+        """Registra o resumo final (chamado ao sair do contexto)."""
+        resumo = self.resumo()
+        self.duracao = resumo["duracao"]
+        self.log.info("%s: %s %d %s em %.2fs (%.1f %s/s), %d sucesso(s), %d erro(s).", self.descricao,
+                      "interrompido após" if interrompido else "concluído,", resumo["processados"], self.unidade,
+                      resumo["duracao"], resumo["itens_por_segundo"], self.unidade, resumo["sucessos"], resumo["erros"])
+        for chave, mensagem in self.primeiros_erros:
+            self.log.warning("%s: erro em %s: %s", self.descricao, chave, mensagem)
+        if self.erros > len(self.primeiros_erros):
+            self.log.warning("%s: mais %d erro(s) no relatório.", self.descricao, self.erros - len(self.primeiros_erros))
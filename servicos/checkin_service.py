@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+import os
+from concurrent.futures import Future
+
+from modelos import convidado as modelo_convidado
+from servicos.verificador_tokens import VerificadorTokens, eh_token_assinado
+from instrumentacao import instrumentar_modulo, registrar_bytes
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+REVOGACOES_DIR = os.path.join(BASE_DIR, "dados", "revogacoes")
+
+# Verificador compartilhado pelas leituras online (só a assinatura é conferida aqui;
+# revogação e reentrada são resolvidas pelo próprio banco)
+_verificador = None
+
+
+def _obter_verificador():
+    global _verificador
+    if _verificador is None:
+        try:
+            _verificador = VerificadorTokens()
+        except ValueError as e:
+            logger.error("Erro ao preparar a verificação de tokens: %s", e)
+            return None
+    return _verificador
+
+
+def registrar_checkin(conteudo_qr, evento_id=None):
+    """Registra o check-in de qualquer formato de QR Code emitido pelo sistema.
+
+    Tokens assinados ("CV2:...") têm assinatura, evento e validade conferidos em
+    memória antes de qualquer acesso ao banco: QR Codes forjados ou vencidos
+    nunca chegam ao SQLite. Tokens "CV1." seguem para modelos.convidado.registrar_checkin.
+
+    Args:
+        conteudo_qr (str): Conteúdo lido do QR Code.
+        evento_id (int, optional): Evento em que a leitura acontece.
+
+    Returns:
+        dict: Mesmo formato de modelos.convidado.registrar_checkin, com o status
+              adicional 'expirado' para tokens assinados vencidos.
+    """
+    if not eh_token_assinado(conteudo_qr):
+        return modelo_convidado.registrar_checkin(conteudo_qr, evento_id)
+
+    resultado = {"status": "invalido", "convidado": None, "checkins": 0}
+    verificador = _obter_verificador()
+    if verificador is None:
+        resultado["status"] = "erro"
+        return resultado
+    verificacao = verificador.verificar(conteudo_qr)
+    if verificacao["status"] != "ok":
+        resultado["status"] = verificacao["status"]
+        return resultado
+    if evento_id is not None and verificacao["evento_id"] != evento_id:
+        resultado["status"] = "evento_incorreto"
+        return resultado
+    return modelo_convidado.registrar_checkin_por_id(verificacao["convidado_id"], verificacao["evento_id"])
+
+
+def enviar_checkin(conteudo_qr, evento_id, gravador):
+    """Versão assíncrona de registrar_checkin, com gravação em lote (group commit).
+
+    Tokens assinados válidos são enfileirados no gravador; leituras recusadas na
+    verificação em memória e tokens "CV1." (que precisam do banco para achar o
+    convidado) são resolvidos na hora.
+
+    Args:
+        conteudo_qr (str): Conteúdo lido do QR Code.
+        evento_id (int): Evento em que a leitura acontece.
+        gravador (GravadorCheckin): Gravador em execução.
+
+    Returns:
+        concurrent.futures.Future: Resolvido com o dict de resultado após o commit.
+    """
+    verificador = _obter_verificador() if eh_token_assinado(conteudo_qr) else None
+    if verificador is not None:
+        verificacao = verificador.verificar(conteudo_qr)
+        if verificacao["status"] == "ok" and verificacao["evento_id"] == evento_id:
+            return gravador.registrar(verificacao["convidado_id"], evento_id)
+    futuro = Future()
+    futuro.set_result(registrar_checkin(conteudo_qr, evento_id))
+    return futuro
+
+
+def exportar_revogacoes(evento_id=None, caminho=None):
+    """Grava em JSON os convidados revogados, para carregar nos portões offline.
+
+    O arquivo é lido por VerificadorTokens.carregar_revogacoes.
+
+    Returns:
+        str: Caminho do arquivo gerado, ou None em caso de erro.
+    """
+    revogados = modelo_convidado.listar_tokens_revogados(evento_id)
+    if caminho is None:
+        sufixo = f"evento_{evento_id}" if evento_id is not None else "todos"
+        caminho = os.path.join(REVOGACOES_DIR, f"revogados_{sufixo}.json")
+    try:
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        temporario = caminho + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            json.dump({"evento_id": evento_id, "revogados": revogados}, arquivo)
+            registrar_bytes(arquivo.tell())
+        os.replace(temporario, caminho)
+    except OSError as e:
+        logger.error("Erro ao exportar revogações para %s: %s", caminho, e)
+        return None
+    logger.info("%d convidado(s) revogado(s) exportado(s) para: %s", len(revogados), caminho)
+    return caminho
+
+
+def criar_verificador_offline(evento_id, caminho_revogacoes=None):
+    """Prepara um verificador para o portão sem conexão com o banco.
+
+    Args:
+        evento_id (int): Evento em que o portão faz as leituras.
+        caminho_revogacoes (str, optional): Arquivo gerado por exportar_revogacoes.
+
+    Returns:
+        VerificadorTokens: O verificador, ou None se a chave não estiver disponível.
+    """
+    try:
+        verificador = VerificadorTokens(evento_id=evento_id)
+    except ValueError as e:
+        logger.error("Erro ao preparar a verificação de tokens: %s", e)
+        return None
+    if caminho_revogacoes and os.path.exists(caminho_revogacoes):
+        verificador.carregar_revogacoes(caminho_revogacoes)
+    return verificador
+
+
+instrumentar_modulo(__name__)
@@ -1,28 +1,286 @@
 # -*- coding: utf-8 -*-
+import io
+import logging
 import os
+import sys
+import zlib
 import datetime # Importar o módulo datetime
+from array import array
+from collections import OrderedDict
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.units import inch
 from reportlab.pdfgen import canvas
 from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+# Permite executar o arquivo diretamente (python servicos/convite_service.py)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from instrumentacao import instrumentar_modulo, registrar_bytes
+from registro_log import ProgressoLote, falha, registrar_item
+
+logger = logging.getLogger(__name__)
 
 # Diretório para salvar os PDFs dos convites
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 CONVITE_DIR = os.path.join(BASE_DIR, "dados", "convites")
 
 
-def gerar_convite_pdf(evento, convidado, caminho_qrcode, nome_arquivo_base):
+# Versão do layout do convite; altere ao mudar o desenho para invalidar artefatos antigos
+VERSAO_TEMPLATE = 1
+# Quantidade máxima de templates de eventos mantidos em memória
+MAX_TEMPLATES_CACHE = 32
+
+LARGURA_PAGINA, ALTURA_PAGINA = letter # Tamanho da página (aprox. 8.5 x 11 polegadas)
+ALTURA_LINHA = 0.25 * inch
+Y_INFO_EVENTO = ALTURA_PAGINA - 2.5 * inch
+Y_ROTULO_CONVIDADO = Y_INFO_EVENTO - ALTURA_LINHA * 3.5
+Y_NOME_CONVIDADO = Y_ROTULO_CONVIDADO - ALTURA_LINHA * 0.8
+X_NOME_CONVIDADO = 1.2 * inch
+LADO_QRCODE = 2 * inch
+X_QRCODE = LARGURA_PAGINA - LADO_QRCODE - 1 * inch
+Y_QRCODE = 1 * inch
+COR_ERRO = (1, 0, 0) # Vermelho
+# Linhas de texto: (fonte, tamanho, x, y, texto, cor); cor None = preto
+LINHA_ERRO_QRCODE = ("Helvetica", 10, 1 * inch, 1 * inch, "Erro ao carregar QR Code.", COR_ERRO)
+_LEGENDA_QRCODE = "Apresente este QR Code na entrada"
+LINHA_LEGENDA_QRCODE = ("Helvetica", 8, LARGURA_PAGINA - 1 * inch - stringWidth(_LEGENDA_QRCODE, "Helvetica", 8),
+                        Y_QRCODE - 0.2 * inch, _LEGENDA_QRCODE, None)
+
+
+def _operadores_qrcode(matriz):
+    """Monta os operadores PDF ("re" + "f") da matriz em unidades de módulo.
+
+    Módulos escuros consecutivos de uma mesma linha viram um único retângulo.
+    Como as coordenadas são inteiras, os operadores são montados direto como
+    texto, sem a formatação de números reais do reportlab, que dominava o
+    custo de cada convite. A linha 0 é a do topo (eixo y para baixo).
+    """
+    retangulos = []
+    for i, linha in enumerate(matriz):
+        inicio = None
+        for j, escuro in enumerate(linha + [False]):
+            if escuro and inicio is None:
+                inicio = j
+            elif not escuro and inicio is not None:
+                retangulos.append(f"{inicio} {i} {j - inicio} 1 re")
+                inicio = None
+    if not retangulos:
+        return ""
+    return "\n".join(retangulos) + "\nf"
+
+
+def _transformacao_qrcode(matriz, x=X_QRCODE, y=Y_QRCODE, lado=LADO_QRCODE):
+    """Matriz (a, b, c, d, e, f) que leva as unidades de módulo à posição do QR Code na página.
+
+    Origem no canto superior esquerdo do QR Code, eixo y para baixo, 1 unidade = 1 módulo.
+    """
+    tamanho_modulo = lado / len(matriz)
+    return (tamanho_modulo, 0, 0, -tamanho_modulo, x, y + lado)
+
+
+def _desenhar_qrcode_vetorial(c, matriz):
+    """Desenha a matriz de módulos do QR Code como retângulos vetoriais no canvas."""
+    c.saveState()
+    c.transform(*_transformacao_qrcode(matriz))
+    c.setFillColorRGB(0, 0, 0)
+    operadores = _operadores_qrcode(matriz)
+    if operadores:
+        c.addLiteral(operadores)
+    c.restoreState()
+
+
+def _formatar_data_horario(evento):
+    """Formata data e horário do evento para exibição (DD/MM/AAAA e HH:MM)."""
+    # Obtém e tenta formatar Data e Hora
+    data_evento = evento.get("data")
+    horario_evento = evento.get("horario")
+
+    # Tenta converter strings para objetos date/time se necessário
+    if isinstance(data_evento, str):
+        try: data_evento = datetime.datetime.strptime(data_evento, "%Y-%m-%d").date()
+        except (ValueError, TypeError): data_evento = None # Mantém None se falhar
+    if isinstance(horario_evento, str):
+        try: horario_evento = datetime.datetime.strptime(horario_evento, "%H:%M").time()
+        except (ValueError, TypeError): horario_evento = None # Mantém None se falhar
+
+    # Verifica os tipos usando type() diretamente
+    data_formatada = data_evento.strftime("%d/%m/%Y") if type(data_evento) is datetime.date else str(data_evento or "Data não definida")
+    horario_formatado = horario_evento.strftime("%H:%M") if type(horario_evento) is datetime.time else str(horario_evento or "Horário não definido")
+    return data_formatada, horario_formatado
+
+
+class TemplateConvite:
+    """Parte fixa do convite de um evento, calculada uma vez e reaproveitada por convidado.
+
+    Título, data, horário, local, rótulo e rodapé são iguais para todos os
+    convidados do evento. O template converte e formata esses campos uma única
+    vez (sem strptime por convidado) e guarda as posições já calculadas.
+
+    Para os convites com a matriz do QR Code, renderizar_pdf compila a parte
+    fixa uma vez por evento: cabeçalho, fontes e o fundo como Form XObject já
+    comprimido ficam prontos em bytes, e cada convidado acrescenta só a página
+    com o nome e o QR Code, sem canvas do reportlab.
+
+    O layout é descrito como linhas de texto (fonte, tamanho, x, y, texto, cor)
+    mais a posição do QR Code: linhas_fundo e linhas_convidado são a única
+    fonte do desenho, usada tanto pelo canvas do reportlab (convite com imagem
+    do QR Code) quanto pelo escritor de PDF (_conteudo_convite).
+    """
+
+    def __init__(self, evento):
+        self.evento_id = evento.get("id")
+        self.nome_evento = evento.get("nome", "Nome do Evento Indisponível")
+        self.data_formatada, self.horario_formatado = _formatar_data_horario(evento)
+        self.local_evento = evento.get("local", "Local não definido")
+        self.linhas_fundo = self._montar_linhas_fundo()
+        self._pdf_compilado = None # (prefixo, offsets, números dos objetos), montado no primeiro uso
+
+    def _montar_linhas_fundo(self):
+        """Monta as linhas de texto fixas como (fonte, tamanho, x, y, texto, cor)."""
+        linhas = [
+            ("Helvetica-Bold", 24, LARGURA_PAGINA / 2.0, ALTURA_PAGINA - 1.5 * inch, self.nome_evento, True),
+            ("Helvetica", 12, 1 * inch, Y_INFO_EVENTO, f"Data: {self.data_formatada}", False),
+            ("Helvetica", 12, 1 * inch, Y_INFO_EVENTO - ALTURA_LINHA, f"Horário: {self.horario_formatado}", False),
+            ("Helvetica", 12, 1 * inch, Y_INFO_EVENTO - ALTURA_LINHA * 2, f"Local: {self.local_evento}", False),
+            ("Helvetica-Oblique", 14, 1 * inch, Y_ROTULO_CONVIDADO, "Convidado(a):", False),
+            ("Helvetica", 9, LARGURA_PAGINA / 2.0, 0.75 * inch, "Este convite é pessoal e intransferível.", True),
+        ]
+        # Textos centralizados: a largura é medida aqui, uma vez por evento
+        return [
+            (fonte, tamanho, x - stringWidth(texto, fonte, tamanho) / 2.0 if centralizado else x, y, texto, None)
+            for fonte, tamanho, x, y, texto, centralizado in linhas
+        ]
+
+    @staticmethod
+    def linhas_convidado(convidado, com_qrcode=True):
+        """Linhas de texto que variam por convidado: o nome e a legenda do QR Code (ou o aviso de erro)."""
+        nome_convidado = convidado.get("nome", "Nome do Convidado Indisponível")
+        return [
+            ("Helvetica-Bold", 16, X_NOME_CONVIDADO, Y_NOME_CONVIDADO, nome_convidado, None),
+            LINHA_LEGENDA_QRCODE if com_qrcode else LINHA_ERRO_QRCODE,
+        ]
+
+    def _compilar_pdf(self):
+        """Monta o início do PDF de um convite: tudo o que não depende do convidado."""
+        buffer = io.BytesIO()
+        pdf = _EscritorPDFStreaming(buffer)
+        numero_catalogo = pdf.reservar()
+        numero_paginas = pdf.reservar()
+        numero_pagina = pdf.reservar()
+        numero_recursos = _escrever_recursos(pdf, self)
+        return buffer.getvalue(), pdf.offsets, (numero_catalogo, numero_paginas, numero_pagina, numero_recursos)
+
+    def renderizar_pdf(self, convidado, matriz_qrcode):
+        """Retorna os bytes do PDF de uma página com o convite, sobre a parte fixa compilada."""
+        if self._pdf_compilado is None:
+            self._pdf_compilado = self._compilar_pdf()
+        prefixo, offsets, (numero_catalogo, numero_paginas, numero_pagina, numero_recursos) = self._pdf_compilado
+        buffer = io.BytesIO()
+        pdf = _EscritorPDFStreaming.retomar(buffer, prefixo, offsets)
+        numero_conteudo = pdf.stream("", _conteudo_convite(self, convidado, matriz_qrcode))
+        pdf.objeto(f"<< /Type /Page /Parent {numero_paginas} 0 R /MediaBox {_MEDIA_BOX} "
+                   f"/Resources {numero_recursos} 0 R /Contents {numero_conteudo} 0 R >>", numero_pagina)
+        pdf.objeto(f"<< /Type /Pages /Kids [{numero_pagina} 0 R] /Count 1 >>", numero_paginas)
+        pdf.objeto(f"<< /Type /Catalog /Pages {numero_paginas} 0 R >>", numero_catalogo)
+        pdf.finalizar(numero_catalogo)
+        return buffer.getvalue()
+
+    def desenhar_fundo(self, c):
+        """Desenha a parte fixa diretamente na página atual do canvas."""
+        _desenhar_linhas(c, self.linhas_fundo)
+
+    def desenhar_convidado(self, c, convidado, caminho_qrcode=None, matriz_qrcode=None):
+        """Desenha as partes que variam por convidado: nome e QR Code."""
+        com_qrcode = True
+        try:
+            if matriz_qrcode:
+                _desenhar_qrcode_vetorial(c, matriz_qrcode)
+            else:
+                qr_image = ImageReader(caminho_qrcode)
+                c.drawImage(qr_image, X_QRCODE, Y_QRCODE, width=LADO_QRCODE, height=LADO_QRCODE, mask="auto")
+        except Exception as img_err:
+            logger.error("Erro ao adicionar QR Code ao PDF: %s", img_err)
+            com_qrcode = False
+        _desenhar_linhas(c, self.linhas_convidado(convidado, com_qrcode))
+
+
+def _desenhar_linhas(c, linhas):
+    """Desenha linhas (fonte, tamanho, x, y, texto, cor) no canvas."""
+    for fonte, tamanho, x, y, texto, cor in linhas:
+        c.setFont(fonte, tamanho)
+        if cor:
+            c.setFillColorRGB(*cor)
+            c.drawString(x, y, texto)
+            c.setFillColorRGB(0, 0, 0)
+        else:
+            c.drawString(x, y, texto)
+
+
+_templates = OrderedDict() # evento_id -> (campos do evento, TemplateConvite)
+
+
+def obter_template_convite(evento):
+    """Retorna o template do evento, reconstruindo-o se os dados do evento mudaram."""
+    campos = (evento.get("nome"), evento.get("local"), evento.get("data"), evento.get("horario"))
+    chave = evento.get("id")
+    item = _templates.get(chave)
+    if item is not None and item[0] == campos:
+        _templates.move_to_end(chave)
+        return item[1]
+    template = TemplateConvite(evento)
+    _templates[chave] = (campos, template)
+    _templates.move_to_end(chave)
+    while len(_templates) > MAX_TEMPLATES_CACHE:
+        _templates.popitem(last=False)
+    return template
+
+
+def renderizar_convite_pdf(evento, convidado, caminho_qrcode=None, matriz_qrcode=None):
+    """Desenha o convite de um convidado e retorna os bytes do PDF, sem gravar arquivo.
+
+    Recebe o QR Code como em gerar_convite_pdf. Com a matriz, a página é
+    montada sobre a parte fixa já compilada do template do evento
+    (TemplateConvite.renderizar_pdf); com uma imagem, é desenhada pelo canvas
+    do reportlab. Propaga exceções.
+
+    Returns:
+        bytes: O documento PDF completo.
+    """
+    template = obter_template_convite(evento)
+    if matriz_qrcode:
+        return template.renderizar_pdf(convidado, matriz_qrcode)
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter)
+    template.desenhar_fundo(c)
+    template.desenhar_convidado(c, convidado, caminho_qrcode, matriz_qrcode)
+    c.save()
+    return buffer.getvalue()
+
+
+def gerar_convite_pdf(evento, convidado, caminho_qrcode, nome_arquivo_base, matriz_qrcode=None):
     """Gera um convite em PDF com dados do evento, convidado e QR Code.
 
+    A parte fixa do convite vem do template do evento (obter_template_convite),
+    construído uma única vez e reaproveitado para todos os seus convidados.
+
+    O QR Code pode vir de um arquivo de imagem (caminho_qrcode, que também
+    aceita um objeto em memória como io.BytesIO) ou da matriz de módulos
+    (matriz_qrcode), desenhada como vetores sem passar por um PNG.
+
     Args:
         evento (dict): Dicionário com os dados do evento (nome, local, data, horario, etc.).
                        Espera-se que data e horario sejam objetos date/time ou strings formatadas.
         convidado (dict): Dicionário com os dados do convidado (nome, email, etc.).
-        caminho_qrcode (str): O caminho completo para a imagem do QR Code gerada.
+        caminho_qrcode (str | io.BytesIO): O caminho completo para a imagem do QR Code
+                                           gerada, ou a imagem em memória. Ignorado se
+                                           matriz_qrcode for informada.
         nome_arquivo_base (str): Nome base para o arquivo PDF (ex: evento_1_convidado_5).
+        matriz_qrcode (list, optional): Matriz de módulos de qrcode_service.gerar_matriz_qrcode.
 
     Returns:
-        str: O caminho completo para o arquivo PDF gerado, ou None se ocorrer erro.
+        str: O caminho completo para o arquivo PDF gerado, ou uma Falha
+             (registro_log) se ocorrer erro.
     """
     # Garante que o diretório de convites exista
     os.makedirs(CONVITE_DIR, exist_ok=True)
@@ -32,96 +290,286 @@ def gerar_convite_pdf(evento, convidado, caminho_qrcode, nome_arquivo_base):
     caminho_pdf = os.path.join(CONVITE_DIR, nome_arquivo)
 
     try:
-        c = canvas.Canvas(caminho_pdf, pagesize=letter)
-        width, height = letter # Tamanho da página (aprox. 8.5 x 11 polegadas)
-
-        # --- Desenho do Convite ---
-
-        # Título do Evento
-        nome_evento = evento.get("nome", "Nome do Evento Indisponível")
-        c.setFont("Helvetica-Bold", 24)
-        c.drawCentredString(width / 2.0, height - 1.5 * inch, nome_evento)
-
-        # Informações do Evento
-        c.setFont("Helvetica", 12)
-        y_position = height - 2.5 * inch
-        line_height = 0.25 * inch
-
-        # Obtém e tenta formatar Data e Hora
-        data_evento = evento.get("data")
-        horario_evento = evento.get("horario")
-
-        # Tenta converter strings para objetos date/time se necessário
-        if isinstance(data_evento, str):
-            try: data_evento = datetime.datetime.strptime(data_evento, "%Y-%m-%d").date()
-            except (ValueError, TypeError): data_evento = None # Mantém None se falhar
-        if isinstance(horario_evento, str):
-            try: horario_evento = datetime.datetime.strptime(horario_evento, "%H:%M").time()
-            except (ValueError, TypeError): horario_evento = None # Mantém None se falhar
-
-        # Verifica os tipos usando type() diretamente
-        data_formatada = data_evento.strftime("%d/%m/%Y") if type(data_evento) is datetime.date else str(data_evento or "Data não definida")
-        horario_formatado = horario_evento.strftime("%H:%M") if type(horario_evento) is datetime.time else str(horario_evento or "Horário não definido")
-        local_evento = evento.get("local", "Local não definido")
-
-        c.drawString(1 * inch, y_position, f"Data: {data_formatada}")
-        y_position -= line_height
-        c.drawString(1 * inch, y_position, f"Horário: {horario_formatado}")
-        y_position -= line_height
-        c.drawString(1 * inch, y_position, f"Local: {local_evento}")
-        y_position -= line_height * 1.5 # Espaço maior
-
-        # Informações do Convidado
-        nome_convidado = convidado.get("nome", "Nome do Convidado Indisponível")
-        c.setFont("Helvetica-Oblique", 14)
-        c.drawString(1 * inch, y_position, "Convidado(a):")
-        y_position -= line_height * 0.8
-        c.setFont("Helvetica-Bold", 16)
-        c.drawString(1.2 * inch, y_position, nome_convidado)
-        y_position -= line_height * 2 # Espaço maior
-
-        # QR Code
-        try:
-            qr_image = ImageReader(caminho_qrcode)
-            qr_width = 2 * inch
-            qr_height = 2 * inch
-            qr_x = width - qr_width - 1 * inch
-            qr_y = 1 * inch
-            c.drawImage(qr_image, qr_x, qr_y, width=qr_width, height=qr_height, mask="auto")
-            c.setFont("Helvetica", 8)
-            c.drawRightString(width - 1*inch, qr_y - 0.2*inch, "Apresente este QR Code na entrada")
-        except Exception as img_err:
-            print(f"Erro ao adicionar QR Code ao PDF: {img_err}")
-            c.setFont("Helvetica", 10)
-            c.setFillColorRGB(1, 0, 0) # Vermelho
-            c.drawString(1 * inch, 1 * inch, "Erro ao carregar QR Code.")
-
-        # Linha de rodapé (opcional)
-        c.setFont("Helvetica", 9)
-        c.drawCentredString(width / 2.0, 0.75 * inch, "Este convite é pessoal e intransferível.")
+        pdf = renderizar_convite_pdf(evento, convidado, caminho_qrcode, matriz_qrcode)
 
         # Salva o PDF
-        c.save()
-        print(f"Convite PDF gerado e salvo em: {caminho_pdf}")
+        with open(caminho_pdf, "wb") as arquivo:
+            arquivo.write(pdf)
+        registrar_bytes(len(pdf))
+        registrar_item(logger, "Convite PDF gerado e salvo em: %s", caminho_pdf)
         return caminho_pdf
 
     except Exception as e:
         # Tenta obter o nome do convidado para a mensagem de erro
         nome_convidado_erro = convidado.get("nome", "desconhecido") if convidado else "desconhecido"
-        # Usando aspas simples para as chaves internas da f-string
-        print(f"Erro ao gerar PDF do convite para o convidado \"{nome_convidado_erro}\" (arquivo base: \"{nome_arquivo_base}\"): {e}")
+        return falha(logger, "gerar_convite_pdf",
+                     f"Erro ao gerar PDF do convite para o convidado \"{nome_convidado_erro}\" "
+                     f"(arquivo base: \"{nome_arquivo_base}\"): {e}", e)
+
+# --- PDF único com todos os convites de um evento ---
+
+# Layouts aceitos no PDF único: convites por folha -> (colunas, linhas)
+LAYOUTS_POR_FOLHA = {1: (1, 1), 4: (2, 2), 9: (3, 3)}
+# Páginas por nó intermediário da árvore de páginas do PDF
+PAGINAS_POR_NO = 256
+# Nomes dos recursos de fonte usados nos PDFs montados sem o reportlab
+_FONTES_PDF = {"Helvetica": "F1", "Helvetica-Bold": "F2", "Helvetica-Oblique": "F3"}
+
+
+def _num(valor):
+    """Formata um número para o conteúdo PDF (até 2 casas, sem zeros à direita)."""
+    texto = f"{valor:.2f}".rstrip("0").rstrip(".")
+    return texto if texto not in ("", "-0") else "0"
+
+
+_MEDIA_BOX = f"[0 0 {_num(LARGURA_PAGINA)} {_num(ALTURA_PAGINA)}]"
+
+
+def _texto_pdf(texto):
+    """Codifica o texto em WinAnsi e escapa para uma string literal PDF."""
+    dados = str(texto).encode("cp1252", errors="replace")
+    partes = []
+    for byte in dados:
+        if byte in (0x28, 0x29, 0x5C): # ( ) \
+            partes.append("\\" + chr(byte))
+        elif 32 <= byte < 127:
+            partes.append(chr(byte))
+        else:
+            partes.append(f"\\{byte:03o}")
+    return "(" + "".join(partes) + ")"
+
+
+def _operadores_linhas(linhas):
+    """Operadores PDF das linhas (fonte, tamanho, x, y, texto, cor), equivalentes a _desenhar_linhas."""
+    operadores = []
+    for fonte, tamanho, x, y, texto, cor in linhas:
+        texto_pdf = f"BT /{_FONTES_PDF[fonte]} {_num(tamanho)} Tf {_num(x)} {_num(y)} Td {_texto_pdf(texto)} Tj ET"
+        if cor:
+            texto_pdf = f"{' '.join(map(_num, cor))} rg {texto_pdf} 0 g"
+        operadores.append(texto_pdf)
+    return "\n".join(operadores)
+
+
+class _EscritorPDFStreaming:
+    """Escreve um PDF objeto a objeto direto no arquivo, sem acumular as páginas.
+
+    O canvas do reportlab mantém todas as páginas em memória até save(). Aqui
+    cada página é gravada assim que é montada; ficam em memória apenas os
+    offsets dos objetos (para a tabela xref) e os IDs das páginas do nó atual
+    da árvore de páginas.
+    """
+
+    def __init__(self, arquivo):
+        self.arquivo = arquivo
+        self.offsets = array("Q", [0])
+        self.posicao = 0
+        self._escrever(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    @classmethod
+    def retomar(cls, arquivo, prefixo, offsets):
+        """Continua, em `arquivo`, um PDF cujo início (prefixo) e offsets foram gravados por outro escritor."""
+        pdf = cls.__new__(cls)
+        pdf.arquivo = arquivo
+        pdf.offsets = array("Q", offsets)
+        pdf.posicao = 0
+        pdf._escrever(prefixo)
+        return pdf
+
+    def _escrever(self, dados):
+        self.arquivo.write(dados)
+        self.posicao += len(dados)
+
+    def reservar(self):
+        """Reserva o número de um objeto que será escrito depois."""
+        self.offsets.append(0)
+        return len(self.offsets) - 1
+
+    def objeto(self, conteudo, numero=None):
+        """Escreve um objeto (dicionário/valor em texto) e retorna seu número."""
+        numero = numero or self.reservar()
+        self.offsets[numero] = self.posicao
+        self._escrever(f"{numero} 0 obj\n{conteudo}\nendobj\n".encode("latin-1"))
+        return numero
+
+    def stream(self, dicionario, conteudo, numero=None):
+        """Escreve um objeto stream comprimido (FlateDecode) e retorna seu número."""
+        numero = numero or self.reservar()
+        dados = zlib.compress(conteudo.encode("latin-1"))
+        self.offsets[numero] = self.posicao
+        self._escrever(f"{numero} 0 obj\n<< {dicionario} /Filter /FlateDecode /Length {len(dados)} >>\nstream\n".encode("latin-1"))
+        self._escrever(dados)
+        self._escrever(b"\nendstream\nendobj\n")
+        return numero
+
+    def finalizar(self, numero_catalogo):
+        """Escreve a tabela xref e o trailer."""
+        inicio_xref = self.posicao
+        linhas = [f"xref\n0 {len(self.offsets)}\n", "0000000000 65535 f \n"]
+        linhas.extend(f"{offset:010d} 00000 n \n" for offset in self.offsets[1:])
+        linhas.append(f"trailer\n<< /Size {len(self.offsets)} /Root {numero_catalogo} 0 R >>\nstartxref\n{inicio_xref}\n%%EOF\n")
+        self._escrever("".join(linhas).encode("latin-1"))
+
+
+def _escrever_recursos(pdf, template):
+    """Escreve as fontes e a parte fixa do convite (Form XObject /Fundo).
+
+    Returns:
+        int: Número do dicionário de recursos das páginas.
+    """
+    fontes = " ".join(
+        f"/{nome} {pdf.objeto(f'<< /Type /Font /Subtype /Type1 /BaseFont /{fonte} /Encoding /WinAnsiEncoding >>')} 0 R"
+        for fonte, nome in _FONTES_PDF.items()
+    )
+    numero_fontes = pdf.objeto(f"<< {fontes} >>")
+    numero_fundo = pdf.stream(
+        f"/Type /XObject /Subtype /Form /BBox {_MEDIA_BOX} /Resources << /Font {numero_fontes} 0 R >>",
+        _operadores_linhas(template.linhas_fundo),
+    )
+    return pdf.objeto(f"<< /Font {numero_fontes} 0 R /XObject << /Fundo {numero_fundo} 0 R >> >>")
+
+
+def _conteudo_convite(template, convidado, matriz):
+    """Operadores PDF de um convite (página inteira, em coordenadas de página).
+
+    Mesmo desenho de TemplateConvite.desenhar_fundo + desenhar_convidado: a
+    parte fixa vem do Form XObject /Fundo (template.linhas_fundo).
+    """
+    partes = ["/Fundo Do"]
+    if matriz:
+        partes.append(f"q {' '.join(map(_num, _transformacao_qrcode(matriz)))} cm 0 g")
+        partes.append(_operadores_qrcode(matriz))
+        partes.append("Q")
+    partes.append(_operadores_linhas(template.linhas_convidado(convidado, bool(matriz))))
+    return "\n".join(partes)
+
+
+def gerar_convites_evento_pdf_unico(evento_id, por_folha=1, nome_arquivo_base=None):
+    """Gera um único PDF pronto para impressão com os convites de todos os convidados.
+
+    Os convidados são lidos do banco página a página e cada folha é gravada no
+    arquivo assim que é montada, de modo que a memória não cresce com o número
+    de convidados. A parte fixa do convite é gravada uma única vez (Form
+    XObject) e as fontes são compartilhadas por todas as folhas. O QR Code de
+    cada convidado é desenhado como vetores, sem PNG intermediário.
+
+    Args:
+        evento_id (int): ID do evento.
+        por_folha (int): Convites por folha: 1, 4 (2x2) ou 9 (3x3), reduzidos
+                         proporcionalmente no layout de várias por folha.
+        nome_arquivo_base (str, optional): Nome do PDF sem extensão.
+                                           Padrão: evento_<id>_convites.
+
+    Returns:
+        dict: {'caminho': caminho do PDF, 'convites': quantidade, 'folhas': quantidade,
+               'erros': {convidado_id: mensagem}}, ou None em caso de erro.
+    """
+    from modelos.evento import buscar_evento_por_id, estatisticas_evento
+    from modelos.convidado import iterar_convidados
+    from servicos.qrcode_service import gerar_matriz_qrcode, montar_conteudo_qrcode
+
+    if por_folha not in LAYOUTS_POR_FOLHA:
+        logger.error("Erro: Layout de %d convites por folha não suportado. Use %s.",
+                     por_folha, ", ".join(map(str, LAYOUTS_POR_FOLHA)))
+        return None
+    evento = buscar_evento_por_id(evento_id)
+    if not evento:
+        logger.error("Erro: Evento com ID %s não encontrado.", evento_id)
         return None
 
+    os.makedirs(CONVITE_DIR, exist_ok=True)
+    caminho_pdf = os.path.join(CONVITE_DIR, f"{nome_arquivo_base or f'evento_{evento_id}_convites'}.pdf")
+    template = obter_template_convite(evento)
+    colunas, linhas = LAYOUTS_POR_FOLHA[por_folha]
+    escala = 1.0 / colunas
+    resultado = {"caminho": caminho_pdf, "convites": 0, "folhas": 0, "erros": {}}
+
+    total = (estatisticas_evento(evento_id) or {}).get("total")
+    try:
+        with open(caminho_pdf, "wb") as arquivo, \
+                ProgressoLote(f"PDF único do evento ID {evento_id}", total, logger, unidade="convites") as progresso:
+            pdf = _EscritorPDFStreaming(arquivo)
+            numero_catalogo = pdf.reservar()
+            numero_raiz = pdf.reservar()
+
+            numero_recursos = _escrever_recursos(pdf, template)
+
+            nos = [] # (número do nó, quantidade de páginas)
+            no_atual = None
+            paginas_no = []
+
+            def fechar_no():
+                pdf.objeto(f"<< /Type /Pages /Parent {numero_raiz} 0 R /Kids [{' '.join(f'{p} 0 R' for p in paginas_no)}] /Count {len(paginas_no)} >>", no_atual)
+                nos.append((no_atual, len(paginas_no)))
+
+            def gravar_folha(celulas):
+                nonlocal no_atual, paginas_no
+                if no_atual is None:
+                    no_atual = pdf.reservar()
+                    paginas_no = []
+                conteudo = []
+                for indice, conteudo_convite in enumerate(celulas):
+                    if por_folha == 1:
+                        conteudo.append(conteudo_convite)
+                        continue
+                    coluna, linha = indice % colunas, indice // colunas
+                    tx = coluna * LARGURA_PAGINA * escala
+                    ty = ALTURA_PAGINA - (linha + 1) * ALTURA_PAGINA * escala
+                    conteudo.append(f"q {_num(escala)} 0 0 {_num(escala)} {_num(tx)} {_num(ty)} cm\n{conteudo_convite}\nQ")
+                numero_conteudo = pdf.stream("", "\n".join(conteudo))
+                paginas_no.append(pdf.objeto(
+                    f"<< /Type /Page /Parent {no_atual} 0 R /MediaBox {_MEDIA_BOX} "
+                    f"/Resources {numero_recursos} 0 R /Contents {numero_conteudo} 0 R >>"
+                ))
+                resultado["folhas"] += 1
+                if len(paginas_no) >= PAGINAS_POR_NO:
+                    fechar_no()
+                    no_atual = None
+
+            celulas = []
+            for convidado in iterar_convidados(evento_id):
+                matriz = gerar_matriz_qrcode(montar_conteudo_qrcode(evento, convidado))
+                if matriz:
+                    progresso.sucesso()
+                else:
+                    resultado["erros"][convidado["id"]] = str(matriz)
+                    progresso.erro(convidado["id"], matriz)
+                celulas.append(_conteudo_convite(template, convidado, matriz))
+                resultado["convites"] += 1
+                if len(celulas) == por_folha:
+                    gravar_folha(celulas)
+                    celulas = []
+            if celulas:
+                gravar_folha(celulas)
+            if no_atual is None and not nos:
+                # PDF sem convidados: uma folha em branco mantém o arquivo válido
+                gravar_folha([])
+            if no_atual is not None:
+                fechar_no()
+
+            pdf.objeto(f"<< /Type /Pages /Kids [{' '.join(f'{n} 0 R' for n, _ in nos)}] /Count {sum(q for _, q in nos)} >>", numero_raiz)
+            pdf.objeto(f"<< /Type /Catalog /Pages {numero_raiz} 0 R >>", numero_catalogo)
+            pdf.finalizar(numero_catalogo)
+        registrar_bytes(pdf.posicao)
+    except (OSError, UnicodeEncodeError) as e:
+        logger.error("Erro ao gerar o PDF único do evento ID %s: %s", evento_id, e)
+        return None
+
+    logger.info("PDF único do evento ID %s gerado com %d convites em %d folhas: %s",
+                evento_id, resultado["convites"], resultado["folhas"], caminho_pdf)
+    return resultado
+
+
+instrumentar_modulo(__name__)
+
 # Exemplo de uso (pode ser removido ou comentado depois)
 if __name__ == "__main__":
-    # Adiciona o diretório pai ao path para encontrar qrcode_service
-    import sys
-    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
     try:
         from servicos.qrcode_service import gerar_qrcode # Para gerar um QR de teste
     except ImportError:
         print("Erro: Não foi possível importar qrcode_service. Execute de dentro do diretório raiz.")
         sys.exit(1)
+    import registro_log
+    registro_log.configurar()
 
     print("--- Testando Serviço de Geração de Convite PDF ---")
 
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""Gravador de check-ins com group commit.
+
+Em vez de um commit (e um fsync) por leitura, os check-ins entram numa fila em
+memória e uma única thread os grava em lote, com executemany numa transação,
+a cada INTERVALO_MS milissegundos ou MAX_LOTE leituras, o que vier primeiro.
+Cada chamada recebe um Future que só é resolvido depois do commit do lote.
+"""
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+# Permite executar o arquivo diretamente (python servicos/gravador_checkin.py)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from db.conexao import obter_conexao, liberar_conexao_da_thread
+from modelos import convidado as modelo_convidado
+from instrumentacao import instrumentar, instrumentar_modulo
+
+logger = logging.getLogger(__name__)
+
+# Espera máxima (ms) para completar um lote depois da primeira leitura. Com 0, o
+# lote é o que se acumulou na fila durante o commit anterior (group commit
+# "natural"), o que mede melhor com leitores que aguardam a resposta; valores
+# maiores aumentam o lote à custa de latência quando a chegada é esparsa.
+INTERVALO_MS = 0
+MAX_LOTE = 256 # Leituras por transação
+# Quantidade de latências de flush guardadas para os percentis das métricas
+AMOSTRAS_LATENCIA = 1024
+
+_FIM = object() # Sentinela que encerra a thread de gravação
+_RESULTADO_ERRO = {"status": "erro", "convidado": None, "checkins": 0}
+
+
+class GravadorCheckin:
+    """Fila de check-ins gravada em lote por uma thread dedicada.
+
+    Uso:
+        with GravadorCheckin() as gravador:
+            futuro = gravador.registrar(convidado_id, evento_id)
+            resultado = futuro.result() # dict no formato de registrar_checkin
+    """
+
+    def __init__(self, intervalo_ms=INTERVALO_MS, max_lote=MAX_LOTE, duravel=True):
+        """
+        Args:
+            intervalo_ms (float): Espera máxima para completar um lote.
+            max_lote (int): Tamanho máximo do lote.
+            duravel (bool): Usa synchronous=FULL na conexão do gravador, para que o
+                            Future só seja resolvido com o lote já em disco (o custo
+                            do fsync é dividido por todo o lote).
+        """
+        self.intervalo = intervalo_ms / 1000
+        self.max_lote = max_lote
+        self.duravel = duravel
+        self._fila = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._latencias = deque(maxlen=AMOSTRAS_LATENCIA)
+        self._metricas = {
+            "enfileirados": 0,
+            "gravados": 0,
+            "erros": 0,
+            "lotes": 0,
+            "maior_lote": 0,
+            "maior_fila": 0,
+            "tempo_flush_total": 0.0,
+        }
+
+    def __enter__(self):
+        self.iniciar()
+        return self
+
+    def __exit__(self, *exc):
+        self.parar()
+
+    @property
+    def ativo(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def iniciar(self):
+        """Inicia a thread de gravação (sem efeito se já estiver ativa)."""
+        with self._lock:
+            if self.ativo:
+                return
+            self._thread = threading.Thread(target=self._executar, name="gravador-checkin", daemon=True)
+            self._thread.start()
+
+    def parar(self):
+        """Grava o que ainda estiver na fila e encerra a thread."""
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._fila.put(_FIM)
+            self._thread = None
+        thread.join()
+
+    def registrar(self, convidado_id, evento_id):
+        """Enfileira o check-in de um convidado.
+
+        Returns:
+            concurrent.futures.Future: Resolvido, após o commit do lote, com o dict
+            de resultado no formato de modelos.convidado.registrar_checkin.
+        """
+        futuro = Future()
+        # Sob o mesmo lock de parar(): nenhuma leitura entra na fila depois do sinal de fim
+        with self._lock:
+            if self._thread is None:
+                raise RuntimeError("Gravador de check-in não está em execução.")
+            self._fila.put((convidado_id, evento_id, futuro))
+            self._metricas["enfileirados"] += 1
+            profundidade = self._fila.qsize()
+            if profundidade > self._metricas["maior_fila"]:
+                self._metricas["maior_fila"] = profundidade
+        return futuro
+
+    def metricas(self):
+        """Profundidade da fila, lotes gravados e latência dos flushes (ms)."""
+        with self._lock:
+            dados = dict(self._metricas)
+            latencias = sorted(self._latencias)
+        lotes = dados["lotes"]
+        dados["profundidade_fila"] = self._fila.qsize()
+        dados["lote_medio"] = dados["gravados"] / lotes if lotes else 0.0
+        tempo_flush = dados.pop("tempo_flush_total")
+        dados["flush_medio_ms"] = tempo_flush / lotes * 1000 if lotes else 0.0
+        if latencias:
+            dados["flush_p50_ms"] = latencias[len(latencias) // 2] * 1000
+            dados["flush_p99_ms"] = latencias[min(len(latencias) - 1, int(len(latencias) * 0.99))] * 1000
+        else:
+            dados["flush_p50_ms"] = dados["flush_p99_ms"] = 0.0
+        return dados
+
+    def _executar(self):
+        if self.duravel:
+            # A conexão do pool é exclusiva desta thread
+            with obter_conexao() as conexao:
+                if conexao:
+                    conexao.execute("PRAGMA synchronous = FULL;")
+        encerrar = False
+        while not encerrar:
+            item = self._fila.get()
+            if item is _FIM:
+                break
+            lote = [item]
+            limite = time.monotonic() + self.intervalo
+            while len(lote) < self.max_lote:
+                restante = limite - time.monotonic()
+                try:
+                    item = self._fila.get(timeout=restante) if restante > 0 else self._fila.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _FIM:
+                    encerrar = True
+                    break
+                lote.append(item)
+            try:
+                self._gravar(lote)
+            except Exception:
+                # Uma exceção inesperada não pode derrubar a thread: os Futures
+                # pendentes ficariam sem resposta e os leitores esperando para sempre
+                logger.exception("Erro inesperado ao gravar um lote de %d check-in(s).", len(lote))
+                self._falhar_lote(lote)
+        liberar_conexao_da_thread()
+
+    def _falhar_lote(self, lote):
+        pendentes = [futuro for _, _, futuro in lote if not futuro.done()]
+        with self._lock:
+            self._metricas["erros"] += len(pendentes)
+        for futuro in pendentes:
+            futuro.set_result(dict(_RESULTADO_ERRO))
+
+    @instrumentar("servicos.gravador_checkin.GravadorCheckin.gravar_lote")
+    def _gravar(self, lote):
+        inicio = time.perf_counter()
+        resultados = modelo_convidado.registrar_checkins_em_lote(
+            [(convidado_id, evento_id) for convidado_id, evento_id, _ in lote]
+        )
+        duracao = time.perf_counter() - inicio
+        with self._lock:
+            self._latencias.append(duracao)
+            self._metricas["lotes"] += 1
+            self._metricas["tempo_flush_total"] += duracao
+            if len(lote) > self._metricas["maior_lote"]:
+                self._metricas["maior_lote"] = len(lote)
+            if resultados is None:
+                self._metricas["erros"] += len(lote)
+            else:
+                self._metricas["gravados"] += len(lote)
+
+        for indice, (_, _, futuro) in enumerate(lote):
+            if resultados is None:
+                futuro.set_result(dict(_RESULTADO_ERRO))
+            else:
+                futuro.set_result(resultados[indice])
+
+
+instrumentar_modulo(__name__)
+
+
+if __name__ == "__main__":
+    from db.conexao import inicializar_banco
+    from modelos.convidado import listar_todos_convidados
+
+    inicializar_banco()
+    convidados = listar_todos_convidados()[:1000]
+    if not convidados:
+        print("Nenhum convidado cadastrado para o teste.")
+    else:
+        with GravadorCheckin() as gravador:
+            futuros = [gravador.registrar(c["id"], c["evento_id"]) for c in convidados]
+            status = [f.result()["status"] for f in futuros]
+        print(f"{len(status)} check-ins: {status.count('ok')} ok, {status.count('duplicado')} duplicados")
+        print(gravador.metricas())
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+import csv
+import logging
+import os
+
+from modelos.convidado import criar_convidados_em_lote
+from instrumentacao import instrumentar_modulo
+
+logger = logging.getLogger(__name__)
+
+# Colunas reconhecidas no CSV de convidados (apenas "nome" é obrigatória)
+COLUNAS_CSV = ("nome", "email", "telefone", "status_presenca")
+
+
+def ler_convidados_csv(caminho_csv):
+    """Lê um CSV de convidados linha a linha, sem carregar o arquivo inteiro.
+
+    O delimitador (vírgula ou ponto e vírgula) é detectado automaticamente e os
+    nomes de coluna são normalizados para minúsculas.
+
+    Args:
+        caminho_csv (str): Caminho do arquivo CSV (UTF-8, com cabeçalho).
+
+    Yields:
+        dict: Um dicionário por linha com as chaves de COLUNAS_CSV.
+    """
+    with open(caminho_csv, newline="", encoding="utf-8-sig") as arquivo:
+        amostra = arquivo.read(4096)
+        arquivo.seek(0)
+        try:
+            dialeto = csv.Sniffer().sniff(amostra, delimiters=",;")
+        except csv.Error:
+            dialeto = csv.excel
+        leitor = csv.DictReader(arquivo, dialect=dialeto)
+        if leitor.fieldnames:
+            leitor.fieldnames = [(campo or "").strip().lower() for campo in leitor.fieldnames]
+        for linha in leitor:
+            yield {coluna: linha.get(coluna) for coluna in COLUNAS_CSV}
+
+
+def importar_convidados_csv(caminho_csv, evento_id):
+    """Importa um arquivo CSV de convidados para um evento em uma única transação.
+
+    Args:
+        caminho_csv (str): Caminho do arquivo CSV.
+        evento_id (int): ID do evento de destino.
+
+    Returns:
+        dict: O relatório de criar_convidados_em_lote ('inseridos', 'duplicados',
+              'invalidos'); o campo 'linha' de cada item corresponde à linha de
+              dados do CSV (sem contar o cabeçalho). None em caso de erro.
+    """
+    if not os.path.isfile(caminho_csv):
+        logger.error("Erro: Arquivo CSV \"%s\" não encontrado.", caminho_csv)
+        return None
+    try:
+        return criar_convidados_em_lote(evento_id, ler_convidados_csv(caminho_csv))
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        logger.error("Erro ao ler o arquivo CSV \"%s\": %s", caminho_csv, e)
+        return None
+
+
+instrumentar_modulo(__name__)
@@ -0,0 +1,359 @@
+# -*- coding: utf-8 -*-
+"""Pipeline em streaming que gera os convites (PDF) de todos os convidados de um evento.
+
+Estágios, ligados por filas limitadas (queue.Queue com maxsize):
+
+    leitura -> payload -> qrcode -> pdf -> gravacao
+
+  - leitura: cursor paginado do banco (iterar_convidados), agrupado em chunks;
+  - payload: conteúdo assinado do QR Code, nome do arquivo e hash do convite;
+  - qrcode: matriz de módulos do QR Code (CPU), num ProcessPoolExecutor;
+  - pdf: bytes do convite (CPU), num ProcessPoolExecutor;
+  - gravacao: grava os arquivos e registra o manifesto, um chunk por transação.
+
+Cada estágio roda numa thread própria e os estágios com pool mantêm no máximo
+2 chunks por worker em andamento. Como filas e pools são limitados, a memória
+depende do tamanho do chunk e das filas, e não do número de convidados: se um
+estágio é lento, as filas anteriores enchem e a leitura do banco espera.
+
+O andamento sai no log como progresso agregado (registro_log.ProgressoLote),
+sem uma linha por convite. O resultado traz, por estágio, os itens processados, o tempo ocupado e o tempo
+esperando a fila anterior (entrada) ou a seguinte (saída). O estágio de menor
+vazão é o gargalo; os demais passam a maior parte do tempo esperando.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+
+from db.conexao import liberar_conexao_da_thread
+from modelos import artefato as modelo_artefato
+from modelos.convidado import iterar_convidados
+from modelos.evento import buscar_evento_por_id, estatisticas_evento
+from servicos import convite_service, qrcode_service
+from servicos.sincronizacao_service import hash_convite
+from instrumentacao import instrumentar_modulo, registrar_bytes
+from registro_log import ProgressoLote
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_CHUNK = 32 # Convidados por item das filas (e por tarefa enviada aos pools)
+TAMANHO_FILA = 4 # Chunks que cabem em cada fila entre dois estágios
+INTERVALO_CANCELAMENTO = 0.1 # Segundos entre verificações de cancelamento ao esperar uma fila
+
+_FIM = object() # Marca o fim do fluxo em uma fila
+
+
+class _Cancelado(Exception):
+    """Outro estágio falhou (ou o pipeline foi interrompido) enquanto este esperava uma fila."""
+
+
+def _novo_estagio(nome, workers=1):
+    return {"estagio": nome, "workers": workers, "itens": 0, "ocupado": 0.0,
+            "espera_entrada": 0.0, "espera_saida": 0.0}
+
+
+def _obter(fila, estagio, cancelado):
+    inicio = time.perf_counter()
+    while True:
+        try:
+            item = fila.get(timeout=INTERVALO_CANCELAMENTO)
+            break
+        except queue.Empty:
+            if cancelado.is_set():
+                raise _Cancelado()
+    estagio["espera_entrada"] += time.perf_counter() - inicio
+    return item
+
+
+def _enviar(fila, item, estagio, cancelado):
+    inicio = time.perf_counter()
+    while True:
+        try:
+            fila.put(item, timeout=INTERVALO_CANCELAMENTO)
+            break
+        except queue.Full:
+            if cancelado.is_set():
+                raise _Cancelado()
+    estagio["espera_saida"] += time.perf_counter() - inicio
+
+
+# --- Funções dos estágios: recebem um chunk e retornam (chunk, segundos ocupados) ---
+
+def _montar_payloads(evento, convidados):
+    inicio = time.perf_counter()
+    itens = []
+    for convidado in convidados:
+        conteudo_qr = qrcode_service.montar_conteudo_qrcode(evento, convidado)
+        itens.append({
+            "convidado": convidado,
+            "nome_base": qrcode_service.nome_arquivo_convidado(evento["id"], convidado),
+            "conteudo": conteudo_qr,
+            "hash": hash_convite(evento, convidado, qrcode_service.chave_cache(conteudo_qr)),
+            "matriz": None,
+            "pdf": None,
+            "erro": None,
+        })
+    return itens, time.perf_counter() - inicio
+
+
+def _codificar_chunk(itens):
+    """Executada nos processos do pool de QR Codes."""
+    inicio = time.perf_counter()
+    for item in itens:
+        matriz = qrcode_service.gerar_matriz_qrcode(item["conteudo"])
+        if matriz:
+            item["matriz"] = matriz
+        else:
+            item["erro"] = str(matriz) # Mensagem da Falha devolvida pelo serviço
+        item["conteudo"] = None # Não precisa mais trafegar entre os estágios
+    return itens, time.perf_counter() - inicio
+
+
+def _renderizar_chunk(evento, itens):
+    """Executada nos processos do pool de PDFs."""
+    inicio = time.perf_counter()
+    for item in itens:
+        if item["erro"] is None:
+            try:
+                item["pdf"] = convite_service.renderizar_convite_pdf(
+                    evento, item["convidado"], matriz_qrcode=item["matriz"])
+            except Exception as e:
+                item["erro"] = f"Falha ao gerar o convite PDF: {e}"
+        item["matriz"] = None
+    return itens, time.perf_counter() - inicio
+
+
+def _executar_leitura(evento_id, tamanho_chunk, saida, estagio, cancelado):
+    convidados = iterar_convidados(evento_id)
+    while True:
+        inicio = time.perf_counter()
+        chunk = list(islice(convidados, tamanho_chunk))
+        estagio["ocupado"] += time.perf_counter() - inicio
+        if not chunk:
+            break
+        estagio["itens"] += len(chunk)
+        _enviar(saida, chunk, estagio, cancelado)
+    _enviar(saida, _FIM, estagio, cancelado)
+
+
+def _executar_estagio(funcao, entrada, saida, estagio, cancelado, executor=None):
+    """Aplica `funcao` a cada chunk da entrada, na própria thread ou no pool `executor`.
+
+    Com pool, até 2 chunks por worker ficam em andamento e os resultados seguem
+    na ordem de chegada. O tempo ocupado soma o tempo de todos os workers.
+    """
+    pendentes = deque()
+
+    def repassar(resultado):
+        itens, ocupado = resultado
+        estagio["ocupado"] += ocupado
+        estagio["itens"] += len(itens)
+        _enviar(saida, itens, estagio, cancelado)
+
+    while True:
+        chunk = _obter(entrada, estagio, cancelado)
+        if chunk is _FIM:
+            break
+        if executor is None:
+            repassar(funcao(chunk))
+            continue
+        pendentes.append(executor.submit(funcao, chunk))
+        while len(pendentes) >= 2 * estagio["workers"] or (pendentes and pendentes[0].done()):
+            repassar(pendentes.popleft().result())
+    while pendentes:
+        repassar(pendentes.popleft().result())
+    _enviar(saida, _FIM, estagio, cancelado)
+
+
+def _gravar_chunk(evento, itens, resultado, progresso):
+    """Grava os PDFs do chunk e os registra no manifesto de artefatos numa transação."""
+    registrados = modelo_artefato.buscar_artefatos_de_convidados(item["convidado"]["id"] for item in itens)
+    novos_registros = []
+    for item in itens:
+        convidado_id = item["convidado"]["id"]
+        if item["erro"] is not None:
+            resultado["erros"][convidado_id] = item["erro"]
+            progresso.erro(convidado_id, item["erro"])
+            continue
+        caminho = os.path.join(convite_service.CONVITE_DIR, f"{item['nome_base']}.pdf")
+        try:
+            with open(caminho, "wb") as arquivo:
+                arquivo.write(item["pdf"])
+            registrar_bytes(len(item["pdf"]))
+        except OSError as e:
+            resultado["erros"][convidado_id] = f"Falha ao gravar o convite: {e}"
+            progresso.erro(convidado_id, resultado["erros"][convidado_id])
+            continue
+        # O nome do arquivo inclui o nome do convidado: um arquivo antigo com outro nome fica obsoleto
+        registro = registrados.get((convidado_id, "convite"))
+        if registro is not None and registro["caminho"] != caminho:
+            try:
+                os.remove(registro["caminho"])
+            except OSError:
+                pass
+        novos_registros.append((convidado_id, "convite", evento["id"], caminho, item["hash"]))
+        resultado["gerados"] += 1
+        progresso.sucesso()
+    modelo_artefato.registrar_artefatos(novos_registros)
+
+
+def _iniciar_pool(workers):
+    """Cria o pool de um estágio (None para rodar na thread do estágio).
+
+    Uma tarefa vazia obriga o pool a criar seus processos agora, antes de as
+    threads dos estágios existirem: criar processos (fork) a partir de um
+    processo com várias threads ativas pode herdar travas em estado inconsistente.
+    """
+    if workers <= 1:
+        return None
+    executor = ProcessPoolExecutor(max_workers=workers)
+    executor.submit(int).result()
+    return executor
+
+
+def gerar_convites_evento(evento_id, workers_qrcode=None, workers_pdf=None,
+                          tamanho_chunk=TAMANHO_CHUNK, tamanho_fila=TAMANHO_FILA):
+    """Gera e grava o convite PDF de todos os convidados de um evento, em streaming.
+
+    Diferente de sincronizacao_service.sincronizar_convites, gera todos os
+    convites (não só os desatualizados) e não grava o PNG do QR Code, que é
+    desenhado como vetores no PDF. Cada convite gerado é registrado no manifesto
+    de artefatos, então uma sincronização posterior o considera atualizado.
+
+    Args:
+        evento_id (int): ID do evento.
+        workers_qrcode (int, optional): Processos que codificam os QR Codes. Padrão: os.cpu_count().
+        workers_pdf (int, optional): Processos que desenham os PDFs. Padrão: os.cpu_count().
+                                     Com 1, o estágio roda na sua própria thread.
+        tamanho_chunk (int): Convidados por item das filas.
+        tamanho_fila (int): Chunks que cabem em cada fila entre dois estágios.
+
+    Returns:
+        dict: {'gerados': quantidade, 'erros': {convidado_id: mensagem}, 'duracao': segundos,
+               'estagios': [estatísticas por estágio]}, ou None se o evento não existir ou
+              um estágio falhar.
+    """
+    evento = buscar_evento_por_id(evento_id)
+    if not evento:
+        logger.error("Erro: Evento com ID %s não encontrado.", evento_id)
+        return None
+
+    os.makedirs(convite_service.CONVITE_DIR, exist_ok=True)
+    workers_qrcode = workers_qrcode or os.cpu_count() or 1
+    workers_pdf = workers_pdf or os.cpu_count() or 1
+    resultado = {"gerados": 0, "erros": {}, "duracao": 0.0, "estagios": []}
+    estagios = [
+        _novo_estagio("leitura"),
+        _novo_estagio("payload"),
+        _novo_estagio("qrcode", workers_qrcode),
+        _novo_estagio("pdf", workers_pdf),
+        _novo_estagio("gravacao"),
+    ]
+    leitura, payload, codificacao, renderizacao, gravacao = estagios
+    filas = [queue.Queue(maxsize=tamanho_fila) for _ in range(4)]
+    cancelado = threading.Event()
+    falhas = []
+
+    def rodar(alvo, *args):
+        try:
+            alvo(*args)
+        except _Cancelado:
+            pass
+        except BaseException as e:
+            falhas.append(e)
+            cancelado.set()
+        finally:
+            liberar_conexao_da_thread()
+
+    total = (estatisticas_evento(evento_id) or {}).get("total")
+    inicio = time.perf_counter()
+    # Aberto antes dos pools: os processos criados já herdam o modo lote do log
+    with ProgressoLote(f"Convites do evento ID {evento_id}", total, logger, unidade="convites") as progresso:
+        pool_qrcode = _iniciar_pool(workers_qrcode)
+        pool_pdf = _iniciar_pool(workers_pdf)
+        threads = [
+            threading.Thread(target=rodar, args=(_executar_leitura, evento_id, tamanho_chunk, filas[0], leitura, cancelado)),
+            threading.Thread(target=rodar, args=(_executar_estagio, partial(_montar_payloads, evento),
+                                                 filas[0], filas[1], payload, cancelado)),
+            threading.Thread(target=rodar, args=(_executar_estagio, _codificar_chunk,
+                                                 filas[1], filas[2], codificacao, cancelado, pool_qrcode)),
+            threading.Thread(target=rodar, args=(_executar_estagio, partial(_renderizar_chunk, evento),
+                                                 filas[2], filas[3], renderizacao, cancelado, pool_pdf)),
+        ]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        try:
+            # Gravação: na thread atual, que também usa a conexão do banco para o manifesto
+            while True:
+                itens = _obter(filas[3], gravacao, cancelado)
+                if itens is _FIM:
+                    break
+                comeco = time.perf_counter()
+                _gravar_chunk(evento, itens, resultado, progresso)
+                gravacao["ocupado"] += time.perf_counter() - comeco
+                gravacao["itens"] += len(itens)
+        except _Cancelado:
+            pass
+        finally:
+            cancelado.set() # Encerra os estágios que ainda esperam uma fila (erro ou Ctrl+C)
+            for thread in threads:
+                thread.join()
+            for pool in (pool_qrcode, pool_pdf):
+                if pool is not None:
+                    pool.shutdown(cancel_futures=True)
+    resultado["duracao"] = time.perf_counter() - inicio
+
+    for estagio in estagios:
+        estagio["itens_por_segundo"] = (
+            estagio["itens"] * estagio["workers"] / estagio["ocupado"] if estagio["ocupado"] > 0 else 0.0
+        )
+    resultado["estagios"] = estagios
+    if falhas:
+        logger.error("Erro no pipeline de convites do evento ID %s: %s", evento_id, falhas[0])
+        return None
+    return resultado
+
+
+def exibir_estagios(estagios):
+    """Imprime a vazão de cada estágio e aponta o gargalo (menor vazão)."""
+    print(f"{'Estágio':10s} {'Workers':>7s} {'Itens':>8s} {'Ocupado':>9s} {'Itens/s':>9s} "
+          f"{'Esp. ent.':>9s} {'Esp. saída':>10s}")
+    for estagio in estagios:
+        print(f"{estagio['estagio']:10s} {estagio['workers']:7d} {estagio['itens']:8d} "
+              f"{estagio['ocupado']:8.2f}s {estagio['itens_por_segundo']:9.1f} "
+              f"{estagio['espera_entrada']:8.2f}s {estagio['espera_saida']:9.2f}s")
+    medidos = [e for e in estagios if e["itens_por_segundo"] > 0]
+    if medidos:
+        gargalo = min(medidos, key=lambda e: e["itens_por_segundo"])
+        print(f"Gargalo: {gargalo['estagio']} ({gargalo['itens_por_segundo']:.1f} itens/s).")
+
+
+instrumentar_modulo(__name__)
+
+
+if __name__ == "__main__":
+    import sys
+
+    import registro_log
+    from db.conexao import inicializar_banco
+
+    if len(sys.argv) < 2:
+        print("Uso: python -m servicos.pipeline_convites <evento_id> [workers_qrcode] [workers_pdf]")
+        sys.exit(2)
+    registro_log.configurar()
+    inicializar_banco()
+    resultado = gerar_convites_evento(
+        int(sys.argv[1]),
+        int(sys.argv[2]) if len(sys.argv) > 2 else None,
+        int(sys.argv[3]) if len(sys.argv) > 3 else None,
+    )
+    if resultado:
+        exibir_estagios(resultado["estagios"])
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+import atexit
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from instrumentacao import instrumentar, instrumentar_modulo, registrar_bytes
+
+logger = logging.getLogger(__name__)
+
+# Diretório do cache persistente de QR Codes (PNG + índice)
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CACHE_DIR = os.path.join(BASE_DIR, "dados", "cache_qrcode")
+ARQUIVO_INDICE = "indice.json"
+# Tamanho máximo ocupado pelos PNGs em cache antes de descartar os menos usados
+LIMITE_CACHE_BYTES = 64 * 1024 * 1024
+
+
+def chave_qrcode(conteudo, versao, correcao_erro, box_size, borda):
+    """Calcula a chave do cache: hash do conteúdo e de todos os parâmetros de codificação."""
+    h = hashlib.sha256()
+    h.update(f"{versao}|{correcao_erro}|{box_size}|{borda}|".encode("utf-8"))
+    h.update(conteudo.encode("utf-8"))
+    return h.hexdigest()
+
+
+class CacheQRCode:
+    """Cache LRU em disco de imagens PNG de QR Code, limitado em bytes.
+
+    Cada entrada fica em "<chave>.png" dentro do diretório do cache, e a ordem
+    de uso (LRU) e os tamanhos ficam em um índice JSON gravado com salvar_indice()
+    (também chamado automaticamente ao encerrar o processo).
+    """
+
+    def __init__(self, diretorio=None, limite_bytes=None):
+        self.diretorio = diretorio or CACHE_DIR
+        self.limite_bytes = limite_bytes or LIMITE_CACHE_BYTES
+        self.acertos = 0
+        self.falhas = 0
+        self.descartes = 0
+        self._entradas = OrderedDict() # chave -> tamanho em bytes (mais antiga primeiro)
+        self._total_bytes = 0
+        self._alterado = False
+        self._lock = threading.Lock()
+        self._carregar_indice()
+
+    def _caminho(self, chave):
+        return os.path.join(self.diretorio, f"{chave}.png")
+
+    def _carregar_indice(self):
+        """Lê o índice do disco, descartando entradas cujo arquivo não existe mais."""
+        os.makedirs(self.diretorio, exist_ok=True)
+        try:
+            with open(os.path.join(self.diretorio, ARQUIVO_INDICE), encoding="utf-8") as arquivo:
+                indice = json.load(arquivo)
+        except (OSError, ValueError):
+            indice = []
+        presentes = {nome[:-4] for nome in os.listdir(self.diretorio) if nome.endswith(".png")}
+        for chave, tamanho in indice:
+            if chave in presentes and chave not in self._entradas:
+                self._entradas[chave] = tamanho
+                self._total_bytes += tamanho
+        # Arquivos gravados por outro processo sem índice entram como os mais antigos
+        for chave in presentes - self._entradas.keys():
+            tamanho = os.path.getsize(self._caminho(chave))
+            self._entradas[chave] = tamanho
+            self._entradas.move_to_end(chave, last=False)
+            self._total_bytes += tamanho
+            self._alterado = True
+
+    @instrumentar()
+    def obter(self, chave):
+        """Retorna os bytes PNG da chave, ou None em caso de falha (miss)."""
+        with self._lock:
+            if chave in self._entradas:
+                try:
+                    with open(self._caminho(chave), "rb") as arquivo:
+                        dados = arquivo.read()
+                    self._entradas.move_to_end(chave)
+                    self._alterado = True
+                    self.acertos += 1
+                    return dados
+                except OSError:
+                    self._total_bytes -= self._entradas.pop(chave)
+            self.falhas += 1
+            return None
+
+    @instrumentar()
+    def guardar(self, chave, dados):
+        """Armazena os bytes PNG da chave, descartando as entradas menos usadas se preciso."""
+        if len(dados) > self.limite_bytes:
+            return
+        with self._lock:
+            caminho_tmp = f"{self._caminho(chave)}.{os.getpid()}.tmp"
+            try:
+                with open(caminho_tmp, "wb") as arquivo:
+                    arquivo.write(dados)
+                os.replace(caminho_tmp, self._caminho(chave))
+                registrar_bytes(len(dados))
+            except OSError as e:
+                logger.warning("Aviso: não foi possível gravar o QR Code no cache: %s", e)
+                return
+            if chave in self._entradas:
+                self._total_bytes -= self._entradas.pop(chave)
+            self._entradas[chave] = len(dados)
+            self._total_bytes += len(dados)
+            self._alterado = True
+            while self._total_bytes > self.limite_bytes and self._entradas:
+                chave_antiga, tamanho = self._entradas.popitem(last=False)
+                self._total_bytes -= tamanho
+                self.descartes += 1
+                try:
+                    os.remove(self._caminho(chave_antiga))
+                except OSError:
+                    pass
+
+    def salvar_indice(self):
+        """Grava o índice LRU no disco (apenas se houve alteração)."""
+        with self._lock:
+            if not self._alterado:
+                return
+            caminho = os.path.join(self.diretorio, ARQUIVO_INDICE)
+            caminho_tmp = f"{caminho}.{os.getpid()}.tmp"
+            try:
+                with open(caminho_tmp, "w", encoding="utf-8") as arquivo:
+                    json.dump(list(self._entradas.items()), arquivo)
+                    registrar_bytes(arquivo.tell(), "servicos.qrcode_cache.CacheQRCode.salvar_indice")
+                os.replace(caminho_tmp, caminho)
+                self._alterado = False
+            except OSError as e:
+                logger.warning("Aviso: não foi possível salvar o índice do cache de QR Codes: %s", e)
+
+    def estatisticas(self):
+        """Retorna os contadores de acertos, falhas e descartes e a ocupação do cache."""
+        consultas = self.acertos + self.falhas
+        return {
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "descartes": self.descartes,
+            "taxa_acerto": self.acertos / consultas if consultas else 0.0,
+            "entradas": len(self._entradas),
+            "bytes": self._total_bytes,
+        }
+
+
+_cache = None
+_cache_pid = None
+
+
+def obter_cache():
+    """Retorna a instância do cache do processo atual (criada no primeiro uso)."""
+    global _cache, _cache_pid
+    if _cache is None or _cache_pid != os.getpid():
+        _cache = CacheQRCode()
+        _cache_pid = os.getpid()
+        atexit.register(_cache.salvar_indice)
+    return _cache
+
+
+instrumentar_modulo(__name__)
@@ -1,23 +1,143 @@
 import qrcode
+import io
+import logging
 import os
+import sys
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from PIL import Image
 
+# Permite executar o arquivo diretamente (python servicos/qrcode_service.py)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from servicos.qrcode_cache import chave_qrcode, obter_cache
+from servicos.verificador_tokens import codificar_token, obter_chave
+from instrumentacao import instrumentar_modulo, registrar_bytes
+from registro_log import ProgressoLote, falha, registrar_item
+
+logger = logging.getLogger(__name__)
+
 # Diretório para salvar os QR Codes
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 QRCODE_DIR = os.path.join(BASE_DIR, "dados", "qrcodes")
 
+# Parâmetros de codificação (também fazem parte da chave do cache)
+QR_VERSAO = 1 # Controla o tamanho do QR Code (1 a 40); cresce automaticamente com fit=True
+QR_CORRECAO_ERRO = qrcode.constants.ERROR_CORRECT_L # Nível de correção de erro (L, M, Q, H)
+QR_BOX_SIZE = 10 # Tamanho de cada "caixa" do QR Code
+QR_BORDA = 4 # Espessura da borda (mínimo 4)
+
+# Convidados enviados a cada tarefa do pool na geração em lote
+TAMANHO_CHUNK_LOTE = 64
+
+# Dias, após a data do evento, em que o token assinado ainda é aceito
+MARGEM_VALIDADE_TOKEN_DIAS = 1
+
+
+def expiracao_token(evento):
+    """Instante (epoch em s) em que os tokens do evento expiram; 0 se o evento não tem data.
+
+    Depende só da data do evento, para que o token (e o QR Code) de um convidado
+    seja sempre o mesmo e continue aproveitando o cache e o manifesto.
+    """
+    data = evento.get("data")
+    if isinstance(data, str):
+        try:
+            data = date.fromisoformat(data)
+        except ValueError:
+            data = None
+    if not isinstance(data, date):
+        return 0
+    fim = datetime.combine(data + timedelta(days=MARGEM_VALIDADE_TOKEN_DIAS + 1), dt_time())
+    return int(fim.timestamp())
+
+
+def emitir_token_assinado(evento, convidado):
+    """Emite o token HMAC "CV2:..." do convidado (evento, convidado e expiração).
+
+    Returns:
+        str: O token, ou None se a chave de assinatura não estiver disponível.
+    """
+    chave = obter_chave()
+    if not chave:
+        return None
+    return codificar_token(chave, evento["id"], convidado["id"], expiracao_token(evento))
+
+
+def montar_conteudo_qrcode(evento, convidado):
+    """Monta o conteúdo padrão ('dados') do QR Code de um convidado.
+
+    O conteúdo é o token assinado "CV2:...", que o portão valida em memória
+    (servicos.verificador_tokens) mesmo sem conexão com o banco. Sem chave de
+    assinatura, usa o token de check-in "CV1.<evento_id>.<token>" do banco ou,
+    em último caso, o texto livre antigo.
+    """
+    token = emitir_token_assinado(evento, convidado)
+    if token:
+        return token
+    if convidado.get("token"):
+        from modelos.convidado import montar_token_checkin
+        return montar_token_checkin(evento["id"], convidado["token"])
+    return f"Evento: {evento['nome']}\nConvidado: {convidado['nome']}\nID Convidado: {convidado['id']}"
+
 
-def gerar_qrcode(dados, nome_arquivo_base, tipo="dados"):
+def nome_arquivo_convidado(evento_id, convidado):
+    """Monta o nome base (sem extensão) dos arquivos de QR Code/convite de um convidado."""
+    return f"evento_{evento_id}_convidado_{convidado['id']}_{convidado['nome'].replace(' ', '_').lower()}"
+
+
+def chave_cache(conteudo_qr):
+    """Chave do cache de QR Codes para o conteúdo com os parâmetros atuais de codificação."""
+    return chave_qrcode(conteudo_qr, QR_VERSAO, QR_CORRECAO_ERRO, QR_BOX_SIZE, QR_BORDA)
+
+
+def _codificar(conteudo_qr):
+    """Cria o objeto QR Code já codificado com os parâmetros atuais."""
+    qr = qrcode.QRCode(
+        version=QR_VERSAO,
+        error_correction=QR_CORRECAO_ERRO,
+        box_size=QR_BOX_SIZE,
+        border=QR_BORDA,
+    )
+    qr.add_data(conteudo_qr)
+    qr.make(fit=True)
+    return qr
+
+
+def _codificar_png(conteudo_qr):
+    """Codifica o conteúdo e retorna os bytes PNG da imagem. Propaga exceções."""
+    qr = _codificar(conteudo_qr)
+
+    # Cria a imagem do QR Code usando Pillow (PIL)
+    img = qr.make_image(fill_color="black", back_color="white")
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _gravar_arquivo(caminho_arquivo, dados):
+    with open(caminho_arquivo, "wb") as arquivo:
+        arquivo.write(dados)
+    registrar_bytes(len(dados))
+
+
+def gerar_qrcode(dados, nome_arquivo_base, tipo="dados", usar_cache=True):
     """Gera um QR Code e salva como imagem PNG.
 
+    Com usar_cache=True, um QR Code já gerado antes para o mesmo conteúdo e os
+    mesmos parâmetros é copiado do cache em vez de ser codificado novamente.
+
     Args:
         dados (str): A informação a ser codificada (dados diretos ou URL).
         nome_arquivo_base (str): O nome base para o arquivo PNG (sem extensão).
                                   Será usado para criar um nome único, ex: evento_1_convidado_5.
         tipo (str): 'dados' para embutir a string diretamente, 'url' se for um link.
+        usar_cache (bool): Consulta/alimenta o cache persistente de QR Codes.
 
     Returns:
-        str: O caminho completo para o arquivo QR Code gerado, ou None se ocorrer erro.
+        str: O caminho completo para o arquivo QR Code gerado, ou uma Falha
+             (registro_log) se ocorrer erro.
     """
     # Garante que o diretório de QR Codes exista
     os.makedirs(QRCODE_DIR, exist_ok=True)
@@ -25,7 +145,7 @@ def gerar_qrcode(dados, nome_arquivo_base, tipo="dados"):
     # Define o conteúdo do QR Code
     conteudo_qr = dados
     if tipo == "url" and not dados.startswith(("http://", "https://")):
-        print(f"Aviso: URL 	\'{dados}	\' não parece válida. Gerando QR Code mesmo assim.")
+        logger.warning("Aviso: URL '%s' não parece válida. Gerando QR Code mesmo assim.", dados)
         # Poderia adicionar validação mais robusta de URL aqui
 
     # Monta o caminho completo do arquivo
@@ -33,30 +153,196 @@ def gerar_qrcode(dados, nome_arquivo_base, tipo="dados"):
     caminho_arquivo = os.path.join(QRCODE_DIR, nome_arquivo)
 
     try:
-        # Cria o objeto QR Code
-        qr = qrcode.QRCode(
-            version=1, # Controla o tamanho do QR Code (1 a 40)
-            error_correction=qrcode.constants.ERROR_CORRECT_L, # Nível de correção de erro (L, M, Q, H)
-            box_size=10, # Tamanho de cada "caixa" do QR Code
-            border=4, # Espessura da borda (mínimo 4)
-        )
-        qr.add_data(conteudo_qr)
-        qr.make(fit=True)
-
-        # Cria a imagem do QR Code usando Pillow (PIL)
-        img = qr.make_image(fill_color="black", back_color="white")
-
-        # Salva a imagem
-        img.save(caminho_arquivo)
-        print(f"QR Code gerado e salvo em: {caminho_arquivo}")
+        png = None
+        if usar_cache:
+            cache = obter_cache()
+            chave = chave_cache(conteudo_qr)
+            png = cache.obter(chave)
+        if png is None:
+            png = _codificar_png(conteudo_qr)
+            if usar_cache:
+                cache.guardar(chave, png)
+        _gravar_arquivo(caminho_arquivo, png)
+        registrar_item(logger, "QR Code gerado e salvo em: %s", caminho_arquivo)
         return caminho_arquivo
 
     except Exception as e:
-        print(f"Erro ao gerar QR Code para 	\'{nome_arquivo_base}	\': {e}")
+        return falha(logger, "gerar_qrcode", f"Erro ao gerar QR Code para '{nome_arquivo_base}': {e}", e)
+
+def gerar_matriz_qrcode(dados):
+    """Codifica o conteúdo e retorna a matriz de módulos, sem gerar imagem nem arquivo.
+
+    A matriz pode ser desenhada diretamente como vetores no PDF do convite
+    (ver convite_service.gerar_convite_pdf), evitando o PNG intermediário.
+
+    Args:
+        dados (str): A informação a ser codificada.
+
+    Returns:
+        list: Linhas de booleanos (True = módulo escuro), já incluindo a borda,
+              ou uma Falha (registro_log) se ocorrer erro.
+    """
+    try:
+        return _codificar(dados).get_matrix()
+    except Exception as e:
+        return falha(logger, "gerar_matriz_qrcode", f"Erro ao codificar QR Code em memória: {e}", e)
+
+
+def gerar_png_qrcode(dados, usar_cache=True):
+    """Gera a imagem PNG do QR Code apenas em memória (nenhum arquivo é gravado).
+
+    Args:
+        dados (str): A informação a ser codificada.
+        usar_cache (bool): Consulta/alimenta o cache persistente de QR Codes.
+
+    Returns:
+        io.BytesIO: O PNG pronto para leitura (ex: ImageReader do reportlab),
+                    ou uma Falha (registro_log) se ocorrer erro.
+    """
+    try:
+        png = None
+        if usar_cache:
+            cache = obter_cache()
+            chave = chave_cache(dados)
+            png = cache.obter(chave)
+        if png is None:
+            png = _codificar_png(dados)
+            if usar_cache:
+                cache.guardar(chave, png)
+        return io.BytesIO(png)
+    except Exception as e:
+        return falha(logger, "gerar_png_qrcode", f"Erro ao gerar PNG do QR Code em memória: {e}", e)
+
+
+def _gerar_chunk_qrcodes(itens):
+    """Executado nos processos do pool: gera os QR Codes de um chunk de convidados.
+
+    Args:
+        itens (list): Tuplas (convidado_id, conteudo_qr, caminho_arquivo).
+
+    Returns:
+        list: Tuplas (convidado_id, caminho_arquivo ou None, chave do cache,
+              bytes PNG ou None, mensagem de erro ou None). Os bytes voltam ao
+              processo principal, que é o único a escrever no cache.
+    """
+    resultados = []
+    for convidado_id, conteudo_qr, caminho_arquivo in itens:
+        try:
+            png = _codificar_png(conteudo_qr)
+            _gravar_arquivo(caminho_arquivo, png)
+            resultados.append((convidado_id, caminho_arquivo, chave_cache(conteudo_qr), png, None))
+        except Exception as e:
+            resultados.append((convidado_id, None, None, None, str(e)))
+    return resultados
+
+
+def _itens_qrcode_evento(evento, tamanho_chunk, cache, resultado, progresso):
+    """Percorre os convidados do evento e os agrupa em chunks de trabalho.
+
+    Convidados cujo QR Code está no cache são resolvidos aqui mesmo (o PNG é
+    apenas copiado) e não chegam a ser enviados ao pool.
+    """
+    from modelos.convidado import iterar_convidados
+
+    chunk = []
+    for convidado in iterar_convidados(evento["id"]):
+        caminho = os.path.join(QRCODE_DIR, f"{nome_arquivo_convidado(evento['id'], convidado)}.png")
+        conteudo_qr = montar_conteudo_qrcode(evento, convidado)
+        if cache is not None:
+            png = cache.obter(chave_cache(conteudo_qr))
+            if png is not None:
+                try:
+                    _gravar_arquivo(caminho, png)
+                    resultado["gerados"][convidado["id"]] = caminho
+                    progresso.sucesso()
+                except OSError as e:
+                    resultado["erros"][convidado["id"]] = str(e)
+                    progresso.erro(convidado["id"], e)
+                continue
+        chunk.append((convidado["id"], conteudo_qr, caminho))
+        if len(chunk) >= tamanho_chunk:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def gerar_qrcodes_evento(evento_id, workers=None, tamanho_chunk=TAMANHO_CHUNK_LOTE, usar_cache=True):
+    """Gera os QR Codes ('dados') de todos os convidados de um evento em paralelo.
+
+    Os convidados são lidos do banco página a página e enviados em chunks para
+    um ProcessPoolExecutor. No máximo 2 chunks por worker ficam pendentes ao
+    mesmo tempo, de modo que a memória não cresce com o tamanho do evento. O
+    andamento sai no log como progresso agregado (registro_log.ProgressoLote).
+
+    Args:
+        evento_id (int): ID do evento.
+        workers (int, optional): Número de processos. Padrão: os.cpu_count().
+                                 Com 1, a geração roda no próprio processo.
+        tamanho_chunk (int): Convidados por tarefa enviada ao pool.
+        usar_cache (bool): Reaproveita QR Codes já codificados (cache persistente).
+
+    Returns:
+        dict: {'gerados': {convidado_id: caminho}, 'erros': {convidado_id: mensagem},
+               'duracao': segundos, 'cache': estatísticas do cache ou None},
+              ou None se o evento não existir.
+    """
+    from modelos.evento import buscar_evento_por_id, estatisticas_evento
+
+    evento = buscar_evento_por_id(evento_id)
+    if not evento:
+        logger.error("Erro: Evento com ID %s não encontrado.", evento_id)
         return None
 
+    os.makedirs(QRCODE_DIR, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    resultado = {"gerados": {}, "erros": {}, "duracao": 0.0, "cache": None}
+    cache = obter_cache() if usar_cache else None
+
+    def registrar(resultados_chunk):
+        for convidado_id, caminho, chave, png, erro in resultados_chunk:
+            if erro:
+                resultado["erros"][convidado_id] = erro
+                progresso.erro(convidado_id, erro)
+            else:
+                resultado["gerados"][convidado_id] = caminho
+                progresso.sucesso()
+                if cache is not None:
+                    cache.guardar(chave, png)
+
+    total = (estatisticas_evento(evento_id) or {}).get("total")
+    inicio = time.perf_counter()
+    with ProgressoLote(f"QR Codes do evento ID {evento_id} ({workers} worker(s))", total, logger,
+                       unidade="QR Codes") as progresso:
+        chunks = _itens_qrcode_evento(evento, tamanho_chunk, cache, resultado, progresso)
+        if workers == 1:
+            for chunk in chunks:
+                registrar(_gerar_chunk_qrcodes(chunk))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                pendentes = set()
+                for chunk in chunks:
+                    if len(pendentes) >= workers * 2:
+                        concluidos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+                        for futuro in concluidos:
+                            registrar(futuro.result())
+                    pendentes.add(executor.submit(_gerar_chunk_qrcodes, chunk))
+                for futuro in wait(pendentes).done:
+                    registrar(futuro.result())
+    resultado["duracao"] = time.perf_counter() - inicio
+    if cache is not None:
+        cache.salvar_indice()
+        resultado["cache"] = cache.estatisticas()
+        logger.info("Cache de QR Codes: %d acertos, %d falhas.", resultado["cache"]["acertos"], resultado["cache"]["falhas"])
+    return resultado
+
+
+instrumentar_modulo(__name__)
+
 # Exemplo de uso (pode ser removido ou comentado depois)
 if __name__ == '__main__':
+    import registro_log
+    registro_log.configurar()
     print("--- Testando Serviço QR Code ---")
 
     # 1. Gerar QR Code com dados embutidos
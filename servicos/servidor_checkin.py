@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""Servidor HTTP local (asyncio, só biblioteca padrão) para os leitores de check-in.
+
+Rotas:
+    POST /checkin                     {"conteudo": "<QR lido>", "evento_id": 1}
+    GET  /convidados/<id>             Dados de um convidado
+    GET  /eventos/<id>/presenca       Contagem de convidados por status
+    GET  /metricas                    Métricas do gravador de check-ins
+
+As conexões são persistentes (keep-alive) e o laço de eventos nunca acessa o
+banco: consultas rodam num pool limitado de threads e os check-ins com token
+assinado vão para o GravadorCheckin (group commit), aguardado via Future.
+
+Uso:
+    python servicos/servidor_checkin.py [--host 127.0.0.1] [--porta 8080] [--threads 8] [--banco arquivo.sqlite]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from db import conexao as db_conexao
+from modelos import convidado as modelo_convidado
+from modelos import evento as modelo_evento
+from servicos import checkin_service
+from servicos.gravador_checkin import GravadorCheckin
+from servicos.verificador_tokens import eh_token_assinado
+from instrumentacao import instrumentar_modulo
+
+logger = logging.getLogger(__name__)
+
+HOST_PADRAO = "127.0.0.1"
+PORTA_PADRAO = 8080
+THREADS_BANCO = 8 # Consultas simultâneas ao SQLite
+TIMEOUT_OCIOSO = 30 # Segundos sem requisição antes de fechar a conexão keep-alive
+MAX_CABECALHOS = 16 * 1024
+MAX_CORPO = 64 * 1024
+BACKLOG = 2048 # Conexões pendentes aceitas pelo socket (muitos leitores ao mesmo tempo)
+
+
+class ErroHTTP(Exception):
+    def __init__(self, status, mensagem=None):
+        super().__init__(mensagem or status.phrase)
+        self.status = status
+        self.mensagem = mensagem or status.phrase
+
+
+class ServidorCheckin:
+    """Servidor HTTP/1.1 mínimo sobre asyncio.start_server."""
+
+    def __init__(self, host=HOST_PADRAO, porta=PORTA_PADRAO, threads=THREADS_BANCO):
+        self.host = host
+        self.porta = porta
+        self.threads = threads
+        self._pool = None
+        self._gravador = None
+        self._servidor = None
+
+    async def iniciar(self):
+        self._pool = ThreadPoolExecutor(self.threads, thread_name_prefix="banco")
+        self._gravador = GravadorCheckin()
+        self._gravador.iniciar()
+        self._servidor = await asyncio.start_server(
+            self._atender_conexao, self.host, self.porta, backlog=BACKLOG, limit=MAX_CABECALHOS
+        )
+        # Porta efetiva (útil com --porta 0)
+        self.porta = self._servidor.sockets[0].getsockname()[1]
+        return self
+
+    async def servir(self):
+        async with self._servidor:
+            await self._servidor.serve_forever()
+
+    async def parar(self):
+        if self._servidor:
+            self._servidor.close()
+            await self._servidor.wait_closed()
+        if self._gravador:
+            self._gravador.parar()
+        if self._pool:
+            self._pool.shutdown(wait=True)
+
+    async def _no_banco(self, funcao, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._pool, funcao, *args)
+
+    async def _atender_conexao(self, leitor, escritor):
+        try:
+            while True:
+                try:
+                    cabecalho = await asyncio.wait_for(leitor.readuntil(b"\r\n\r\n"), TIMEOUT_OCIOSO)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._responder(escritor, HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE,
+                                          {"erro": "Cabeçalhos muito grandes."}, manter=False)
+                    break
+                manter = await self._atender_requisicao(cabecalho, leitor, escritor)
+                if not manter:
+                    break
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            escritor.close()
+
+    async def _atender_requisicao(self, cabecalho, leitor, escritor):
+        try:
+            linhas = cabecalho.decode("latin-1").split("\r\n")
+            metodo, caminho, versao = linhas[0].split(" ", 2)
+            cabecalhos = {}
+            for linha in linhas[1:]:
+                if ":" in linha:
+                    nome, valor = linha.split(":", 1)
+                    cabecalhos[nome.strip().lower()] = valor.strip()
+        except ValueError:
+            await self._responder(escritor, HTTPStatus.BAD_REQUEST, {"erro": "Requisição malformada."}, manter=False)
+            return False
+
+        conexao = cabecalhos.get("connection", "").lower()
+        manter = conexao == "keep-alive" if versao == "HTTP/1.0" else conexao != "close"
+
+        corpo = b""
+        try:
+            tamanho = int(cabecalhos.get("content-length", "0"))
+        except ValueError:
+            tamanho = -1
+        if tamanho < 0 or tamanho > MAX_CORPO:
+            await self._responder(escritor, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"erro": "Corpo inválido."}, manter=False)
+            return False
+        if tamanho:
+            try:
+                corpo = await leitor.readexactly(tamanho)
+            except asyncio.IncompleteReadError:
+                return False
+
+        try:
+            status, resposta = await self._rotear(metodo, caminho.split("?", 1)[0], corpo)
+        except ErroHTTP as e:
+            status, resposta = e.status, {"erro": e.mensagem}
+        except Exception as e: # Um erro inesperado não derruba a conexão do leitor
+            logger.error("Erro ao atender %s %s: %s", metodo, caminho, e)
+            status, resposta = HTTPStatus.INTERNAL_SERVER_ERROR, {"erro": "Erro interno."}
+        await self._responder(escritor, status, resposta, manter)
+        return manter
+
+    async def _responder(self, escritor, status, dados, manter):
+        corpo = json.dumps(dados, ensure_ascii=False).encode("utf-8")
+        cabecalho = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(corpo)}\r\n"
+            f"Connection: {'keep-alive' if manter else 'close'}\r\n\r\n"
+        ).encode("latin-1")
+        escritor.write(cabecalho + corpo)
+        await escritor.drain()
+
+    async def _rotear(self, metodo, caminho, corpo):
+        partes = [parte for parte in caminho.split("/") if parte]
+        if partes == ["checkin"]:
+            if metodo != "POST":
+                raise ErroHTTP(HTTPStatus.METHOD_NOT_ALLOWED)
+            return await self._checkin(corpo)
+        if metodo != "GET":
+            raise ErroHTTP(HTTPStatus.METHOD_NOT_ALLOWED)
+        if len(partes) == 2 and partes[0] == "convidados":
+            convidado = await self._no_banco(modelo_convidado.buscar_convidado_por_id, _inteiro(partes[1]))
+            if convidado is None:
+                raise ErroHTTP(HTTPStatus.NOT_FOUND, "Convidado não encontrado.")
+            dados = convidado.para_dict()
+            # O token "CV1" permite fazer check-in e não é exposto na consulta
+            dados.pop("token", None)
+            return HTTPStatus.OK, dados
+        if len(partes) == 3 and partes[0] == "eventos" and partes[2] == "presenca":
+            evento_id = _inteiro(partes[1])
+            contagem = await self._no_banco(modelo_evento.estatisticas_evento, evento_id)
+            if contagem is None:
+                raise ErroHTTP(HTTPStatus.NOT_FOUND, "Evento não encontrado.")
+            return HTTPStatus.OK, {"evento_id": evento_id, **contagem}
+        if partes == ["metricas"]:
+            return HTTPStatus.OK, self._gravador.metricas()
+        raise ErroHTTP(HTTPStatus.NOT_FOUND, "Rota não encontrada.")
+
+    async def _checkin(self, corpo):
+        try:
+            dados = json.loads(corpo or b"{}")
+            conteudo = dados["conteudo"]
+            evento_id = int(dados["evento_id"])
+        except (ValueError, KeyError, TypeError):
+            raise ErroHTTP(HTTPStatus.BAD_REQUEST, "Informe 'conteudo' e 'evento_id'.")
+        if eh_token_assinado(conteudo):
+            # Verificação em memória no próprio laço; a gravação é feita pelo
+            # gravador em lote e aguardada sem ocupar uma thread
+            futuro = checkin_service.enviar_checkin(conteudo, evento_id, self._gravador)
+            resultado = await asyncio.wrap_future(futuro)
+        else:
+            resultado = await self._no_banco(checkin_service.registrar_checkin, conteudo, evento_id)
+        status = HTTPStatus.SERVICE_UNAVAILABLE if resultado["status"] == "erro" else HTTPStatus.OK
+        return status, resultado
+
+
+def _inteiro(texto):
+    try:
+        return int(texto)
+    except ValueError:
+        raise ErroHTTP(HTTPStatus.BAD_REQUEST, f"ID inválido: {texto}")
+
+
+async def executar_servidor(host=HOST_PADRAO, porta=PORTA_PADRAO, threads=THREADS_BANCO):
+    servidor = await ServidorCheckin(host, porta, threads).iniciar()
+    logger.info("Servidor de check-in em http://%s:%s (%s threads de banco)", servidor.host, servidor.porta, threads)
+    try:
+        await servidor.servir()
+    finally:
+        await servidor.parar()
+
+
+instrumentar_modulo(__name__)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor HTTP local de check-in.")
+    parser.add_argument("--host", default=HOST_PADRAO)
+    parser.add_argument("--porta", type=int, default=PORTA_PADRAO)
+    parser.add_argument("--threads", type=int, default=THREADS_BANCO)
+    parser.add_argument("--banco", help="Arquivo SQLite (padrão: o configurado em db/conexao.py)")
+    args = parser.parse_args()
+
+    if args.banco:
+        db_conexao.DB_PATH = os.path.abspath(args.banco)
+    import registro_log
+    registro_log.configurar()
+    db_conexao.inicializar_banco()
+    try:
+        asyncio.run(executar_servidor(args.host, args.porta, args.threads))
+    except KeyboardInterrupt:
+        print("\nServidor encerrado.")
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import logging
+import os
+
+from modelos import artefato as modelo_artefato
+from modelos.convidado import paginar_convidados
+from modelos.evento import buscar_evento_por_id, estatisticas_evento, listar_eventos
+from servicos import convite_service
+from servicos import qrcode_service
+from instrumentacao import instrumentar_modulo
+from registro_log import ProgressoLote
+
+logger = logging.getLogger(__name__)
+
+
+def hash_convite(evento, convidado, chave_qrcode):
+    """Hash das entradas que definem o PDF do convite de um convidado.
+
+    Inclui a versão do template, os campos do evento exibidos no convite, o
+    nome do convidado e a chave do QR Code (conteúdo + parâmetros).
+    """
+    entradas = [
+        convite_service.VERSAO_TEMPLATE,
+        evento.get("nome"),
+        evento.get("local"),
+        str(evento.get("data")),
+        str(evento.get("horario")),
+        convidado.get("nome"),
+        chave_qrcode,
+    ]
+    return hashlib.sha256(json.dumps(entradas, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _artefato_atualizado(registro, caminho, hash_entradas):
+    """Verifica se o artefato registrado corresponde às entradas atuais e existe no disco."""
+    return (
+        registro is not None
+        and registro["hash_entradas"] == hash_entradas
+        and registro["caminho"] == caminho
+        and os.path.exists(caminho)
+    )
+
+
+def _remover_arquivo(caminho):
+    try:
+        os.remove(caminho)
+        return True
+    except FileNotFoundError:
+        return False
+    except OSError as e:
+        logger.warning("Aviso: não foi possível remover \"%s\": %s", caminho, e)
+        return False
+
+
+def _sincronizar_evento(evento, resultado, progresso):
+    """Regenera os artefatos desatualizados de um evento, página a página."""
+    apos = None
+    while True:
+        convidados, apos = paginar_convidados(evento["id"], apos)
+        registrados = modelo_artefato.buscar_artefatos_de_convidados(c["id"] for c in convidados)
+        novos_registros = []
+        for convidado in convidados:
+            conteudo_qr = qrcode_service.montar_conteudo_qrcode(evento, convidado)
+            chave_qr = qrcode_service.chave_cache(conteudo_qr)
+            nome_base = qrcode_service.nome_arquivo_convidado(evento["id"], convidado)
+            alvos = (
+                ("qrcode", os.path.join(qrcode_service.QRCODE_DIR, f"{nome_base}.png"), chave_qr),
+                ("convite", os.path.join(convite_service.CONVITE_DIR, f"{nome_base}.pdf"),
+                 hash_convite(evento, convidado, chave_qr)),
+            )
+            for tipo, caminho, hash_entradas in alvos:
+                registro = registrados.get((convidado["id"], tipo))
+                if _artefato_atualizado(registro, caminho, hash_entradas):
+                    resultado["inalterados"] += 1
+                    progresso.sucesso()
+                    continue
+
+                if tipo == "qrcode":
+                    gerado = qrcode_service.gerar_qrcode(conteudo_qr, nome_base)
+                else:
+                    matriz = qrcode_service.gerar_matriz_qrcode(conteudo_qr)
+                    gerado = matriz and convite_service.gerar_convite_pdf(
+                        evento, convidado, None, nome_base, matriz_qrcode=matriz)
+                if not gerado:
+                    # A Falha devolvida pelo serviço traz a causa
+                    erro = getattr(gerado, "mensagem", None) or f"Falha ao gerar {tipo}."
+                    resultado["erros"][(convidado["id"], tipo)] = erro
+                    progresso.erro((convidado["id"], tipo), erro)
+                    continue
+
+                # O nome do arquivo inclui o nome do convidado: um arquivo antigo com outro nome fica obsoleto
+                if registro is not None and registro["caminho"] != caminho:
+                    _remover_arquivo(registro["caminho"])
+                novos_registros.append((convidado["id"], tipo, evento["id"], caminho, hash_entradas))
+                resultado["regenerados"] += 1
+                progresso.sucesso()
+        modelo_artefato.registrar_artefatos(novos_registros)
+        if apos is None:
+            break
+
+
+def sincronizar_convites(evento_id=None):
+    """Regenera apenas os QR Codes e convites cujas entradas mudaram desde a última geração.
+
+    Para cada convidado, compara o hash das entradas atuais (dados do evento e
+    do convidado, conteúdo do QR Code e versão do template) com o registrado
+    no manifesto (tabela artefatos). Artefatos ausentes, com hash diferente ou
+    cujo arquivo sumiu do disco são regenerados. Em seguida, os artefatos de
+    convidados excluídos são apagados do disco e do manifesto.
+
+    Args:
+        evento_id (int, optional): Sincroniza apenas este evento. None sincroniza todos.
+
+    Returns:
+        dict: Contadores 'regenerados', 'inalterados' e 'removidos', e 'erros'
+              ({(convidado_id, tipo): mensagem}), ou None se o evento não existir.
+    """
+    resultado = {"regenerados": 0, "inalterados": 0, "removidos": 0, "erros": {}}
+    if evento_id is not None:
+        evento = buscar_evento_por_id(evento_id)
+        if not evento:
+            logger.error("Erro: Evento com ID %s não encontrado.", evento_id)
+            return None
+        eventos = [evento]
+    else:
+        # Os registros da listagem já trazem data/horario como date/time (sob demanda)
+        eventos = listar_eventos()
+
+    eventos = [evento for evento in eventos if evento]
+    # Dois artefatos (QR Code e convite) por convidado
+    total = sum(2 * ((estatisticas_evento(evento["id"]) or {}).get("total") or 0) for evento in eventos)
+    with ProgressoLote("Sincronização de convites", total, logger, unidade="artefatos") as progresso:
+        for evento in eventos:
+            _sincronizar_evento(evento, resultado, progresso)
+
+    # Coleta de lixo: artefatos cujo convidado foi excluído
+    orfaos = modelo_artefato.listar_artefatos_orfaos()
+    if evento_id is not None:
+        orfaos = [a for a in orfaos if a["evento_id"] == evento_id]
+    for orfao in orfaos:
+        if _remover_arquivo(orfao["caminho"]):
+            resultado["removidos"] += 1
+    modelo_artefato.remover_artefatos([(a["convidado_id"], a["tipo"]) for a in orfaos])
+
+    logger.info("Sincronização de convites: %d regenerados, %d inalterados, %d removidos, %d erros.",
+                resultado["regenerados"], resultado["inalterados"], resultado["removidos"], len(resultado["erros"]))
+    return resultado
+
+
+instrumentar_modulo(__name__)
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""Tokens de check-in assinados (HMAC) e verificação local, sem consulta ao banco.
+
+Formato do conteúdo do QR Code: "CV2:" + base32 (sem '=') de
+    evento_id (uint32) | convidado_id (uint32) | expira_em (uint32, epoch em s) | HMAC-SHA256[:10]
+
+Todo o texto usa apenas caracteres do modo alfanumérico do QR Code (A-Z, 2-7 e ':'),
+o que permite uma versão menor de QR Code que a do conteúdo em texto livre.
+Este módulo usa só a biblioteca padrão: o portão pode importá-lo sem o restante
+do sistema (banco, reportlab, Pillow). A instrumentação (instrumentacao.py) é
+usada se estiver disponível.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import re
+import secrets
+import struct
+import time
+
+try:
+    from instrumentacao import instrumentar_modulo
+except ImportError: # Portão com só este arquivo: sem instrumentação
+    def instrumentar_modulo(nome_modulo):
+        pass
+
+logger = logging.getLogger(__name__)
+
+PREFIXO_TOKEN_ASSINADO = "CV2:"
+# Campos assinados: evento_id, convidado_id, expira_em (0 = sem expiração)
+_CORPO = struct.Struct(">III")
+TAMANHO_ASSINATURA = 10  # bytes do HMAC-SHA256 mantidos no token (80 bits)
+_TAMANHO_BINARIO = _CORPO.size + TAMANHO_ASSINATURA
+# Tamanho exato do texto base32 sem padding e bits de preenchimento no último caractere
+_TAMANHO_BASE32 = -(-_TAMANHO_BINARIO * 8 // 5)
+_BITS_SOBRA = _TAMANHO_BASE32 * 5 - _TAMANHO_BINARIO * 8
+# Decodificação rápida: o alfabeto base32 (RFC 4648) é traduzido para os dígitos
+# de int(..., 32), evitando base64.b32decode, que domina o custo da verificação
+_TOKEN_BASE32 = re.compile(f"[A-Z2-7]{{{_TAMANHO_BASE32}}}")
+_PARA_DIGITOS = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ234567", "0123456789abcdefghijklmnopqrstuv")
+
+# Chave secreta: variável de ambiente (hex) ou arquivo local gerado no primeiro uso
+VARIAVEL_CHAVE = "CONVITE_CHAVE_TOKENS"
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+ARQUIVO_CHAVE = os.path.join(BASE_DIR, "dados", "chave_tokens.key")
+TAMANHO_CHAVE = 32
+
+_chave_padrao = None
+
+
+def carregar_chave(caminho=None):
+    """Carrega a chave HMAC dos tokens.
+
+    A variável de ambiente CONVITE_CHAVE_TOKENS (hex) tem prioridade; sem ela, a
+    chave é lida de dados/chave_tokens.key, que é criado (permissão 0600) se não
+    existir. Portões offline devem receber uma cópia desse arquivo.
+
+    Returns:
+        bytes: A chave, ou None se não for possível obtê-la.
+    """
+    valor = os.environ.get(VARIAVEL_CHAVE)
+    if valor:
+        try:
+            return bytes.fromhex(valor.strip())
+        except ValueError:
+            logger.error("Valor inválido em %s: esperado texto hexadecimal.", VARIAVEL_CHAVE)
+            return None
+
+    caminho = caminho or ARQUIVO_CHAVE
+    try:
+        with open(caminho, "rb") as arquivo:
+            return bytes.fromhex(arquivo.read().decode("ascii").strip())
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        logger.error("Erro ao ler a chave dos tokens em %s: %s", caminho, e)
+        return None
+
+    chave = secrets.token_bytes(TAMANHO_CHAVE)
+    try:
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        # O_EXCL: se outro processo criou a chave ao mesmo tempo, usa a dele
+        descritor = os.open(caminho, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(descritor, "wb") as arquivo:
+            arquivo.write(chave.hex().encode("ascii"))
+        logger.info("Nova chave de assinatura dos tokens criada em: %s", caminho)
+        return chave
+    except FileExistsError:
+        return carregar_chave(caminho)
+    except OSError as e:
+        logger.error("Erro ao criar a chave dos tokens em %s: %s", caminho, e)
+        return None
+
+
+def obter_chave():
+    """Chave padrão do processo (carregada uma única vez)."""
+    global _chave_padrao
+    if _chave_padrao is None:
+        _chave_padrao = carregar_chave()
+    return _chave_padrao
+
+
+class _AssinadorHMAC:
+    """HMAC-SHA256 com os estados interno e externo pré-calculados.
+
+    Equivale a hmac.new(chave, PREFIXO + corpo, sha256), mas copia apenas os dois
+    objetos sha256 a cada token, o que é bem mais barato que hmac.HMAC.copy().
+    """
+
+    def __init__(self, chave):
+        bloco = hashlib.sha256().block_size
+        if len(chave) > bloco:
+            chave = hashlib.sha256(chave).digest()
+        chave = chave.ljust(bloco, b"\0")
+        self._interno = hashlib.sha256(bytes(b ^ 0x36 for b in chave))
+        self._externo = hashlib.sha256(bytes(b ^ 0x5C for b in chave))
+        # O prefixo (com a versão do formato) entra na assinatura
+        self._interno.update(PREFIXO_TOKEN_ASSINADO.encode("ascii"))
+
+    def assinar(self, corpo):
+        interno = self._interno.copy()
+        interno.update(corpo)
+        externo = self._externo.copy()
+        externo.update(interno.digest())
+        return externo.digest()[:TAMANHO_ASSINATURA]
+
+
+def codificar_token(chave, evento_id, convidado_id, expira_em=0):
+    """Monta o token assinado "CV2:..." de um convidado.
+
+    Args:
+        chave (bytes): Chave HMAC.
+        evento_id (int): ID do evento.
+        convidado_id (int): ID do convidado.
+        expira_em (int): Instante de expiração (epoch em segundos); 0 = não expira.
+
+    Returns:
+        str: Conteúdo do QR Code (40 caracteres alfanuméricos).
+    """
+    corpo = _CORPO.pack(evento_id, convidado_id, int(expira_em))
+    binario = corpo + _AssinadorHMAC(chave).assinar(corpo)
+    return PREFIXO_TOKEN_ASSINADO + base64.b32encode(binario).decode("ascii").rstrip("=")
+
+
+def eh_token_assinado(conteudo):
+    """Indica se o conteúdo lido tem o formato de token assinado (sem validá-lo)."""
+    return isinstance(conteudo, str) and conteudo.startswith(PREFIXO_TOKEN_ASSINADO)
+
+
+class VerificadorTokens:
+    """Valida tokens assinados inteiramente em memória.
+
+    Guarda um conjunto local de convidados revogados (excluídos depois da emissão
+    do convite) e, opcionalmente, as leituras já aceitas, para detectar
+    reentrada enquanto o portão está sem conexão com o banco.
+    """
+
+    def __init__(self, chave=None, revogados=(), evento_id=None):
+        chave = chave if chave is not None else obter_chave()
+        if not chave:
+            raise ValueError("Chave de assinatura dos tokens indisponível.")
+        self._assinador = _AssinadorHMAC(chave)
+        self.evento_id = evento_id
+        self.revogados = set(revogados)
+        self.lidos = set()
+
+    def revogar(self, convidado_id):
+        """Adiciona um convidado ao conjunto local de revogados."""
+        self.revogados.add(convidado_id)
+
+    def carregar_revogacoes(self, caminho):
+        """Carrega (e soma ao conjunto atual) a lista exportada por exportar_revogacoes.
+
+        Returns:
+            int: Quantidade de IDs revogados carregados, ou None em caso de erro.
+        """
+        try:
+            with open(caminho, "r", encoding="utf-8") as arquivo:
+                dados = json.load(arquivo)
+            ids = [int(convidado_id) for convidado_id in dados.get("revogados", [])]
+        except (OSError, ValueError, AttributeError, TypeError) as e:
+            logger.error("Erro ao carregar revogações de %s: %s", caminho, e)
+            return None
+        self.revogados.update(ids)
+        return len(ids)
+
+    def decodificar(self, conteudo):
+        """Confere o formato e a assinatura do token.
+
+        Returns:
+            tuple: (evento_id, convidado_id, expira_em), ou None se o conteúdo não
+                   for um token assinado válido por esta chave.
+        """
+        if not eh_token_assinado(conteudo):
+            return None
+        texto = conteudo[len(PREFIXO_TOKEN_ASSINADO):]
+        if _TOKEN_BASE32.fullmatch(texto) is None:
+            return None
+        valor = int(texto.translate(_PARA_DIGITOS), 32)
+        # Bits de preenchimento diferentes de zero: codificação não canônica
+        if valor & ((1 << _BITS_SOBRA) - 1):
+            return None
+        binario = (valor >> _BITS_SOBRA).to_bytes(_TAMANHO_BINARIO, "big")
+        corpo = binario[:_CORPO.size]
+        if not hmac.compare_digest(self._assinador.assinar(corpo), binario[_CORPO.size:]):
+            return None
+        return _CORPO.unpack(corpo)
+
+    def verificar(self, conteudo, agora=None, registrar_leitura=False):
+        """Valida um token lido na entrada, sem acessar o banco.
+
+        Args:
+            conteudo (str): Conteúdo lido do QR Code.
+            agora (float, optional): Instante da leitura (epoch); padrão time.time().
+            registrar_leitura (bool): Se True, guarda a leitura aceita e devolve
+                                      'duplicado' nas leituras seguintes do mesmo convidado.
+
+        Returns:
+            dict: {'status': 'ok' | 'duplicado' | 'expirado' | 'revogado'
+                   | 'evento_incorreto' | 'invalido', 'evento_id', 'convidado_id'}.
+        """
+        dados = self.decodificar(conteudo)
+        if dados is None:
+            return {"status": "invalido", "evento_id": None, "convidado_id": None}
+        evento_id, convidado_id, expira_em = dados
+        resultado = {"status": "ok", "evento_id": evento_id, "convidado_id": convidado_id}
+        if self.evento_id is not None and evento_id != self.evento_id:
+            resultado["status"] = "evento_incorreto"
+        elif expira_em and (agora if agora is not None else time.time()) >= expira_em:
+            resultado["status"] = "expirado"
+        elif convidado_id in self.revogados:
+            resultado["status"] = "revogado"
+        elif registrar_leitura:
+            if convidado_id in self.lidos:
+                resultado["status"] = "duplicado"
+            else:
+                self.lidos.add(convidado_id)
+        return resultado
+
+
+instrumentar_modulo(__name__)
+
+
+if __name__ == "__main__":
+    chave_teste = secrets.token_bytes(TAMANHO_CHAVE)
+    token = codificar_token(chave_teste, 7, 12345, int(time.time()) + 3600)
+    print(f"Token: {token} ({len(token)} caracteres)")
+
+    verificador = VerificadorTokens(chave_teste, evento_id=7)
+    print("Leitura 1:", verificador.verificar(token, registrar_leitura=True)["status"])
+    print("Leitura 2:", verificador.verificar(token, registrar_leitura=True)["status"])
+    print("Adulterado:", verificador.verificar(token[:-1] + ("A" if token[-1] != "A" else "B"))["status"])
+    verificador.revogar(12345)
+    print("Após revogar:", verificador.verificar(token)["status"])
+
+    total = 200000
+    inicio = time.perf_counter()
+    for _ in range(total):
+        verificador.decodificar(token)
+    duracao = time.perf_counter() - inicio
+    print(f"{total} verificações em {duracao:.2f}s ({total / duracao:.0f}/s)")
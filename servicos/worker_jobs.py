@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""Worker da fila de jobs (modelos/job.py): gera os convites em segundo plano.
+
+Cada worker reserva um lote de jobs com lease, executa-os e grava os
+resultados do lote numa única transação. Vários workers (processos na mesma
+máquina ou em máquinas que compartilham o arquivo do banco) esvaziam a fila em
+paralelo; um worker que morre no meio só atrasa os jobs do seu lote até o
+lease vencer, e uma nova execução continua de onde a fila parou.
+
+Uso:
+    python servicos/worker_jobs.py [--banco arquivo.sqlite] [--processos 4] [--lote 16]
+                                   [--lease 60] [--continuo]
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from db import conexao as db_conexao
+from modelos import job as modelo_job
+from instrumentacao import instrumentar_modulo
+from registro_log import ProgressoLote
+
+logger = logging.getLogger(__name__)
+
+LOTE_RESERVA = 16 # Jobs reservados (e finalizados numa transação) por vez
+LEASE_SEGUNDOS = 60
+ESPERA_FILA_VAZIA = 2.0 # Segundos entre consultas quando a fila está vazia (modo contínuo)
+INTERVALO_PROGRESSO = 5.0 # Segundos entre as linhas de progresso
+
+
+def identificador_worker():
+    """Nome único do worker na fila: máquina e PID."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _executar_convite(job):
+    """Gera o PDF do convite de um convidado e o registra no manifesto de artefatos.
+
+    Returns:
+        str: Caminho do PDF gerado (ou None se o convidado não existe mais).
+    """
+    from modelos import artefato as modelo_artefato
+    from modelos.convidado import buscar_convidado_por_id
+    from modelos.evento import buscar_evento_por_id
+    from servicos import convite_service, qrcode_service
+    from servicos.sincronizacao_service import hash_convite
+
+    evento = buscar_evento_por_id(job.evento_id)
+    convidado = buscar_convidado_por_id(job.convidado_id)
+    if evento is None or convidado is None:
+        return None # Excluído depois de enfileirado: nada a gerar
+
+    conteudo_qr = qrcode_service.montar_conteudo_qrcode(evento, convidado)
+    matriz = qrcode_service.gerar_matriz_qrcode(conteudo_qr)
+    if not matriz:
+        raise RuntimeError(str(matriz)) # A Falha devolvida pelo serviço vira o erro registrado no job
+    nome_base = qrcode_service.nome_arquivo_convidado(evento["id"], convidado)
+    caminho = convite_service.gerar_convite_pdf(evento, convidado, None, nome_base, matriz_qrcode=matriz)
+    if not caminho:
+        raise RuntimeError(str(caminho))
+    # A sincronização passa a considerar este convite atualizado
+    modelo_artefato.registrar_artefatos([(
+        convidado["id"], "convite", evento["id"], caminho,
+        hash_convite(evento, convidado, qrcode_service.chave_cache(conteudo_qr)),
+    )])
+    return caminho
+
+
+# Função executada para cada tipo de job
+EXECUTORES = {
+    modelo_job.TIPO_CONVITE: _executar_convite,
+}
+
+
+def executar_worker(dono=None, lote=LOTE_RESERVA, lease_segundos=LEASE_SEGUNDOS, continuo=False, limite=None):
+    """Processa jobs da fila até ela esvaziar (ou indefinidamente, com continuo=True).
+
+    O lease do lote é renovado na metade do prazo enquanto os jobs executam.
+    Ao ser interrompido (Ctrl+C), os jobs reservados e ainda não executados
+    voltam para a fila sem contar tentativa. O andamento sai no log a cada
+    INTERVALO_PROGRESSO segundos (registro_log.ProgressoLote), com o estado da fila.
+
+    Args:
+        dono (str, optional): Identificador do worker. Padrão: máquina:PID.
+        lote (int): Jobs reservados por vez.
+        lease_segundos (float): Prazo de cada reserva.
+        continuo (bool): Continua esperando novos jobs quando a fila esvazia.
+        limite (int, optional): Para depois de processar esta quantidade de jobs.
+
+    Returns:
+        dict: {'concluidos': n, 'falhas': n, 'duracao': segundos}.
+    """
+    dono = dono or identificador_worker()
+    resumo = {"concluidos": 0, "falhas": 0, "duracao": 0.0}
+    inicio = time.perf_counter()
+    with ProgressoLote(f"[{dono}] Jobs", log=logger, intervalo=INTERVALO_PROGRESSO, unidade="jobs",
+                       detalhe=_estado_fila) as progresso:
+        while limite is None or resumo["concluidos"] + resumo["falhas"] < limite:
+            quantidade = lote if limite is None else min(lote, limite - resumo["concluidos"] - resumo["falhas"])
+            jobs = modelo_job.reservar_jobs(dono, quantidade, lease_segundos)
+            if not jobs:
+                if not continuo:
+                    break
+                time.sleep(ESPERA_FILA_VAZIA)
+                continue
+
+            concluidos, falhas = [], []
+            renovar_em = time.monotonic() + lease_segundos / 2
+            try:
+                for job in jobs:
+                    if time.monotonic() >= renovar_em:
+                        pendentes = [j.id for j in jobs[len(concluidos) + len(falhas):]]
+                        modelo_job.renovar_lease(pendentes, dono, lease_segundos)
+                        renovar_em = time.monotonic() + lease_segundos / 2
+                    executor = EXECUTORES.get(job.tipo)
+                    try:
+                        if executor is None:
+                            raise ValueError(f"Tipo de job desconhecido: {job.tipo}")
+                        concluidos.append((job.id, executor(job)))
+                    except Exception as e:
+                        falhas.append((job.id, str(e) or type(e).__name__))
+            except KeyboardInterrupt:
+                executados = {job_id for job_id, _ in concluidos + falhas}
+                modelo_job.liberar_jobs([j.id for j in jobs if j.id not in executados], dono)
+                modelo_job.finalizar_jobs(dono, concluidos, falhas)
+                raise
+            modelo_job.finalizar_jobs(dono, concluidos, falhas)
+            resumo["concluidos"] += len(concluidos)
+            resumo["falhas"] += len(falhas)
+            for job_id, erro in falhas:
+                progresso.erro(f"job {job_id}", erro)
+            progresso.sucesso(len(concluidos))
+    resumo["duracao"] = time.perf_counter() - inicio
+    return resumo
+
+
+def _estado_fila():
+    fila = modelo_job.progresso_jobs() or {}
+    return f"fila: {fila.get('pendente', 0)} pendentes, {fila.get('executando', 0)} em execução"
+
+
+def _processo_worker(caminho_banco, lote, lease_segundos, continuo):
+    """Ponto de entrada dos processos criados por executar_workers."""
+    db_conexao.DB_PATH = caminho_banco
+    try:
+        return executar_worker(lote=lote, lease_segundos=lease_segundos, continuo=continuo)
+    except KeyboardInterrupt:
+        return None
+
+
+def executar_workers(processos, lote=LOTE_RESERVA, lease_segundos=LEASE_SEGUNDOS, continuo=False):
+    """Roda `processos` workers em paralelo (um processo cada) e soma os resumos."""
+    if processos <= 1:
+        return executar_worker(lote=lote, lease_segundos=lease_segundos, continuo=continuo)
+    inicio = time.perf_counter()
+    with multiprocessing.Pool(processos) as pool:
+        resumos = pool.starmap(_processo_worker, [(db_conexao.DB_PATH, lote, lease_segundos, continuo)] * processos)
+    total = {"concluidos": 0, "falhas": 0, "duracao": time.perf_counter() - inicio}
+    for resumo in resumos:
+        if resumo:
+            total["concluidos"] += resumo["concluidos"]
+            total["falhas"] += resumo["falhas"]
+    return total
+
+
+instrumentar_modulo(__name__)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Worker da fila de geração de convites.")
+    parser.add_argument("--banco", help="Arquivo SQLite (padrão: o configurado em db/conexao.py)")
+    parser.add_argument("--processos", type=int, default=1)
+    parser.add_argument("--lote", type=int, default=LOTE_RESERVA)
+    parser.add_argument("--lease", type=float, default=LEASE_SEGUNDOS, help="Segundos de cada reserva")
+    parser.add_argument("--continuo", action="store_true", help="Não encerra quando a fila esvazia")
+    args = parser.parse_args()
+
+    if args.banco:
+        db_conexao.DB_PATH = os.path.abspath(args.banco)
+    import registro_log
+    registro_log.configurar()
+    db_conexao.inicializar_banco()
+    try:
+        resumo = executar_workers(args.processos, args.lote, args.lease, args.continuo)
+        print(f"Worker encerrado: {resumo['concluidos']} concluídos, {resumo['falhas']} falhas "
+              f"em {resumo['duracao']:.1f}s.")
+    except KeyboardInterrupt:
+        print("\nWorker interrompido; os jobs não executados voltaram para a fila.")